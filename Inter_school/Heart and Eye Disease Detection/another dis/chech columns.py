@@ -1,7 +1,17 @@
-import pandas as pd
-
-df = pd.read_csv("heart.csv")
-print("Columns in your CSV:")
-print(df.columns.tolist())
-print("\nFirst few rows:")
-print(df.head())
+import os
+import sys
+
+# heart_dataset.py lives in Inter_school/, two folders up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from heart_dataset import COLUMNS, SchemaError, load  # noqa: E402
+
+try:
+    df = load("heart.csv")
+except SchemaError as e:
+    print(f"❌ heart.csv does not match the expected columns/values: {e}")
+    sys.exit(1)
+
+print("Columns in your CSV (validated):")
+print(COLUMNS)
+print("\nFirst few rows:")
+print(df.head())
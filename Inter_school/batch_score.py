@@ -0,0 +1,128 @@
+"""Headless batch scoring for the heart model.
+
+Streams a heart.csv-shaped file in chunks, scores every chunk with a single
+vectorized predict_proba call and appends the probabilities to the output
+CSV as it goes, so memory stays bounded by the chunk size.
+
+With --explain every row also gets a base_probability column and one
+contribution_<feature> column per feature (see forest_engine.explain());
+base plus the contributions equals the probability. Explanations come from
+the same vectorized leaf lookup as the scores.
+
+Usage:
+    python batch_score.py heart.csv scored.csv --chunk-size 50000
+    python batch_score.py heart.csv explained.csv --explain
+    python batch_score.py partial.csv scored.csv --allow-missing
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+import heart_predictor
+from feature_vectorizer import FeatureVectorizer
+from resources import find_resource
+
+
+PROBABILITY_COLUMN = 'heart_disease_probability'
+BASE_COLUMN = 'base_probability'
+CONTRIBUTION_PREFIX = 'contribution_'
+
+
+def load_model(path):
+    """Loads the pickled heart model, failing with a readable message."""
+    path = find_resource(path)
+    if not os.path.exists(path):
+        sys.exit(f"ERROR: model file not found: {path}")
+    return heart_predictor.get_model(path)
+
+
+def score_chunk(model, chunk, vectorizer, allow_missing=False):
+    """Returns the positive-class probability for every row of the chunk."""
+    rows = vectorizer.transform_columns(chunk, extra="ignore", allow_missing=allow_missing)
+    return heart_predictor.predict_proba(rows, model)
+
+
+def explain_chunk(engine, chunk, vectorizer, allow_missing=False):
+    """Adds the probability, base and per-feature contribution columns to the chunk."""
+    rows = vectorizer.transform_columns(chunk, extra="ignore", allow_missing=allow_missing)
+    base, contributions = heart_predictor.explain_proba(rows, engine)
+    chunk[PROBABILITY_COLUMN] = base + contributions.sum(axis=1)
+    chunk[BASE_COLUMN] = base
+    for j, feature in enumerate(vectorizer.feature_columns):
+        chunk[CONTRIBUTION_PREFIX + feature] = contributions[:, j]
+
+
+def score_csv(model, input_path, output_path, chunk_size=50_000, model_path=None, explain=False,
+              allow_missing=False):
+    """Scores input_path chunk by chunk, writing each chunk straight to output_path.
+
+    Absent feature columns (e.g. a misspelled header) and blank values raise
+    ValueError, unless allow_missing=True fills them with the defaults saved
+    with the model (a warning lists absent columns). With explain=True the
+    contribution columns are written too. Returns (rows_scored, seconds_elapsed).
+    """
+    vectorizer = FeatureVectorizer.for_model(model_path or find_resource(heart_predictor.MODEL_FILENAME),
+                                             capacity=chunk_size)
+    if explain:
+        from forest_engine import CompiledForest
+        engine = CompiledForest.from_model(model)
+    rows = 0
+    start = time.perf_counter()
+
+    with open(output_path, 'w', newline='') as out:
+        header = True
+        for chunk in pd.read_csv(input_path, chunksize=chunk_size):
+            if header:
+                missing = [c for c in vectorizer.feature_columns if c not in chunk.columns]
+                if missing and not allow_missing:
+                    raise ValueError(f"input has no {missing} columns (found {list(chunk.columns)}); "
+                                     f"pass --allow-missing to score with the model's saved defaults")
+                if missing:
+                    print(f"⚠️ Input has no {missing} columns; using the model's saved defaults")
+            try:
+                if explain:
+                    explain_chunk(engine, chunk, vectorizer, allow_missing)
+                else:
+                    chunk[PROBABILITY_COLUMN] = score_chunk(model, chunk, vectorizer, allow_missing)
+            except ValueError as e:
+                raise ValueError(f"lines {rows + 2}-{rows + len(chunk) + 1} of {input_path}: {e}") from e
+            chunk.to_csv(out, header=header, index=False, float_format='%.6g')
+            header = False
+            rows += len(chunk)
+
+    return rows, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-score a heart.csv-shaped file.")
+    parser.add_argument("input", help="CSV with the heart.csv feature columns")
+    parser.add_argument("output", help="where to write the scored CSV")
+    parser.add_argument("--model", default=heart_predictor.MODEL_FILENAME, help="path to the trained model")
+    parser.add_argument("--chunk-size", type=int, default=50_000,
+                        help="rows per predict_proba call (bounds memory use)")
+    parser.add_argument("--explain", action="store_true",
+                        help="also write each feature's contribution to every probability")
+    parser.add_argument("--allow-missing", action="store_true",
+                        help="fill absent feature columns and blank values with the model's saved defaults")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be positive")
+
+    model = load_model(args.model)
+    try:
+        rows, elapsed = score_csv(model, args.input, args.output, args.chunk_size, find_resource(args.model),
+                                  args.explain, args.allow_missing)
+    except ValueError as e:
+        sys.exit(f"ERROR: {e}")
+
+    rate = rows / elapsed if elapsed > 0 else float('inf')
+    print(f"✅ Scored {rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+    print(f"💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
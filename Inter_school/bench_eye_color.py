@@ -0,0 +1,81 @@
+"""Micro-benchmark: eye_color.ColorAnalyzer vs the original per-eye HSV code.
+
+ROIs are cut from synthetic frames with normal, red and yellow sclera at
+several eye sizes. Both implementations must produce identical red/yellow
+pixel counts; the script reports time and bytes allocated per ROI.
+
+Usage:
+    python bench_eye_color.py --repeat 2000
+"""
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+import eye_color
+import synthetic_eyes
+from eye_detector import LOWER_RED_1, UPPER_RED_1, LOWER_RED_2, UPPER_RED_2, LOWER_YELLOW, UPPER_YELLOW
+
+
+def legacy_counts(eye_roi):
+    """The original detect_eyes() colour checks, kept for comparison."""
+    hsv_roi = cv2.cvtColor(eye_roi, cv2.COLOR_BGR2HSV)
+    mask_red_1 = cv2.inRange(hsv_roi, np.array(LOWER_RED_1), np.array(UPPER_RED_1))
+    mask_red_2 = cv2.inRange(hsv_roi, np.array(LOWER_RED_2), np.array(UPPER_RED_2))
+    red_mask = mask_red_1 + mask_red_2
+    red_pixel_count = np.sum(red_mask > 0)
+    mask_yellow = cv2.inRange(hsv_roi, np.array(LOWER_YELLOW), np.array(UPPER_YELLOW))
+    yellow_pixel_count = np.sum(mask_yellow > 0)
+    return int(red_pixel_count), int(yellow_pixel_count)
+
+
+def synthetic_rois():
+    rois = []
+    for sclera in synthetic_eyes.SCLERA_COLORS:
+        for iris_radius in (12, 22, 32):
+            frame, truth = synthetic_eyes.render_frame(0, iris_radius=iris_radius, sclera=sclera)
+            for cx, cy, _ in truth:
+                half = iris_radius * 2
+                rois.append(frame[cy - half:cy + half, cx - half:cx + half])
+    return rois
+
+
+def measure(fn, rois, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for roi in rois:
+            fn(roi)
+    seconds = (time.perf_counter() - start) / (repeat * len(rois))
+
+    tracemalloc.start()
+    for roi in rois:
+        fn(roi)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark eye ROI colour analysis.")
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    rois = synthetic_rois()
+    analyzer = eye_color.ColorAnalyzer()
+
+    mismatches = [i for i, roi in enumerate(rois) if legacy_counts(roi) != analyzer.count(roi)]
+    if mismatches:
+        raise SystemExit(f"❌ Counts differ on ROIs {mismatches}")
+    print(f"✅ Identical red/yellow counts on {len(rois)} synthetic ROIs")
+
+    legacy_s, legacy_peak = measure(legacy_counts, rois, args.repeat)
+    fast_s, fast_peak = measure(analyzer.count, rois, args.repeat)
+    print(f"   legacy inRange x3   {legacy_s * 1e6:8.1f} µs/ROI | peak alloc {legacy_peak:>8,} B")
+    print(f"   ColorAnalyzer       {fast_s * 1e6:8.1f} µs/ROI | peak alloc {fast_peak:>8,} B")
+    print(f"   speed-up {legacy_s / fast_s:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Benchmark eye detection modes on a recorded clip.
+
+Decodes the clip into memory first so only detection is timed, then runs
+each mode over every frame: full-resolution detection, downscaled
+detection at each --scales factor, and detect-then-track at each
+--track-every interval. Agreement is the share of eyes found by
+full-resolution detection whose centre lies inside a box found by the mode;
+status agreement is the share of frames where analyze_eyes() on the
+mode's boxes reports the same overall status as on full-resolution boxes.
+
+Without --clip a synthetic clip is generated (see synthetic_eyes.py).
+
+Usage:
+    python bench_eye_detection.py --clip screening.avi --scales 0.5 0.33 --track-every 5 10 30
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import cv2
+
+import eye_detector
+import synthetic_eyes
+
+
+def load_frames(path, max_frames=None):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open {path}")
+    frames = []
+    while max_frames is None or len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def agreement(reference, boxes):
+    """Fraction of reference boxes whose centre falls inside one of boxes."""
+    if len(reference) == 0:
+        return 1.0
+    hits = 0
+    for (x, y, w, h) in reference:
+        cx, cy = x + w / 2, y + h / 2
+        if any(bx <= cx <= bx + bw and by <= cy <= by + bh for (bx, by, bw, bh) in boxes):
+            hits += 1
+    return hits / len(reference)
+
+
+def run_mode(name, detect, frames, grays, reference, reference_status, eye_cascade):
+    timings, scores, same_status = [], [], 0
+    for frame, gray, ref, ref_status in zip(frames, grays, reference, reference_status):
+        start = time.perf_counter()
+        boxes = detect(gray)
+        timings.append(time.perf_counter() - start)
+        scores.append(agreement(ref, boxes))
+        result = eye_detector.analyze_eyes(frame, eye_cascade, lambda _: boxes)
+        same_status += result.status == ref_status
+
+    timings.sort()
+    total = sum(timings)
+    return {
+        "mode": name,
+        "frames": len(grays),
+        "fps": round(len(grays) / total, 1) if total > 0 else 0.0,
+        "mean_ms": round(total / len(grays) * 1000, 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(0.95 * len(timings)))] * 1000, 3),
+        "agreement": round(sum(scores) / len(scores), 4),
+        "status_agreement": round(same_status / len(grays), 4),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare eye detection modes on a clip.")
+    parser.add_argument("--clip", help="recorded video (default: generate a synthetic clip)")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--scales", type=float, nargs="+", default=[0.5, 0.33],
+                        help="detection scales to benchmark (full resolution is always included)")
+    parser.add_argument("--pyramid", action="store_true", help="downsample with cv2.pyrDown")
+    parser.add_argument("--track-every", type=int, nargs="+", default=[5, 10, 30],
+                        help="full-detection intervals to benchmark in tracked mode")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    clip = args.clip
+    if clip is None:
+        clip = os.path.join(tempfile.gettempdir(), "synthetic_eyes_bench.avi")
+        synthetic_eyes.write_clip(clip, args.frames)
+    frames = load_frames(clip, args.frames)
+    if not frames:
+        raise SystemExit(f"ERROR: no frames decoded from {clip}")
+    grays = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames]
+
+    eye_cascade = eye_detector.create_eye_cascade()
+    reference = [eye_detector.detect_eyes(gray, eye_cascade) for gray in grays]
+    reference_status = [eye_detector.analyze_eyes(frame, eye_cascade).status for frame in frames]
+
+    def bench(name, detect):
+        return run_mode(name, detect, frames, grays, reference, reference_status, eye_cascade)
+
+    results = [bench("full", lambda g: eye_detector.detect_eyes(g, eye_cascade))]
+    for scale in args.scales:
+        results.append(bench(f"scale/{scale:g}",
+                             lambda g, s=scale: eye_detector.detect_eyes(g, eye_cascade, s, args.pyramid)))
+    for every in args.track_every:
+        tracker = eye_detector.EyeTracker(eye_cascade, detect_every=every)
+        result = bench(f"tracked/{every}", tracker)
+        result["full_detections"] = tracker.full_detections
+        results.append(result)
+
+    print(f"📊 {len(grays)} frames from {clip}")
+    for r in results:
+        print(f"   {r['mode']:<12} {r['fps']:8.1f} FPS | mean {r['mean_ms']:7.2f} ms"
+              f" | p95 {r['p95_ms']:7.2f} ms | agreement {r['agreement'] * 100:5.1f}%"
+              f" | status agreement {r['status_agreement'] * 100:5.1f}%")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"clip": clip, "results": results}, f, indent=2)
+        print(f"💾 Results saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark: pupil estimators on synthetic eyes with known pupil radii.
+
+Frames come from synthetic_eyes.render_frame(), whose pupils dilate and
+constrict over time, at several eye sizes. Each eye is cut out the way the
+cascade would box it. For every estimator the script reports per-ROI
+latency, how often a pupil was found, and the radius error against ground
+truth. It then replays the frames in order to show what temporal smoothing
+does to the error and to the frame-to-frame jitter.
+
+Usage:
+    python bench_pupil.py --frames 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+import synthetic_eyes
+from pupil_estimator import make_pupil_estimator
+
+
+IRIS_RADII = (12, 18, 22, 28, 34)
+
+
+def synthetic_sequences(frames, iris_radii=IRIS_RADII):
+    """Yields (iris_radius, [[(gray_roi, origin, true_radius) per eye] per frame])."""
+    import cv2
+
+    for iris_radius in iris_radii:
+        sequence = []
+        for i in range(frames):
+            frame, truth = synthetic_eyes.render_frame(i, iris_radius=iris_radius)
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            eyes = []
+            for cx, cy, pupil_radius in truth:
+                half = iris_radius * 2
+                x, y = cx - half, cy - half
+                eyes.append((gray[y:y + 2 * half, x:x + 2 * half], (x, y), pupil_radius))
+            sequence.append(eyes)
+        yield iris_radius, sequence
+
+
+def run(estimator, sequence):
+    """Feeds a sequence through estimator; returns (seconds per ROI, [(true, estimated or None)])."""
+    pairs = []
+    elapsed = 0.0
+    for eyes in sequence:
+        estimator.begin_frame()
+        for roi, origin, true_radius in eyes:
+            start = time.perf_counter()
+            pupil = estimator(roi, origin)
+            elapsed += time.perf_counter() - start
+            pairs.append((true_radius, None if pupil is None else pupil[2]))
+    return elapsed / len(pairs), pairs
+
+
+def summarize(pairs):
+    found = [(t, e) for t, e in pairs if e is not None]
+    errors = np.array([e - t for t, e in found], dtype=float)
+    # Jitter: frame-to-frame change of the estimate beyond the true change, per eye
+    deltas = [(e2 - e1) - (t2 - t1) for (t1, e1), (t2, e2) in zip(pairs[::2], pairs[2::2])
+              if e1 is not None and e2 is not None]
+    return {
+        "found": len(found) / len(pairs),
+        "mae": float(np.abs(errors).mean()) if len(errors) else float("nan"),
+        "bias": float(errors.mean()) if len(errors) else float("nan"),
+        "p95": float(np.percentile(np.abs(errors), 95)) if len(errors) else float("nan"),
+        "jitter": float(np.std(deltas)) if deltas else float("nan"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare pupil estimators on synthetic eyes.")
+    parser.add_argument("--frames", type=int, default=200, help="frames per eye size")
+    parser.add_argument("--smoothing", type=float, default=0.4, help="EMA weight for the smoothed rows")
+    args = parser.parse_args(argv)
+
+    configs = [("blob", None), ("hough", None), ("blob", args.smoothing), ("hough", args.smoothing)]
+    totals = {config: [] for config in configs}
+    timings = {config: [] for config in configs}
+
+    print(f"📊 Pupil radius vs ground truth ({args.frames} frames x 2 eyes per iris size)")
+    print(f"   {'estimator':<18} {'iris r':>6} {'µs/ROI':>8} {'found':>7} {'MAE px':>7} "
+          f"{'bias':>6} {'p95':>5} {'jitter':>7}")
+    for iris_radius, sequence in synthetic_sequences(args.frames):
+        for method, smoothing in configs:
+            # Fresh estimator per size so smoothing state doesn't leak between runs
+            seconds, pairs = run(make_pupil_estimator(method, smoothing), sequence)
+            totals[(method, smoothing)].extend(pairs)
+            timings[(method, smoothing)].append(seconds)
+            s = summarize(pairs)
+            name = method + (f" + EMA {smoothing:g}" if smoothing else "")
+            print(f"   {name:<18} {iris_radius:>6} {seconds * 1e6:8.1f} {s['found'] * 100:6.1f}% "
+                  f"{s['mae']:7.2f} {s['bias']:+6.2f} {s['p95']:5.1f} {s['jitter']:7.2f}")
+
+    print("\n   overall")
+    for method, smoothing in configs:
+        s = summarize(totals[(method, smoothing)])
+        name = method + (f" + EMA {smoothing:g}" if smoothing else "")
+        print(f"   {name:<18} {'all':>6} {np.mean(timings[(method, smoothing)]) * 1e6:8.1f} "
+              f"{s['found'] * 100:6.1f}% {s['mae']:7.2f} {s['bias']:+6.2f} {s['p95']:5.1f} {s['jitter']:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Reproducible benchmark suite for training, inference and the eye pipeline.
+
+Suites:
+    training   RandomForest fit time (train_model.py's settings) at several
+               dataset sizes, on synthetic rows drawn from heart.csv
+    inference  heart_model.pkl load and engine compile time, single-row and
+               batch predict_proba latency (compiled engine and sklearn)
+    vision     eye pipeline stage timings (see instrumentation.py) on a
+               synthetic clip, so no camera is needed
+
+Every timing is the median of --repeat runs. Results are written as JSON
+with machine info (CPU, Python and library versions, git commit). With
+--baseline, every metric is compared to a stored run and changes beyond
+--threshold are flagged; --fail-on-regression then exits with status 1.
+Numbers are only comparable between runs on the same machine.
+
+Usage:
+    python bench_suite.py --output bench_results.json --baseline bench_baseline.json
+    python bench_suite.py --suites inference --quick
+    python bench_suite.py --save-baseline bench_baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from heart_dataset import FEATURE_COLUMNS, SCHEMA, TARGET_COLUMN
+from resources import BASE_DIR, find_resource
+
+
+SUITES = ("training", "inference", "vision")
+TRAIN_SIZES = (500, 2000, 8000)
+QUICK_TRAIN_SIZES = (500, 2000)
+VISION_FRAMES = 150
+DEFAULT_THRESHOLD = 0.10
+# Continuous columns get Gaussian jitter of this fraction of their standard deviation
+JITTER = 0.1
+
+
+# ---------------- MACHINE INFO ----------------
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def machine_info():
+    import cv2
+    import sklearn
+
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "opencv": cv2.__version__,
+        "git_commit": _git_commit(),
+    }
+
+
+def _metric(value, unit):
+    return {"value": round(value, 6), "unit": unit}
+
+
+def _median_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+# ---------------- SYNTHETIC DATA ----------------
+def synthetic_heart_rows(df, n, seed=0):
+    """n rows resembling df: whole rows resampled (so each keeps its class and
+    categorical values), continuous columns jittered, every column kept within
+    its SCHEMA range and dtype."""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    rows = df.iloc[rng.integers(0, len(df), n)].reset_index(drop=True)
+    out = {}
+    for column in df.columns:
+        dtype, low, high = SCHEMA[column]
+        values = rows[column].to_numpy(dtype=np.float64)
+        # Columns with few distinct values are categorical: keep them as sampled
+        if column != TARGET_COLUMN and df[column].nunique() > 5:
+            values = values + rng.normal(0, JITTER * df[column].std(), n)
+        values = np.clip(values, low, high)
+        out[column] = (np.round(values) if dtype.startswith("int") else values).astype(dtype)
+    return pd.DataFrame(out, columns=list(df.columns))
+
+
+# ---------------- SUITES ----------------
+def bench_training(sizes=TRAIN_SIZES, repeat=3, seed=0):
+    from sklearn.ensemble import RandomForestClassifier
+
+    import heart_dataset
+
+    df = heart_dataset.load(find_resource("heart.csv"))
+    results = {}
+    for n in sizes:
+        data = synthetic_heart_rows(df, n, seed)
+        X, y = data[FEATURE_COLUMNS], (data[TARGET_COLUMN] > 0).astype("int8")
+        # The same forest train_model.py fits by default
+        seconds = _median_time(lambda: RandomForestClassifier(n_estimators=100, random_state=42).fit(X, y),
+                               repeat)
+        results[f"train.fit_{n}_rows"] = _metric(seconds * 1000, "ms")
+        print(f"   fit {n:>6} rows: {seconds * 1000:9.1f} ms")
+    return results
+
+
+def bench_inference(repeat=3, single_calls=2000, batch_rows=1000):
+    import warnings
+
+    import joblib
+
+    import heart_predictor
+    from forest_engine import CompiledForest
+
+    # Rows are plain arrays, as in heart_predictor
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    path = find_resource(heart_predictor.MODEL_FILENAME)
+    results = {}
+    seconds = _median_time(lambda: joblib.load(path), repeat)
+    results["inference.model_load"] = _metric(seconds * 1000, "ms")
+    model = joblib.load(path)
+    compile_seconds = _median_time(lambda: CompiledForest.from_model(model), repeat)
+    results["inference.engine_compile"] = _metric(compile_seconds * 1000, "ms")
+    print(f"   model load {seconds * 1000:.1f} ms, engine compile {compile_seconds * 1000:.1f} ms")
+
+    import heart_dataset
+
+    X = heart_dataset.load_xy(find_resource("heart.csv"))[0].to_numpy(dtype=np.float32)
+    batch = X[np.random.default_rng(0).integers(0, len(X), batch_rows)]
+    engine = CompiledForest.from_model(model)
+
+    def single(predict, calls):
+        times = []
+        for i in range(calls):
+            row = X[i % len(X)].reshape(1, -1)
+            start = time.perf_counter()
+            predict(row)
+            times.append(time.perf_counter() - start)
+        return statistics.median(times), float(np.percentile(times, 95))
+
+    # sklearn's per-call overhead is ~100x the engine's, so fewer calls suffice there
+    for name, predict, calls in (("engine", lambda rows: heart_predictor.predict_proba(rows, engine), single_calls),
+                                 ("sklearn", model.predict_proba, max(50, single_calls // 10))):
+        median, p95 = single(predict, calls)
+        batch_seconds = _median_time(lambda: predict(batch), repeat)
+        results[f"inference.{name}.single_p50"] = _metric(median * 1e6, "us")
+        results[f"inference.{name}.single_p95"] = _metric(p95 * 1e6, "us")
+        results[f"inference.{name}.batch_per_row"] = _metric(batch_seconds / batch_rows * 1e6, "us")
+        print(f"   {name:<8} single p50 {median * 1e6:8.1f} µs | p95 {p95 * 1e6:8.1f} µs | "
+              f"batch of {batch_rows} {batch_seconds / batch_rows * 1e6:7.2f} µs/row")
+    return results
+
+
+def bench_vision(frames=VISION_FRAMES):
+    import eye_pipeline
+    import instrumentation
+    import synthetic_eyes
+
+    clip = os.path.join(tempfile.gettempdir(), f"bench_suite_eyes_{frames}.avi")
+    if not os.path.exists(clip):
+        synthetic_eyes.write_clip(clip, frames)
+
+    was_enabled = instrumentation.is_enabled()
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        # One worker, every frame: the same work on every machine
+        report = eye_pipeline.EyePipeline(eye_pipeline.open_source(clip), workers=1, drop_frames=False,
+                                          display=False).run()
+        stages = instrumentation.snapshot()
+    finally:
+        if not was_enabled:
+            instrumentation.disable()
+
+    results = {"vision.fps": _metric(report["fps"], "fps")}
+    for name, summary in stages.items():
+        if summary["count"]:
+            results[f"vision.{name}.p50"] = _metric(summary["p50_ms"], "ms")
+            results[f"vision.{name}.mean"] = _metric(summary["mean_ms"], "ms")
+    print(f"   {report['frames_delivered']} frames at {report['fps']:.1f} FPS")
+    print(instrumentation.format_summary(stages))
+    return results
+
+
+def run_suites(suites=SUITES, quick=False, repeat=3):
+    """Runs the chosen suites; returns the full results document."""
+    results = {}
+    for suite in suites:
+        print(f"⏱️ {suite}")
+        if suite == "training":
+            results.update(bench_training(QUICK_TRAIN_SIZES if quick else TRAIN_SIZES, repeat))
+        elif suite == "inference":
+            results.update(bench_inference(repeat, single_calls=500 if quick else 2000))
+        elif suite == "vision":
+            results.update(bench_vision(VISION_FRAMES // 3 if quick else VISION_FRAMES))
+    return {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "quick": quick, "machine": machine_info(),
+            "results": results}
+
+
+# ---------------- BASELINE ----------------
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Returns [(metric, baseline, current, change, verdict)] for metrics in both runs.
+
+    change is relative; fps is better higher, everything else better lower.
+    """
+    rows = []
+    for name, metric in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        old, new = baseline["results"][name]["value"], metric["value"]
+        change = (new - old) / old if old else 0.0
+        worse = -change if metric["unit"] == "fps" else change
+        verdict = "regression" if worse > threshold else "improvement" if worse < -threshold else ""
+        rows.append((name, old, new, change, verdict))
+    return rows
+
+
+def print_comparison(rows, current, baseline):
+    # A different commit is the point of the comparison; anything else skews it
+    changed = [k for k in current["machine"]
+               if k != "git_commit" and current["machine"][k] != baseline["machine"].get(k)]
+    if current["quick"] != baseline.get("quick"):
+        changed.append("--quick setting")
+    if changed:
+        print(f"⚠️ Baseline was recorded with different {', '.join(changed)}; compare with care")
+    print(f"📊 vs baseline from {baseline['timestamp']}")
+    for name, old, new, change, verdict in rows:
+        mark = {"regression": "🔴", "improvement": "🟢"}.get(verdict, "  ")
+        print(f"   {mark} {name:<36} {old:12.3f} -> {new:12.3f} {current['results'][name]['unit']:<4} "
+              f"{change * 100:+7.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark training, inference and the eye pipeline.")
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer calls")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per timing (the median is kept)")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="compare against this earlier results file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative change flagged as a regression or improvement")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--save-baseline", metavar="PATH", help="also save the results as the baseline")
+    args = parser.parse_args(argv)
+
+    current = run_suites(args.suites, args.quick, args.repeat)
+    with open(args.output, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"💾 Results saved to {args.output}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"💾 Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(current, baseline, args.threshold)
+        print_comparison(rows, current, baseline)
+        regressions = [row for row in rows if row[4] == "regression"]
+        if regressions and args.fail_on_regression:
+            raise SystemExit(f"❌ {len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""Live heart-risk scoring from the pulse sensor's serial BPM stream.
+
+BPM_MONITOR.ino prints a "BPM: <n>" line at 115200 baud on every beat. This
+module reads those lines on an asyncio event loop (the serial port is a
+non-blocking file descriptor, so nothing waits on the device), keeps the
+last --window readings in a ring buffer and feeds the window's maximum in
+as the patient's max heart rate (thalach). The heart model is only
+rescored when that maximum, or the window mean, has moved by at least
+--min-change BPM since the last score. A steady pulse costs one ring
+buffer update per beat and no predictions.
+
+Stand-ins for the sensor, so high-rate streams can be tested without
+hardware:
+    --replay FILE   replay a captured log (one "BPM: n" line per beat)
+    --simulate      a synthetic sensor writing into a local pseudo-terminal,
+                    read back through the same serial code path as a device
+    --pty           only run the synthetic sensor and print its device path,
+                    for another process to open with --port
+
+Usage:
+    python bpm_stream.py --port /dev/ttyUSB0 --patient '{"age": 54, "sex": "M", "trestbps": 130, "chol": 239,
+        "fbs": 0, "exang": 0, "oldpeak": 1.0}'
+    python bpm_stream.py --replay bpm_log.txt --rate 0
+    python bpm_stream.py --simulate --rate 2000 --seconds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+
+BAUD_RATE = 115200
+WINDOW_BEATS = 30
+MIN_CHANGE_BPM = 3.0
+# Readings outside this range are sensor glitches (no contact, motion), not heartbeats
+MIN_VALID_BPM = 30
+MAX_VALID_BPM = 250
+# Stand-in patient for --replay/--simulate/--pty runs without --patient
+DEMO_PATIENT = {"age": 54, "sex": "M", "trestbps": 130, "chol": 239, "fbs": 0, "exang": 0, "oldpeak": 1.0}
+
+
+def parse_bpm_line(line):
+    """Returns the BPM of a b'BPM: 72' line, or None for other or implausible lines."""
+    head, sep, value = line.partition(b":")
+    if not sep or head.strip() != b"BPM":
+        return None
+    try:
+        bpm = int(value)
+    except ValueError:
+        return None
+    return bpm if MIN_VALID_BPM <= bpm <= MAX_VALID_BPM else None
+
+
+# ---------------- WINDOW ----------------
+class BpmWindow:
+    """The last capacity readings in a fixed ring buffer, with a running sum for the mean."""
+
+    def __init__(self, capacity=WINDOW_BEATS):
+        self.values = np.zeros(capacity, dtype=np.float32)
+        self.capacity = capacity
+        self.position = 0
+        self.size = 0
+        self.total = 0.0
+
+    def push(self, bpm):
+        if self.size == self.capacity:
+            self.total -= float(self.values[self.position])
+        else:
+            self.size += 1
+        self.values[self.position] = bpm
+        self.total += bpm
+        self.position = (self.position + 1) % self.capacity
+
+    @property
+    def mean(self):
+        return self.total / self.size if self.size else 0.0
+
+    @property
+    def max(self):
+        # Every slot past size is still zero, so the whole buffer can be scanned
+        return float(self.values.max()) if self.size else 0.0
+
+
+def check_patient(patient):
+    """Raises ValueError unless patient plus a sensor heart rate makes a complete predict_patient() record."""
+    import heart_predictor
+
+    heart_predictor.build_features(**{k: v for k, v in patient.items() if k != "thalach"}, thalach=MIN_VALID_BPM)
+
+
+class BpmScorer:
+    """Rescores the heart model when the windowed heart rate changes enough to matter.
+
+    patient holds the other predict_patient() fields (age, sex, chol, ...);
+    thalach comes from the window. on_score(result) is called with every new
+    score.
+    """
+
+    def __init__(self, patient=None, window=WINDOW_BEATS, min_change=MIN_CHANGE_BPM, min_beats=5,
+                 predict=None, on_score=None):
+        self.patient = {k: v for k, v in (patient or {}).items() if k != "thalach"}
+        self.window = BpmWindow(window)
+        self.min_change = min_change
+        self.min_beats = min(min_beats, window)
+        self.predict = predict
+        self.on_score = on_score
+        self.scored_max = None
+        self.scored_mean = None
+        self.readings = 0
+        self.rescored = 0
+        self.last = None
+
+    def add(self, bpm):
+        """Adds one reading; returns the new score if the model was rescored, else None."""
+        self.readings += 1
+        self.window.push(bpm)
+        if self.window.size < self.min_beats:
+            return None
+        bpm_max, bpm_mean = self.window.max, self.window.mean
+        if (self.scored_max is not None and abs(bpm_max - self.scored_max) < self.min_change
+                and abs(bpm_mean - self.scored_mean) < self.min_change):
+            return None
+        return self.score(bpm_max, bpm_mean)
+
+    def score(self, bpm_max, bpm_mean):
+        if self.predict is None:
+            import heart_predictor
+            self.predict = heart_predictor.predict_patient
+        self.scored_max, self.scored_mean = bpm_max, bpm_mean
+        self.rescored += 1
+        self.last = {"bpm_max": bpm_max, "bpm_mean": round(bpm_mean, 1),
+                     "probability": self.predict(**self.patient, thalach=bpm_max),
+                     "readings": self.readings}
+        if self.on_score is not None:
+            self.on_score(self.last)
+        return self.last
+
+
+# ---------------- SOURCES ----------------
+def configure_serial(fd, baud=BAUD_RATE):
+    """Puts a tty file descriptor in raw mode at baud (8N1, no flow control)."""
+    import termios
+    import tty
+
+    tty.setraw(fd)
+    attrs = termios.tcgetattr(fd)
+    speed = getattr(termios, f"B{baud}")
+    attrs[4] = attrs[5] = speed
+    attrs[2] |= termios.CLOCAL | termios.CREAD
+    termios.tcsetattr(fd, termios.TCSANOW, attrs)
+
+
+async def serial_lines(path, baud=BAUD_RATE):
+    """Yields lines from a serial device (or pseudo-terminal) without blocking the loop."""
+    loop = asyncio.get_running_loop()
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_NOCTTY | os.O_NONBLOCK)
+    except AttributeError:
+        # No O_NOCTTY: not a POSIX system, read through pyserial on a thread instead
+        async for line in _pyserial_lines(path, baud):
+            yield line
+        return
+    configure_serial(fd, baud)
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader),
+                                                os.fdopen(fd, "rb", buffering=0))
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except OSError:
+                # EIO: the device went away (unplugged, or the pty writer closed)
+                break
+            if not line:
+                break
+            yield line
+    finally:
+        transport.close()
+
+
+async def _pyserial_lines(path, baud):
+    import serial  # pyserial, only needed where termios is unavailable
+
+    loop = asyncio.get_running_loop()
+    port = serial.Serial(path, baud, timeout=1)
+    try:
+        while True:
+            line = await loop.run_in_executor(None, port.readline)
+            if line:
+                yield line
+    finally:
+        port.close()
+
+
+async def replay_lines(path, rate=0.0):
+    """Yields the lines of a captured log, rate lines per second (0 = as fast as possible)."""
+    with open(path, "rb") as f:
+        lines = f.readlines()
+    start = time.perf_counter()
+    for i, line in enumerate(lines):
+        if rate > 0:
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif i % 1024 == 0:
+            # Let the rest of the loop run during a flat-out replay
+            await asyncio.sleep(0)
+        yield line
+
+
+def synthetic_bpm(n, seed=0, resting=72.0):
+    """n plausible readings: a drift around resting with occasional exertion bursts."""
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, 0.8, n)
+    level = np.empty(n)
+    current = resting
+    for i in range(n):
+        # Mean-reverting walk, so the rate wanders but comes back
+        current += 0.05 * (resting - current) + steps[i]
+        level[i] = current
+    bursts = np.convolve(rng.random(n) < 0.005, np.hanning(60) * 50, mode="same")
+    return np.clip(np.round(level + bursts + rng.normal(0, 2, n)), 40, 200).astype(int)
+
+
+class FakeSensor:
+    """A pseudo-terminal that receives "BPM: n" lines at rate lines per second.
+
+    path is the device to open as if it were the Arduino's serial port.
+    """
+
+    def __init__(self, readings, rate=50.0):
+        self.readings = readings
+        self.rate = rate
+        self.master, slave = os.openpty()
+        configure_serial(slave)
+        self.path = os.ttyname(slave)
+        # Keep the slave open so the reader doesn't see EIO before it has connected
+        self.slave = slave
+
+    def _write(self, data):
+        while data:
+            data = data[os.write(self.master, data):]
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        chunk = []
+        try:
+            for i, bpm in enumerate(self.readings, 1):
+                chunk.append(b"BPM: %d\r\n" % bpm)
+                # Lines that are already due go out together, at most 64 per write
+                wait = start + i / self.rate - time.perf_counter() if self.rate > 0 else 0.0
+                if wait > 0 or len(chunk) >= 64 or i == len(self.readings):
+                    # Blocks while the pty buffer is full, so off the loop
+                    await loop.run_in_executor(None, self._write, b"".join(chunk))
+                    chunk = []
+                if wait > 0:
+                    await asyncio.sleep(wait)
+        finally:
+            os.close(self.slave)
+            # Give the reader time to drain before the pty disappears
+            await asyncio.sleep(0.2)
+            os.close(self.master)
+
+
+# ---------------- DRIVER ----------------
+async def ingest(lines, scorer, report_every=0.0):
+    """Feeds every parsed line of an async line source to scorer; returns ingestion stats."""
+    start = time.perf_counter()
+    total = rejected = 0
+    next_report = start + report_every
+    async for line in lines:
+        total += 1
+        bpm = parse_bpm_line(line)
+        if bpm is None:
+            rejected += 1
+            continue
+        scorer.add(bpm)
+        if report_every and time.perf_counter() >= next_report:
+            next_report += report_every
+            print(f"   {scorer.readings} readings, window max {scorer.window.max:.0f} / "
+                  f"mean {scorer.window.mean:.1f} BPM, {scorer.rescored} rescored")
+    elapsed = time.perf_counter() - start
+    return {"lines": total, "rejected": rejected, "readings": scorer.readings, "rescored": scorer.rescored,
+            "elapsed_s": round(elapsed, 3), "lines_per_s": round(total / elapsed, 1) if elapsed > 0 else 0.0}
+
+
+class StreamSession:
+    """Runs ingest(open_lines(), scorer) on its own thread and event loop until the source ends or stop().
+
+    open_lines is called on the session's loop, so a serial source opens its
+    port there. Stopping cancels the ingest task, which closes the source.
+    """
+
+    def __init__(self, open_lines, scorer):
+        self.open_lines = open_lines
+        self.scorer = scorer
+        self.stats = None
+        self.error = None
+        self._loop = None
+        self._task = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bpm-stream", daemon=True)
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        try:
+            self._loop = loop
+            self._task = loop.create_task(ingest(self.open_lines(), self.scorer))
+            self._ready.set()
+            self.stats = loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.error = e
+        finally:
+            self._ready.set()
+            loop.close()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def stop(self, timeout=2.0):
+        """Cancels the ingest task and waits up to timeout seconds for the thread to finish."""
+        self._ready.wait(timeout)
+        try:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+        except (AttributeError, RuntimeError):
+            pass  # never started, or already finished and closed its loop
+        self._thread.join(timeout)
+
+
+def print_score(result):
+    print(f"🫀 max {result['bpm_max']:.0f} / mean {result['bpm_mean']:.1f} BPM -> "
+          f"heart disease probability {result['probability']:.1f}%")
+
+
+async def run(args):
+    scorer = BpmScorer(json.loads(args.patient), args.window, args.min_change,
+                       on_score=None if args.quiet else print_score)
+    if args.pty:
+        sensor = FakeSensor(synthetic_bpm(args.count, args.seed), args.rate)
+        print(f"🔌 Synthetic sensor on {sensor.path}; read it with --port {sensor.path}")
+        await sensor.run()
+        return None
+    if args.simulate:
+        sensor = FakeSensor(synthetic_bpm(args.count, args.seed), args.rate)
+        feeder = asyncio.create_task(sensor.run())
+        stats = await ingest(serial_lines(sensor.path, args.baud), scorer, args.report_every)
+        await feeder
+    elif args.replay:
+        stats = await ingest(replay_lines(args.replay, args.rate), scorer, args.report_every)
+    else:
+        print(f"🔌 Reading {args.port} at {args.baud} baud")
+        stats = await ingest(serial_lines(args.port, args.baud), scorer, args.report_every)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score heart disease risk from the live BPM stream.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--port", help="serial device of the pulse sensor, e.g. /dev/ttyUSB0")
+    source.add_argument("--replay", help="captured log with one 'BPM: n' line per beat")
+    source.add_argument("--simulate", action="store_true", help="read a synthetic sensor through a local pty")
+    source.add_argument("--pty", action="store_true", help="only run the synthetic sensor on a local pty")
+    parser.add_argument("--baud", type=int, default=BAUD_RATE)
+    parser.add_argument("--patient",
+                        help="JSON object with the other patient fields (age, sex, trestbps, chol, fbs, exang, "
+                             "oldpeak); required with --port")
+    parser.add_argument("--window", type=int, default=WINDOW_BEATS, help="readings in the rolling window")
+    parser.add_argument("--min-change", type=float, default=MIN_CHANGE_BPM,
+                        help="BPM change of the window max or mean that triggers a rescore")
+    parser.add_argument("--rate", type=float, default=50.0,
+                        help="replay/synthetic lines per second (0 = as fast as possible)")
+    parser.add_argument("--count", type=int, default=10_000, help="synthetic readings to send")
+    parser.add_argument("--seconds", type=float, help="synthetic stream length (sets --count from --rate)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report-every", type=float, default=0.0, help="seconds between progress lines")
+    parser.add_argument("--quiet", action="store_true", help="don't print every new score")
+    args = parser.parse_args(argv)
+    if args.seconds and args.rate > 0:
+        args.count = int(args.seconds * args.rate)
+    if args.patient is None:
+        if args.port:
+            parser.error("--patient is required with --port")
+        args.patient = json.dumps(DEMO_PATIENT)
+    try:
+        check_patient(json.loads(args.patient))
+    except ValueError as e:
+        parser.error(f"--patient: {e}")
+
+    try:
+        stats = asyncio.run(run(args))
+    except KeyboardInterrupt:
+        return
+    if stats is not None:
+        print(f"📊 {stats['lines']} lines in {stats['elapsed_s']:.2f}s ({stats['lines_per_s']:.0f}/s), "
+              f"{stats['rejected']} rejected, {stats['rescored']} rescores for {stats['readings']} readings")
+
+
+if __name__ == "__main__":
+    main()
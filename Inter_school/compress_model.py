@@ -0,0 +1,166 @@
+"""Shrinks heart_model.pkl for edge kiosks.
+
+Three kinds of smaller forest are tried against the trained model:
+
+* trimmed    the first k trees of the existing forest, no refit
+* capped     the same forest refit with a max_depth cap
+* distilled  a few shallow trees (or a single tree) fit on the big forest's
+             own predictions over jittered training rows
+
+The smallest candidate (by node count) whose accuracy on the held-out split
+is within --max-loss of the original is saved next to the model as
+heart_model_compact.pkl. Every candidate stays a RandomForestClassifier, so
+heart_predictor, flat_forest and forest_engine load it unchanged.
+
+Usage:
+    python compress_model.py
+    python compress_model.py --model heart_model.pkl --max-loss 0.02
+"""
+import argparse
+import copy
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from feature_vectorizer import save_feature_meta
+from forest_engine import CompiledForest
+from train_model import load_dataset
+
+
+COMPACT_FILENAME = "heart_model_compact.pkl"
+TRIM_TREES = (5, 10, 20, 30, 50, 75)
+DEPTH_CAPS = (3, 4, 5, 6, 8)
+DISTILL_SHAPES = ((1, 4), (1, 6), (5, 4), (10, 4), (10, 6), (25, 6))  # (trees, max_depth)
+DISTILL_COPIES = 20
+DISTILL_JITTER = 0.1
+
+
+def node_count(model):
+    return sum(e.tree_.node_count for e in model.estimators_)
+
+
+def trim_forest(model, n_trees):
+    """Copy of model keeping only its first n_trees trees."""
+    trimmed = copy.deepcopy(model)
+    trimmed.estimators_ = trimmed.estimators_[:n_trees]
+    trimmed.n_estimators = n_trees
+    return trimmed
+
+
+def distill_forest(teacher, X_train, n_trees, max_depth, seed=42):
+    """Fits a small forest to the teacher's labels on jittered copies of X_train."""
+    rng = np.random.default_rng(seed)
+    X = X_train.to_numpy(dtype=np.float64)
+    scale = X.std(axis=0) * DISTILL_JITTER
+    augmented = np.concatenate([X] + [X + rng.normal(0, 1, X.shape) * scale
+                                      for _ in range(DISTILL_COPIES)])
+    augmented = pd.DataFrame(augmented, columns=X_train.columns)
+    labels = teacher.predict(augmented)
+    # A single tree gets every row and every feature, i.e. a plain decision tree
+    single = n_trees == 1
+    student = RandomForestClassifier(n_estimators=n_trees, max_depth=max_depth, random_state=seed,
+                                     bootstrap=not single, max_features=None if single else "sqrt")
+    return student.fit(augmented, labels)
+
+
+def build_candidates(model, X_train, y_train):
+    """Yields (name, model) for every compression candidate."""
+    for k in TRIM_TREES:
+        if k < len(model.estimators_):
+            yield f"trimmed {k} trees", trim_forest(model, k)
+    for depth in DEPTH_CAPS:
+        capped = RandomForestClassifier(n_estimators=len(model.estimators_), max_depth=depth,
+                                        random_state=42)
+        yield f"capped depth {depth}", capped.fit(X_train, y_train)
+    for n_trees, depth in DISTILL_SHAPES:
+        yield f"distilled {n_trees}x depth {depth}", distill_forest(model, X_train, n_trees, depth)
+
+
+def measure(model, X_test, y_test, repeat=300):
+    """Accuracy, pickled size, load time and per-row latencies of one model."""
+    blob = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+    start = time.perf_counter()
+    pickle.loads(blob)
+    load_seconds = time.perf_counter() - start
+
+    row = X_test.iloc[:1]
+    start = time.perf_counter()
+    for _ in range(max(1, repeat // 10)):
+        model.predict_proba(row)
+    sklearn_row = (time.perf_counter() - start) / max(1, repeat // 10)
+
+    engine = CompiledForest.from_model(model)
+    row = row.to_numpy()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        engine.predict_proba(row)
+    engine_row = (time.perf_counter() - start) / repeat
+
+    return {
+        "accuracy": accuracy_score(y_test, model.predict(X_test)),
+        "nodes": node_count(model),
+        "bytes": len(blob),
+        "load_ms": load_seconds * 1000,
+        "sklearn_us": sklearn_row * 1e6,
+        "engine_us": engine_row * 1e6,
+    }
+
+
+def _describe(name, m):
+    return (f"{name:<24} acc {m['accuracy'] * 100:6.2f}% | {m['nodes']:6d} nodes | "
+            f"{m['bytes'] / 1024:8.1f} KB | load {m['load_ms']:7.2f} ms | "
+            f"sklearn {m['sklearn_us']:8.1f} µs/row | engine {m['engine_us']:6.1f} µs/row")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pick the smallest forest within an accuracy budget.")
+    parser.add_argument("--model", default="heart_model.pkl")
+    parser.add_argument("--data", default="heart.csv")
+    parser.add_argument("--max-loss", type=float, default=0.01,
+                        help="largest allowed drop in held-out accuracy (0.01 = one point)")
+    parser.add_argument("--output", help=f"defaults to {COMPACT_FILENAME} next to --model")
+    args = parser.parse_args(argv)
+
+    import joblib
+
+    model = joblib.load(args.model)
+    X, y = load_dataset(args.data)
+    # Same split as train_model.py, so the test rows were never trained on
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    baseline = measure(model, X_test, y_test)
+    print("\n" + _describe("original", baseline))
+
+    best = None
+    for name, candidate in build_candidates(model, X_train, y_train):
+        metrics = measure(candidate, X_test, y_test)
+        fits = metrics["accuracy"] >= baseline["accuracy"] - args.max_loss
+        print(("✅ " if fits else "   ") + _describe(name, metrics))
+        if fits and (best is None or metrics["nodes"] < best[2]["nodes"]):
+            best = (name, candidate, metrics)
+
+    if best is None:
+        print(f"\n⚠️ No candidate within {args.max_loss * 100:g} points of the original; nothing saved")
+        return None
+
+    name, compact, metrics = best
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(args.model)), COMPACT_FILENAME)
+    joblib.dump(compact, output)
+    save_feature_meta(output, X_train)
+    print(f"\n💾 Saved {name} to {output}")
+
+    print("📊 Before → after:")
+    for key, unit, scale in (("bytes", "KB", 1 / 1024), ("load_ms", "ms", 1), ("sklearn_us", "µs/row", 1),
+                             ("engine_us", "µs/row", 1), ("accuracy", "%", 100)):
+        print(f"   {key:<11} {baseline[key] * scale:10.2f} → {metrics[key] * scale:10.2f} {unit}")
+    return output
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Red / yellow pixel counting for eye ROIs without per-frame allocations.
+
+All three HSV ranges used by the eye detector share the same saturation and
+value bounds (>= 100) and differ only in hue, so one inRange call builds the
+S/V mask and a 180-bin hue histogram under that mask gives the red and
+yellow pixel counts together. The HSV image and the mask are written into
+buffers that are allocated once and only grown when a larger ROI shows up.
+
+ColorAnalyzer instances are not thread-safe; get_color_analyzer() returns
+one per thread.
+"""
+import threading
+
+import cv2
+import numpy as np
+
+from eye_detector import (LOWER_RED_1, UPPER_RED_1, LOWER_RED_2, UPPER_RED_2,
+                          LOWER_YELLOW, UPPER_YELLOW)
+
+
+HUE_BINS = 180  # OpenCV 8-bit hue is 0..179
+DEFAULT_MAX_ROI = (240, 240)
+
+_local = threading.local()
+
+
+def _hue_bins(lower, upper):
+    return slice(lower[0], min(upper[0], HUE_BINS - 1) + 1)
+
+
+class ColorAnalyzer:
+    def __init__(self, max_roi=DEFAULT_MAX_ROI):
+        self.capacity = 0
+        self.reserve(max_roi[0] * max_roi[1])
+
+        # S/V bounds shared by every range; hue is split out with the histogram
+        self.lower_sv = np.array([0, LOWER_RED_1[1], LOWER_RED_1[2]], np.uint8)
+        self.upper_sv = np.array([HUE_BINS, UPPER_RED_1[1], UPPER_RED_1[2]], np.uint8)
+        # Row 0 sums the red hue bins, row 1 the yellow ones
+        self.class_weights = np.zeros((2, HUE_BINS), np.float32)
+        self.class_weights[0, _hue_bins(LOWER_RED_1, UPPER_RED_1)] = 1
+        self.class_weights[0, _hue_bins(LOWER_RED_2, UPPER_RED_2)] = 1
+        self.class_weights[1, _hue_bins(LOWER_YELLOW, UPPER_YELLOW)] = 1
+        self.hist = np.zeros((HUE_BINS, 1), np.float32)
+        self.counts = np.zeros((2, 1), np.float32)
+
+    def reserve(self, pixels):
+        """Makes sure ROIs of up to pixels pixels fit in the buffers."""
+        if pixels > self.capacity:
+            self.capacity = pixels
+            self.hsv_buffer = np.empty(pixels * 3, np.uint8)
+            self.mask_buffer = np.empty(pixels, np.uint8)
+
+    def count(self, bgr_roi):
+        """Returns (red_pixel_count, yellow_pixel_count) for a BGR ROI."""
+        h, w = bgr_roi.shape[:2]
+        self.reserve(h * w)
+        # Contiguous views over the front of the buffers so OpenCV writes in place
+        hsv = self.hsv_buffer[:h * w * 3].reshape(h, w, 3)
+        mask = self.mask_buffer[:h * w].reshape(h, w)
+
+        cv2.cvtColor(bgr_roi, cv2.COLOR_BGR2HSV, dst=hsv)
+        cv2.inRange(hsv, self.lower_sv, self.upper_sv, dst=mask)
+        hist = cv2.calcHist([hsv], [0], mask, [HUE_BINS], [0, HUE_BINS], hist=self.hist)
+
+        np.dot(self.class_weights, hist, out=self.counts)
+        return int(self.counts[0, 0]), int(self.counts[1, 0])
+
+    def ratios(self, bgr_roi):
+        """Returns the (red, yellow) share of the ROI's pixels."""
+        total = bgr_roi.shape[0] * bgr_roi.shape[1]
+        if total == 0:
+            return 0.0, 0.0
+        red, yellow = self.count(bgr_roi)
+        return red / total, yellow / total
+
+
+def get_color_analyzer():
+    """Returns this thread's ColorAnalyzer, creating it on first use."""
+    analyzer = getattr(_local, "analyzer", None)
+    if analyzer is None:
+        analyzer = _local.analyzer = ColorAnalyzer()
+    return analyzer
@@ -0,0 +1,303 @@
+"""Eye disease detection (red eye, jaundice, pupil size) without the Tkinter front end.
+
+cv2 and numpy are imported inside the functions that need them and the Haar
+cascade is loaded on first use, so importing this module is cheap.
+"""
+import math
+import threading
+
+import instrumentation
+from resources import find_resource
+
+
+CASCADE_FILENAME = 'haarcascade_eye.xml'
+WINDOW_NAME = "Eye Disease Detection"
+
+# --- Color Threshold Definitions (HSV) ---
+LOWER_RED_1 = (0, 100, 100)
+UPPER_RED_1 = (10, 255, 255)
+LOWER_RED_2 = (160, 100, 100)
+UPPER_RED_2 = (180, 255, 255)
+LOWER_YELLOW = (20, 100, 100)
+UPPER_YELLOW = (30, 255, 255)
+
+# --- Detection Constants ---
+COLOR_THRESHOLD_PERCENT = 0.05
+NORMAL_PUPIL_RADIUS_MIN = 8
+NORMAL_PUPIL_RADIUS_MAX = 20
+
+# --- Haar Cascade Parameters ---
+DETECT_SCALE_FACTOR = 1.3
+DETECT_MIN_NEIGHBORS = 5
+
+_cascade = None
+_cascade_lock = threading.Lock()
+_pupil_estimator = None  # stateless, so one instance serves every thread
+
+
+def create_eye_cascade():
+    """Loads a new Haar eye cascade. Raises RuntimeError if it cannot be loaded."""
+    import cv2
+
+    cascade_path = find_resource(CASCADE_FILENAME)
+    eye_cascade = cv2.CascadeClassifier(cascade_path)
+    if eye_cascade.empty():
+        raise RuntimeError(f"Could not load eye cascade classifier from {cascade_path}")
+    return eye_cascade
+
+
+def get_eye_cascade():
+    """Returns the shared eye cascade, loading it on first use."""
+    global _cascade
+    if _cascade is None:
+        with _cascade_lock:
+            if _cascade is None:
+                _cascade = create_eye_cascade()
+    return _cascade
+
+
+def detect_eyes(gray, eye_cascade, scale=1.0, pyramid=False):
+    """Runs the cascade over the whole grayscale frame. Returns (x, y, w, h) boxes.
+
+    With scale < 1 the cascade runs on a downsampled copy of the frame
+    (resized with INTER_AREA, or with pyramid=True halved by cv2.pyrDown to
+    the nearest power of two) and the boxes are mapped back to full
+    resolution, so ROI analysis still uses full-resolution pixels.
+    """
+    import cv2
+
+    if scale >= 1.0:
+        return eye_cascade.detectMultiScale(gray, DETECT_SCALE_FACTOR, DETECT_MIN_NEIGHBORS)
+
+    if pyramid:
+        small = gray
+        levels = max(1, round(-math.log2(scale)))
+        for _ in range(levels):
+            small = cv2.pyrDown(small)
+    else:
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    found = eye_cascade.detectMultiScale(small, DETECT_SCALE_FACTOR, DETECT_MIN_NEIGHBORS)
+    frame_h, frame_w = gray.shape[:2]
+    sx, sy = frame_w / small.shape[1], frame_h / small.shape[0]
+    boxes = []
+    for (x, y, w, h) in found:
+        x0, y0 = int(x * sx), int(y * sy)
+        boxes.append((x0, y0, min(int(round(w * sx)), frame_w - x0), min(int(round(h * sy)), frame_h - y0)))
+    return boxes
+
+
+class EyeTracker:
+    """Detect-then-track eye finder.
+
+    Runs full-frame detection every detect_every frames. In between, each
+    previous box is searched for again only inside the box grown by margin
+    (a fraction of its size) on every side, with the cascade limited to
+    similar box sizes. If any eye is lost, the tracker falls back to full
+    detection on that same frame. Full detections honour detect_eyes()'s
+    scale/pyramid options; the small tracking windows always run at full
+    resolution.
+
+    Instances are stateful: feed them consecutive frames of one stream.
+    """
+
+    def __init__(self, eye_cascade, detect_every=10, margin=0.5, scale=1.0, pyramid=False):
+        self.eye_cascade = eye_cascade
+        self.scale = scale
+        self.pyramid = pyramid
+        self.detect_every = max(1, detect_every)
+        self.margin = margin
+        self.boxes = []
+        self.since_detect = 0
+        self.full_detections = 0
+        self.tracked_frames = 0
+
+    def __call__(self, gray):
+        if self.boxes and self.since_detect < self.detect_every - 1:
+            tracked = self.track(gray)
+            if tracked is not None:
+                self.since_detect += 1
+                self.tracked_frames += 1
+                self.boxes = tracked
+                return tracked
+
+        self.full_detections += 1
+        self.since_detect = 0
+        self.boxes = [tuple(int(v) for v in box)
+                      for box in detect_eyes(gray, self.eye_cascade, self.scale, self.pyramid)]
+        return self.boxes
+
+    def track(self, gray):
+        """Re-finds every previous box near where it was. Returns None if one is lost."""
+        frame_h, frame_w = gray.shape[:2]
+        tracked = []
+        for (x, y, w, h) in self.boxes:
+            dx, dy = int(w * self.margin), int(h * self.margin)
+            x0, y0 = max(0, x - dx), max(0, y - dy)
+            x1, y1 = min(frame_w, x + w + dx), min(frame_h, y + h + dy)
+
+            found = self.eye_cascade.detectMultiScale(
+                gray[y0:y1, x0:x1], DETECT_SCALE_FACTOR, DETECT_MIN_NEIGHBORS,
+                minSize=(int(w * 0.7), int(h * 0.7)), maxSize=(int(w * 1.4) + 1, int(h * 1.4) + 1))
+            if len(found) == 0:
+                return None
+
+            # Keep the candidate closest to the previous centre
+            cx, cy = x + w / 2 - x0, y + h / 2 - y0
+            bx, by, bw, bh = min(found, key=lambda b: (b[0] + b[2] / 2 - cx) ** 2 + (b[1] + b[3] / 2 - cy) ** 2)
+            tracked.append((int(bx) + x0, int(by) + y0, int(bw), int(bh)))
+        return tracked
+
+
+def _default_pupil_estimator():
+    global _pupil_estimator
+    if _pupil_estimator is None:
+        from pupil_estimator import DarkBlobPupilEstimator
+        _pupil_estimator = DarkBlobPupilEstimator()
+    return _pupil_estimator
+
+
+def analyze_eyes(frame, eye_cascade, detector=None, pupil_estimator=None, seq=0, timestamp=None):
+    """Detects and analyses the eyes in a BGR frame without drawing on it.
+
+    detector, if given, is called with the grayscale frame and returns the
+    eye boxes (e.g. an EyeTracker); otherwise detect_eyes() is used.
+    pupil_estimator is a pupil_estimator callable; the default is the fast
+    dark-blob estimator without smoothing.
+
+    Returns an eye_results.FrameResult with one EyeRecord per detected eye.
+    Each eye's red/yellow/pupil flags are its own; the frame status is the
+    most serious status of any eye (pupil size, then red, then yellow).
+
+    Stages are timed with instrumentation.stage() when it is enabled.
+    """
+    with instrumentation.stage("eye_analyze"):
+        return _analyze_eyes(frame, eye_cascade, detector, pupil_estimator, seq, timestamp)
+
+
+def _analyze_eyes(frame, eye_cascade, detector, pupil_estimator, seq, timestamp):
+    import cv2
+
+    from eye_color import get_color_analyzer
+    from eye_results import EyeRecord, FrameResult
+
+    stage = instrumentation.stage
+    color_analyzer = get_color_analyzer()
+    if pupil_estimator is None:
+        pupil_estimator = _default_pupil_estimator()
+    pupil_estimator.begin_frame()
+
+    with stage("eye_gray"):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    with stage("eye_detect"):
+        eyes = detector(gray) if detector is not None else detect_eyes(gray, eye_cascade)
+
+    records = []
+    for (x, y, w, h) in eyes:
+        x, y, w, h = int(x), int(y), int(w), int(h)
+        eye_roi = frame[y:y + h, x:x + w]
+        if eye_roi.size == 0:
+            continue
+
+        # --- Red Eye / Yellow Eye (Jaundice) Detection ---
+        with stage("eye_color"):
+            red_ratio, yellow_ratio = color_analyzer.ratios(eye_roi)
+        record = EyeRecord(x, y, w, h, float(red_ratio), float(yellow_ratio),
+                           red=red_ratio > COLOR_THRESHOLD_PERCENT,
+                           yellow=yellow_ratio > COLOR_THRESHOLD_PERCENT)
+
+        # --- Pupil Size/Anomaly Detection ---
+        with stage("eye_pupil"):
+            pupil = pupil_estimator(gray[y:y + h, x:x + w], (x, y))
+        if pupil is not None:
+            record.pupil_x, record.pupil_y, record.pupil_r = pupil
+            if record.pupil_r < NORMAL_PUPIL_RADIUS_MIN:
+                record.pupil_state = 'constricted'
+            elif record.pupil_r > NORMAL_PUPIL_RADIUS_MAX:
+                record.pupil_state = 'dilated'
+
+        records.append(record)
+
+    return FrameResult.from_eyes(records, seq, timestamp)
+
+
+def analyze_frame(frame, eye_cascade, detector=None, pupil_estimator=None):
+    """analyze_eyes() as a dict: 'eyes' (box, pupil circle or None, red/yellow
+    pixel ratios, label text and color) plus the overall 'status' and
+    'status_color'.
+    """
+    return analyze_eyes(frame, eye_cascade, detector, pupil_estimator).as_dict()
+
+
+def draw_analysis(frame, result):
+    """Draws the boxes, pupils and status text of a FrameResult onto the frame."""
+    with instrumentation.stage("eye_draw"):
+        _draw(frame, result)
+
+
+def _draw(frame, result):
+    import cv2
+
+    for eye in result.eyes:
+        x, y, w, h = eye.box
+        if eye.pupil is not None:
+            px, py, radius = eye.pupil
+            # Draw the detected pupil
+            cv2.circle(frame, (px, py), radius, (0, 255, 0), 2)
+            cv2.circle(frame, (px, py), 2, (0, 0, 255), 3)
+
+        text, color = eye.label()
+        cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
+        cv2.putText(frame, text, (x, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+    cv2.putText(frame, result.status.message, (10, frame.shape[0] - 10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, result.status.color, 2)
+
+
+def process_frame(frame, eye_cascade, pupil_estimator=None):
+    """Detects and analyses the eyes in a BGR frame, drawing the results onto it.
+
+    Returns (overall_health_status, overall_color).
+    """
+    result = analyze_eyes(frame, eye_cascade, pupil_estimator=pupil_estimator)
+    draw_analysis(frame, result)
+    return result.status.message, result.status.color
+
+
+def run_eye_detection(source=0):
+    """Runs detection on a camera index or video file until 'q' is pressed or the stream ends."""
+    import cv2
+
+    try:
+        eye_cascade = get_eye_cascade()
+    except RuntimeError as e:
+        print(f"ERROR: {e}")
+        return
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        print("ERROR: Could not open video stream/camera.")
+        return
+
+    from pupil_estimator import make_pupil_estimator
+
+    # One stream, so the pupil radius can be smoothed from frame to frame
+    pupil_estimator = make_pupil_estimator("blob", smoothing=0.4)
+
+    try:
+        while True:
+            with instrumentation.stage("eye_capture"):
+                ret, frame = cap.read()
+            if not ret:
+                break
+
+            process_frame(frame, eye_cascade, pupil_estimator)
+
+            with instrumentation.stage("eye_display"):
+                cv2.imshow(WINDOW_NAME, frame)
+                key = cv2.waitKey(1)
+            if key & 0xFF == ord('q'):
+                break
+    finally:
+        cap.release()
+        cv2.destroyAllWindows()
@@ -0,0 +1,397 @@
+"""Multi-threaded capture -> detect -> render pipeline for the eye detector.
+
+    capture thread --(bounded queue)--> detection workers --(bounded queue)--> delivery stage
+
+The capture thread never waits on detection for live cameras: when the input
+queue is full the oldest frame is dropped, so workers always get the latest
+frame. Each detection worker owns its own Haar cascade. The delivery stage
+(the calling thread) publishes every eye_results.FrameResult on a ResultBus.
+Results of files and image directories go through a small reorder buffer,
+so all of them are published in capture order. A live camera's result that
+finishes after a newer frame's is still published (its seq tells) but
+counted as late and not drawn. Subscribers (e.g. --jsonl logging)
+run on their own threads and can never slow the pipeline down. Drawing and
+display are just one more, optional, consumer: headless runs never render.
+
+Frame sources are pluggable: a camera index, a video file or a directory of
+images, so the pipeline can be benchmarked without a camera.
+
+Usage:
+    python eye_pipeline.py --source 0
+    python eye_pipeline.py --source eyes.avi --workers 4 --headless --jsonl results.jsonl
+    python eye_pipeline.py --source 0 --metrics-file eye_metrics.prom --metrics-interval 30
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+
+import eye_detector
+import instrumentation
+from eye_results import ResultBus, jsonl_writer
+
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+# Leave a core for capture/render; OpenCV also threads inside detectMultiScale
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 1) - 1))
+
+
+# ---------------- FRAME SOURCES ----------------
+class VideoSource:
+    """Camera index or video file read through cv2.VideoCapture."""
+
+    def __init__(self, spec):
+        self.live = isinstance(spec, int)
+        self.name = f"camera {spec}" if self.live else spec
+        self.cap = cv2.VideoCapture(spec)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video stream/camera: {self.name}")
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageDirSource:
+    """Images in a directory, read in sorted filename order."""
+
+    live = False
+
+    def __init__(self, path):
+        self.name = path
+        self.files = sorted(os.path.join(path, f) for f in os.listdir(path)
+                            if f.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.files:
+            raise RuntimeError(f"No images found in {path}")
+        self.position = 0
+
+    def read(self):
+        while self.position < len(self.files):
+            frame = cv2.imread(self.files[self.position])
+            self.position += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def release(self):
+        pass
+
+
+def open_source(spec):
+    """Opens a camera index ("0"), an image directory or a video file."""
+    if isinstance(spec, int) or str(spec).isdigit():
+        return VideoSource(int(spec))
+    if os.path.isdir(spec):
+        return ImageDirSource(spec)
+    return VideoSource(spec)
+
+
+# ---------------- STATS ----------------
+class StageStats:
+    """Thread-safe latency recorder keeping a window of recent samples."""
+
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+
+    def summary(self):
+        with self.lock:
+            samples = sorted(self.samples)
+            count, total = self.count, self.total
+        if not samples:
+            return {"count": 0}
+        return {
+            "count": count,
+            "mean_ms": round(total / count * 1000, 3),
+            "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+            "p95_ms": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))] * 1000, 3),
+            "max_ms": round(samples[-1] * 1000, 3),
+        }
+
+
+# ---------------- PIPELINE ----------------
+def make_detector_factory(track_every=0, detect_scale=1.0, pyramid=False, pupil="blob", pupil_smoothing=None):
+    """Returns a per-worker factory building analyze(frame) with its own cascade.
+
+    With track_every > 1 each worker runs full detection every track_every
+    frames it sees and tracks the eyes in between (best with one worker,
+    since each tracker then sees consecutive frames). detect_scale < 1 runs
+    the cascade on a downsampled frame; see eye_detector.detect_eyes().
+    pupil picks the pupil estimator ('blob' or 'hough') and pupil_smoothing
+    its radius EMA weight (see pupil_estimator.py).
+    """
+    def factory():
+        return make_analyzer(eye_detector.create_eye_cascade(), track_every, detect_scale, pyramid,
+                             pupil, pupil_smoothing)
+    return factory
+
+
+def make_analyzer(eye_cascade, track_every=0, detect_scale=1.0, pyramid=False, pupil="blob",
+                  pupil_smoothing=None):
+    """Returns analyze(frame) -> FrameResult using eye_cascade with the given detection strategy."""
+    from pupil_estimator import make_pupil_estimator
+
+    pupil_estimator = make_pupil_estimator(pupil, pupil_smoothing)
+    if track_every > 1:
+        detector = eye_detector.EyeTracker(eye_cascade, track_every, scale=detect_scale, pyramid=pyramid)
+    elif detect_scale < 1.0:
+        detector = lambda gray: eye_detector.detect_eyes(gray, eye_cascade, detect_scale, pyramid)
+    else:
+        detector = None
+    return lambda frame: eye_detector.analyze_eyes(frame, eye_cascade, detector, pupil_estimator)
+
+
+class EyePipeline:
+    def __init__(self, source, workers=DEFAULT_WORKERS, queue_size=4, drop_frames=None, display=True,
+                 max_frames=None, detector_factory=None, bus=None):
+        self.source = source
+        self.workers = workers
+        self.display = display
+        self.max_frames = max_frames
+        # Live cameras drop stale frames by default; files are processed frame by frame
+        self.drop_frames = source.live if drop_frames is None else drop_frames
+        # Called once per worker; returns analyze(frame) -> FrameResult
+        self.detector_factory = detector_factory or make_detector_factory()
+        self.bus = bus or ResultBus()
+
+        self.frames_in = queue.Queue(maxsize=queue_size)
+        self.results = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+
+        self.stats = {name: StageStats() for name in ("capture", "detect", "render", "end_to_end")}
+        self.captured = 0
+        self.dropped = 0
+        self.late = 0
+        self.delivered = 0
+        self.elapsed = 0.0
+
+    def capture_loop(self):
+        seq = 0
+        try:
+            while not self.stop_event.is_set():
+                if self.max_frames is not None and seq >= self.max_frames:
+                    break
+                start = time.perf_counter()
+                ret, frame = self.source.read()
+                if not ret:
+                    break
+                elapsed = time.perf_counter() - start
+                self.stats["capture"].record(elapsed)
+                instrumentation.record("eye_capture", elapsed)
+                item = (seq, frame, start, time.time())
+                seq += 1
+                self.captured += 1
+
+                if not self.drop_frames:
+                    self.frames_in.put(item)
+                    continue
+                while True:
+                    try:
+                        self.frames_in.put_nowait(item)
+                        break
+                    except queue.Full:
+                        # Keep only the freshest frames for the workers
+                        try:
+                            self.frames_in.get_nowait()
+                            self.dropped += 1
+                        except queue.Empty:
+                            pass
+        finally:
+            for _ in range(self.workers):
+                self.frames_in.put(None)
+
+    def detect_loop(self):
+        try:
+            analyze = self.detector_factory()
+            while True:
+                item = self.frames_in.get()
+                if item is None:
+                    break
+                seq, frame, captured_at, timestamp = item
+                start = time.perf_counter()
+                result = analyze(frame)
+                self.stats["detect"].record(time.perf_counter() - start)
+                result.seq, result.timestamp = seq, timestamp
+                self.results.put((frame, result, captured_at))
+        finally:
+            self.results.put(None)
+
+    def run(self):
+        """Runs until the source ends, 'q' is pressed or stop() is called. Returns report()."""
+        threads = [threading.Thread(target=self.capture_loop, name="capture", daemon=True)]
+        threads += [threading.Thread(target=self.detect_loop, name=f"detect-{i}", daemon=True)
+                    for i in range(self.workers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+
+        finished_workers = 0
+        last_seq = -1
+        # Lossless sources: results that finished ahead of an earlier frame, by seq
+        pending = {}
+        next_seq = 0
+        try:
+            while finished_workers < self.workers:
+                item = self.results.get()
+                if item is None:
+                    finished_workers += 1
+                    continue
+                if self.drop_frames:
+                    seq = item[1].seq
+                    late = seq < last_seq
+                    # A newer frame was already shown: publish this one, but don't draw it
+                    self.late += late
+                    self._deliver(*item, show=not late)
+                    last_seq = max(last_seq, seq)
+                    continue
+                pending[item[1].seq] = item
+                while next_seq in pending:
+                    self._deliver(*pending.pop(next_seq))
+                    next_seq += 1
+        finally:
+            self.stop()
+            # Unblock any worker still waiting to hand over a result
+            while any(t.is_alive() for t in threads[1:]):
+                try:
+                    self.results.get(timeout=0.05)
+                except queue.Empty:
+                    pass
+            # Only left after an early stop; publish what did finish, still in order
+            for seq in sorted(pending):
+                self._deliver(*pending.pop(seq), show=False)
+            self.elapsed = time.perf_counter() - start
+            self.source.release()
+            self.bus.close()
+            if self.display:
+                cv2.destroyAllWindows()
+        return self.report()
+
+    def _deliver(self, frame, result, captured_at, show=True):
+        """Publishes one result and, with show and display on, draws and shows it."""
+        self.bus.publish(result)
+        if show and self.display:
+            render_start = time.perf_counter()
+            eye_detector.draw_analysis(frame, result)
+            with instrumentation.stage("eye_display"):
+                cv2.imshow(eye_detector.WINDOW_NAME, frame)
+                key = cv2.waitKey(1)
+            if key & 0xFF == ord('q'):
+                self.stop()
+            self.stats["render"].record(time.perf_counter() - render_start)
+        end_to_end = time.perf_counter() - captured_at
+        self.stats["end_to_end"].record(end_to_end)
+        instrumentation.record("eye_end_to_end", end_to_end)
+        self.delivered += 1
+
+    def stop(self):
+        self.stop_event.set()
+
+    def report(self):
+        fps = self.delivered / self.elapsed if self.elapsed > 0 else 0.0
+        return {
+            "source": self.source.name,
+            "workers": self.workers,
+            "frames_captured": self.captured,
+            "frames_dropped": self.dropped,
+            "frames_late": self.late,
+            "frames_delivered": self.delivered,
+            "elapsed_s": round(self.elapsed, 3),
+            "fps": round(fps, 2),
+            "stages": {name: stats.summary() for name, stats in self.stats.items()},
+            "subscribers": self.bus.stats(),
+        }
+
+
+def print_report(report):
+    print(f"📊 {report['source']}: {report['frames_delivered']} frames delivered in "
+          f"{report['elapsed_s']:.2f}s ({report['fps']:.1f} FPS end-to-end), "
+          f"{report['frames_dropped']} dropped, {report['frames_late']} late")
+    for name, summary in report["stages"].items():
+        if summary["count"]:
+            print(f"   {name:<11} mean {summary['mean_ms']:7.2f} ms | p50 {summary['p50_ms']:7.2f} ms"
+                  f" | p95 {summary['p95_ms']:7.2f} ms | max {summary['max_ms']:7.2f} ms")
+    for name, counts in report.get("subscribers", {}).items():
+        print(f"   {name:<11} {counts['delivered']} delivered, {counts['dropped']} dropped, "
+              f"{counts['errors']} failed")
+
+
+def run_pipeline(source=0, workers=DEFAULT_WORKERS, display=True, jsonl=None, **kwargs):
+    """Opens source and runs the pipeline on it, printing the stage report.
+
+    jsonl, if given, is a file every FrameResult is appended to as a JSON line.
+    """
+    try:
+        frame_source = open_source(source)
+    except RuntimeError as e:
+        print(f"ERROR: {e}")
+        return None
+    bus = kwargs.pop("bus", None) or ResultBus()
+    writer = None
+    if jsonl:
+        writer = jsonl_writer(jsonl)
+        bus.subscribe(writer, maxsize=256, name="jsonl")
+    try:
+        report = EyePipeline(frame_source, workers=workers, display=display, bus=bus, **kwargs).run()
+    finally:
+        if writer is not None:
+            writer.file.close()
+    print_report(report)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the threaded eye detection pipeline.")
+    parser.add_argument("--source", default="0", help="camera index, video file or image directory")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="detection worker threads")
+    parser.add_argument("--queue-size", type=int, default=4, help="capacity of each stage queue")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--track-every", type=int, default=0,
+                        help="full detection every N frames, tracking in between (0 = every frame)")
+    parser.add_argument("--detect-scale", type=float, default=1.0,
+                        help="run the cascade on the frame resized by this factor (e.g. 0.5)")
+    parser.add_argument("--pyramid", action="store_true",
+                        help="downsample with cv2.pyrDown instead of resize")
+    parser.add_argument("--pupil", choices=["blob", "hough"], default="blob", help="pupil estimator")
+    parser.add_argument("--pupil-smoothing", type=float,
+                        help="EMA weight of each new pupil radius, e.g. 0.4 (default: no smoothing)")
+    parser.add_argument("--headless", action="store_true", help="don't draw or display frames")
+    parser.add_argument("--jsonl", help="append every frame's results to this JSON-lines file")
+    parser.add_argument("--metrics", action="store_true", help="time every stage (see instrumentation.py)")
+    parser.add_argument("--metrics-file", help="export stage timings here (.prom or .jsonl); implies --metrics")
+    parser.add_argument("--metrics-interval", type=float, default=60.0,
+                        help="seconds between stage timing summaries")
+    drop = parser.add_mutually_exclusive_group()
+    drop.add_argument("--drop", dest="drop_frames", action="store_const", const=True,
+                      help="drop stale frames (default for cameras)")
+    drop.add_argument("--no-drop", dest="drop_frames", action="store_const", const=False,
+                      help="process every frame (default for files)")
+    args = parser.parse_args(argv)
+
+    if args.metrics or args.metrics_file:
+        instrumentation.start_reporter(args.metrics_interval, args.metrics_file)
+    else:
+        instrumentation.configure_from_env()
+    run_pipeline(args.source, workers=args.workers, display=not args.headless, jsonl=args.jsonl,
+                 queue_size=args.queue_size, drop_frames=args.drop_frames,
+                 max_frames=args.max_frames,
+                 detector_factory=make_detector_factory(args.track_every, args.detect_scale, args.pyramid,
+                                                        args.pupil, args.pupil_smoothing))
+    instrumentation.stop_reporter()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Typed per-frame eye results and a non-blocking publisher for them.
+
+eye_detector.analyze_eyes() returns a FrameResult: a frame sequence number
+and timestamp, the overall EyeStatus, and one compact EyeRecord per
+detected eye (plus the name of the stream it came from, when several are
+analysed together). Records hold numbers only; labels, colours and the status
+message are derived when something (e.g. the renderer) asks for them.
+
+ResultBus fans results out to subscribers. Each subscriber has its own
+bounded queue and thread, and publish() never blocks: when a subscriber falls
+behind, its oldest undelivered result is dropped (and counted), so slow
+logging or alerting can never stall capture or detection.
+"""
+import json
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from enum import IntEnum
+
+
+class EyeStatus(IntEnum):
+    """Overall frame status, in increasing order of priority."""
+
+    NO_EYES = 0
+    NORMAL = 1
+    YELLOW = 2
+    RED = 3
+    CONSTRICTED = 4
+    DILATED = 5
+
+    @property
+    def message(self):
+        return STATUS_MESSAGES[self]
+
+    @property
+    def color(self):
+        return STATUS_COLORS[self]
+
+
+STATUS_MESSAGES = {
+    EyeStatus.NO_EYES: "Looking for Eyes...",
+    EyeStatus.NORMAL: "✅ Eye(s) Detected - Appears Normal",
+    EyeStatus.YELLOW: "⚠️ POSSIBLE YELLOW EYE ISSUE (Jaundice)",
+    EyeStatus.RED: "⚠️ POSSIBLE RED EYE ISSUE",
+    EyeStatus.CONSTRICTED: "⚠️ CONSTRICTED PUPIL DETECTED (Miosis)",
+    EyeStatus.DILATED: "⚠️ DILATED PUPIL DETECTED (Mydriasis)",
+}
+STATUS_COLORS = {  # BGR
+    EyeStatus.NO_EYES: (255, 255, 255),
+    EyeStatus.NORMAL: (0, 255, 0),
+    EyeStatus.YELLOW: (0, 255, 255),
+    EyeStatus.RED: (0, 0, 255),
+    EyeStatus.CONSTRICTED: (255, 0, 255),
+    EyeStatus.DILATED: (255, 0, 255),
+}
+
+
+@dataclass(slots=True)
+class EyeRecord:
+    """One detected eye. Pupil fields are -1 when no pupil was found."""
+
+    x: int
+    y: int
+    w: int
+    h: int
+    red_ratio: float
+    yellow_ratio: float
+    pupil_x: int = -1
+    pupil_y: int = -1
+    pupil_r: int = -1
+    red: bool = False
+    yellow: bool = False
+    pupil_state: str = ""  # "", "constricted" or "dilated"
+
+    @property
+    def box(self):
+        return self.x, self.y, self.w, self.h
+
+    @property
+    def pupil(self):
+        return None if self.pupil_r < 0 else (self.pupil_x, self.pupil_y, self.pupil_r)
+
+    @property
+    def status(self):
+        """This eye's own status, by the same priority as the frame status."""
+        if self.pupil_state == "dilated":
+            return EyeStatus.DILATED
+        if self.pupil_state == "constricted":
+            return EyeStatus.CONSTRICTED
+        if self.red:
+            return EyeStatus.RED
+        if self.yellow:
+            return EyeStatus.YELLOW
+        return EyeStatus.NORMAL
+
+    def label(self):
+        """(text, BGR color) shown next to the eye's box."""
+        color = (0, 255, 255)
+        text = "Eye Detected"
+        if self.red:
+            color, text = (0, 0, 255), "Red Eye Detected"
+        elif self.yellow:
+            color, text = (0, 255, 255), "Yellow Eye Detected"
+        if self.pupil_state:
+            text += f", {self.pupil_state.capitalize()} Pupil"
+            color = (255, 0, 255)
+        return text, color
+
+    def as_dict(self):
+        text, color = self.label()
+        return {"box": self.box, "pupil": self.pupil, "red_ratio": self.red_ratio,
+                "yellow_ratio": self.yellow_ratio, "text": text, "color": color}
+
+
+@dataclass(slots=True)
+class FrameResult:
+    seq: int
+    timestamp: float
+    status: EyeStatus
+    eyes: tuple = ()
+    source: str = ""
+
+    @classmethod
+    def from_eyes(cls, eyes, seq=0, timestamp=None):
+        """Frame status is the highest-priority status of any eye (NO_EYES if none)."""
+        status = max((eye.status for eye in eyes), default=EyeStatus.NO_EYES)
+        return cls(seq, time.time() if timestamp is None else timestamp, status, tuple(eyes))
+
+    def as_dict(self):
+        """The dict layout returned by eye_detector.analyze_frame()."""
+        return {"eyes": [eye.as_dict() for eye in self.eyes], "status": self.status.message,
+                "status_color": self.status.color}
+
+    def to_json(self):
+        return json.dumps({"source": self.source, "seq": self.seq, "timestamp": round(self.timestamp, 6),
+                           "status": self.status.name,
+                           "eyes": [{"box": eye.box, "pupil": eye.pupil,
+                                     "red_ratio": round(eye.red_ratio, 5),
+                                     "yellow_ratio": round(eye.yellow_ratio, 5),
+                                     "status": eye.status.name} for eye in self.eyes]})
+
+
+# ---------------- PUBLISHING ----------------
+class Subscription:
+    """A subscriber's bounded queue and the thread that feeds its callback."""
+
+    def __init__(self, callback, maxsize=64, name=None):
+        self.callback = callback
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.thread = threading.Thread(target=self._run, name=name or f"results-{id(self):x}", daemon=True)
+        self.thread.start()
+
+    def offer(self, result):
+        while True:
+            try:
+                self.queue.put_nowait(result)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        while True:
+            result = self.queue.get()
+            if result is None:
+                break
+            try:
+                self.callback(result)
+            except Exception as e:
+                # A broken consumer must not take the pipeline down with it
+                self.errors += 1
+                if self.errors == 1:
+                    print(f"⚠️ Result subscriber {self.thread.name} failed: {e}")
+            else:
+                self.delivered += 1
+
+    def close(self, timeout=None):
+        # The sentinel must get in even if the queue is full
+        self.offer(None)
+        self.thread.join(timeout)
+
+
+class ResultBus:
+    def __init__(self):
+        self.subscriptions = []
+
+    def subscribe(self, callback, maxsize=64, name=None):
+        """Calls callback(result) on its own thread for every published result."""
+        subscription = Subscription(callback, maxsize, name)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def publish(self, result):
+        """Hands result to every subscriber without blocking."""
+        for subscription in self.subscriptions:
+            subscription.offer(result)
+
+    def close(self, timeout=5.0):
+        """Delivers what is queued, then stops the subscriber threads."""
+        for subscription in self.subscriptions:
+            subscription.close(timeout)
+
+    def stats(self):
+        return {s.thread.name: {"delivered": s.delivered, "dropped": s.dropped, "errors": s.errors}
+                for s in self.subscriptions}
+
+
+def jsonl_writer(path):
+    """Subscriber callback appending each result as one JSON line to path."""
+    f = open(path, "a", buffering=1 << 16)
+
+    def write(result):
+        f.write(result.to_json() + "\n")
+    write.file = f
+    return write
@@ -0,0 +1,324 @@
+"""Eye screening on several video sources at once with one shared worker pool.
+
+    capture thread per source --(per-stream slot queue)--> scheduler --> N detection workers
+
+Every source (camera index, video file or image directory) has its own
+capture thread and a small queue of its newest frames. A fixed pool of
+detection workers, each with its own Haar cascade loaded once, serves all
+streams. The scheduler hands out frames round-robin: a worker takes the
+next stream after the one served last that has a frame waiting and no
+frame already in flight, so a fast camera cannot starve a slow one and
+each stream's frames are analysed in order (which keeps per-stream pupil
+smoothing valid).
+
+Under overload, frames are dropped rather than queued. A full stream queue
+drops its oldest frame, and a frame older than --max-age when its turn
+comes is skipped as stale. Files are read as fast as the workers take them,
+without drops or staleness checks, unless --pace plays them back at their own
+frame rate like a camera.
+
+Results are published on an eye_results.ResultBus with FrameResult.source
+set to the stream name. Per-stream FPS, queue depth, dropped and stale
+frames and detection latency are printed every --report-every seconds and
+at the end.
+
+Usage:
+    python eye_streams.py --sources 0 1 --workers 2
+    python eye_streams.py --sources a.avi b.avi c.avi --workers 2 --pace --headless --jsonl results.jsonl
+"""
+import argparse
+import threading
+import time
+from collections import deque
+
+import cv2
+
+import eye_detector
+from eye_pipeline import DEFAULT_WORKERS, StageStats, open_source
+from eye_results import ResultBus, jsonl_writer
+
+
+DEFAULT_MAX_AGE = 0.5
+DEFAULT_FPS = 30.0
+
+
+class Stream:
+    """One source: its newest frames, per-stream analysis state and counters."""
+
+    def __init__(self, index, source, queue_size=2, pace=False, pupil="blob", pupil_smoothing=None):
+        from pupil_estimator import make_pupil_estimator
+
+        self.index = index
+        self.source = source
+        self.name = source.name
+        self.frames = deque()
+        self.queue_size = queue_size
+        # Cameras and paced files drop their oldest frame when full; plain files wait
+        self.drop_frames = source.live or pace
+        self.pace = pace and not source.live
+        self.busy = False
+        self.finished = False
+        # Only ever used by the one worker holding this stream's in-flight frame
+        self.pupil_estimator = make_pupil_estimator(pupil, pupil_smoothing)
+
+        self.captured = 0
+        self.dropped = 0
+        self.stale = 0
+        self.analyzed = 0
+        self.max_depth = 0
+        self.detect = StageStats()
+        self.started = time.perf_counter()
+        self.recent = deque(maxlen=60)  # completion times, for the current FPS
+
+
+class StreamScheduler:
+    def __init__(self, sources, workers=DEFAULT_WORKERS, queue_size=2, max_age=DEFAULT_MAX_AGE, pace=False,
+                 detect_scale=1.0, pyramid=False, pupil="blob", pupil_smoothing=None, display=True,
+                 bus=None):
+        self.streams = [Stream(i, source, queue_size, pace, pupil, pupil_smoothing)
+                        for i, source in enumerate(sources)]
+        self.workers = workers
+        self.max_age = max_age
+        self.detect_scale = detect_scale
+        self.pyramid = pyramid
+        self.display = display
+        self.bus = bus or ResultBus()
+
+        self.lock = threading.Lock()
+        self.ready = threading.Condition(self.lock)
+        self.stop_event = threading.Event()
+        self.next_stream = 0
+        # Newest (frame, result) per stream, for the display
+        self.latest = {}
+        self.elapsed = 0.0
+
+    # ---------------- CAPTURE ----------------
+    def capture_loop(self, stream):
+        fps = stream.source.cap.get(cv2.CAP_PROP_FPS) if hasattr(stream.source, "cap") else 0.0
+        interval = 1.0 / (fps or DEFAULT_FPS)
+        start = time.perf_counter()
+        try:
+            while not self.stop_event.is_set():
+                if stream.pace:
+                    delay = start + stream.captured * interval - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                ret, frame = stream.source.read()
+                if not ret:
+                    break
+                item = (stream.captured, frame, time.perf_counter(), time.time())
+                with self.ready:
+                    stream.captured += 1
+                    if len(stream.frames) >= stream.queue_size:
+                        if stream.drop_frames:
+                            stream.frames.popleft()
+                            stream.dropped += 1
+                        else:
+                            while len(stream.frames) >= stream.queue_size and not self.stop_event.is_set():
+                                self.ready.wait(0.1)
+                    stream.frames.append(item)
+                    stream.max_depth = max(stream.max_depth, len(stream.frames))
+                    self.ready.notify()
+        finally:
+            with self.ready:
+                stream.finished = True
+                self.ready.notify_all()
+            stream.source.release()
+
+    # ---------------- SCHEDULING ----------------
+    def _take(self):
+        """Next (stream, item) in round-robin order, or None if a stream needs waiting for."""
+        now = time.perf_counter()
+        n = len(self.streams)
+        for offset in range(n):
+            stream = self.streams[(self.next_stream + offset) % n]
+            if stream.busy:
+                continue
+            while stream.frames:
+                item = stream.frames.popleft()
+                if stream.drop_frames and self.max_age and now - item[2] > self.max_age:
+                    # Too old to be worth a detector's time; a newer one is coming
+                    stream.stale += 1
+                    continue
+                stream.busy = True
+                self.next_stream = (stream.index + 1) % n
+                # The capture thread may be waiting for room
+                self.ready.notify_all()
+                return stream, item
+        return None
+
+    def next_frame(self):
+        """Blocks until a frame is due; returns (stream, item), or None when everything has ended."""
+        with self.ready:
+            while True:
+                if self.stop_event.is_set():
+                    return None
+                taken = self._take()
+                if taken is not None:
+                    return taken
+                if all(s.finished and not s.frames for s in self.streams):
+                    return None
+                self.ready.wait(0.1)
+
+    def done(self, stream):
+        with self.ready:
+            stream.busy = False
+            self.ready.notify_all()
+
+    # ---------------- WORKERS ----------------
+    def worker_loop(self):
+        eye_cascade = eye_detector.create_eye_cascade()
+        if self.detect_scale < 1.0:
+            detector = lambda gray: eye_detector.detect_eyes(gray, eye_cascade, self.detect_scale, self.pyramid)
+        else:
+            detector = None
+        while True:
+            taken = self.next_frame()
+            if taken is None:
+                break
+            stream, (seq, frame, captured_at, timestamp) = taken
+            try:
+                start = time.perf_counter()
+                result = eye_detector.analyze_eyes(frame, eye_cascade, detector, stream.pupil_estimator,
+                                                   seq, timestamp)
+                now = time.perf_counter()
+                result.source = stream.name
+                stream.detect.record(now - start)
+                stream.analyzed += 1
+                stream.recent.append(now)
+                self.bus.publish(result)
+                if self.display:
+                    self.latest[stream.index] = (frame, result)
+            finally:
+                self.done(stream)
+
+    # ---------------- DRIVER ----------------
+    def run(self, report_every=0.0):
+        """Runs until every source ends, 'q' is pressed or stop() is called. Returns report()."""
+        threads = [threading.Thread(target=self.capture_loop, args=(s,), name=f"capture-{s.index}", daemon=True)
+                   for s in self.streams]
+        workers = [threading.Thread(target=self.worker_loop, name=f"detect-{i}", daemon=True)
+                   for i in range(self.workers)]
+        start = time.perf_counter()
+        for t in threads + workers:
+            t.start()
+
+        next_report = start + report_every
+        try:
+            while any(w.is_alive() for w in workers):
+                if self.display:
+                    self._show()
+                    if cv2.waitKey(15) & 0xFF == ord('q'):
+                        self.stop()
+                else:
+                    workers[0].join(0.05)
+                if report_every and time.perf_counter() >= next_report:
+                    next_report += report_every
+                    print_report(self.report())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            for t in threads + workers:
+                t.join(2.0)
+            self.elapsed = time.perf_counter() - start
+            self.bus.close()
+            if self.display:
+                cv2.destroyAllWindows()
+        return self.report()
+
+    def _show(self):
+        for index in list(self.latest):
+            # Drawn here rather than by the worker, and only the newest frame per stream
+            frame, result = self.latest.pop(index)
+            eye_detector.draw_analysis(frame, result)
+            cv2.imshow(f"{eye_detector.WINDOW_NAME} - {result.source}", frame)
+
+    def stop(self):
+        self.stop_event.set()
+        with self.ready:
+            self.ready.notify_all()
+
+    def report(self):
+        now = time.perf_counter()
+        streams = []
+        for s in self.streams:
+            elapsed = now - s.started
+            recent = list(s.recent)
+            span = recent[-1] - recent[0] if len(recent) > 1 else 0.0
+            current = (len(recent) - 1) / span if span > 0 else 0.0
+            streams.append({
+                "name": s.name,
+                "frames_captured": s.captured,
+                "frames_analyzed": s.analyzed,
+                "frames_dropped": s.dropped,
+                "frames_stale": s.stale,
+                "queue_depth": len(s.frames),
+                "max_queue_depth": s.max_depth,
+                "fps": round(s.analyzed / elapsed, 2) if elapsed > 0 else 0.0,
+                "current_fps": round(current, 2),
+                "detect": s.detect.summary(),
+            })
+        return {"workers": self.workers, "elapsed_s": round(self.elapsed or now - self.streams[0].started, 3),
+                "streams": streams, "subscribers": self.bus.stats()}
+
+
+def print_report(report):
+    print(f"📊 {len(report['streams'])} streams on {report['workers']} workers, {report['elapsed_s']:.1f}s")
+    for s in report["streams"]:
+        detect = s["detect"]
+        latency = f"detect p50 {detect['p50_ms']:6.1f} ms" if detect["count"] else "no frames yet"
+        print(f"   {s['name']:<24} {s['fps']:6.1f} FPS (now {s['current_fps']:5.1f}) | "
+              f"{s['frames_analyzed']}/{s['frames_captured']} analysed, {s['frames_dropped']} dropped, "
+              f"{s['frames_stale']} stale | queue {s['queue_depth']} (max {s['max_queue_depth']}) | {latency}")
+
+
+def run_streams(sources, workers=DEFAULT_WORKERS, display=True, jsonl=None, report_every=0.0, **kwargs):
+    """Opens every source and screens them together, printing the per-stream report."""
+    try:
+        opened = [open_source(source) for source in sources]
+    except RuntimeError as e:
+        print(f"ERROR: {e}")
+        return None
+    bus = ResultBus()
+    writer = None
+    if jsonl:
+        writer = jsonl_writer(jsonl)
+        bus.subscribe(writer, maxsize=256, name="jsonl")
+    try:
+        report = StreamScheduler(opened, workers, display=display, bus=bus, **kwargs).run(report_every)
+    finally:
+        if writer is not None:
+            writer.file.close()
+    print_report(report)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Screen several video sources with one detection worker pool.")
+    parser.add_argument("--sources", nargs="+", default=["0"],
+                        help="camera indexes, video files or image directories")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="detection worker threads")
+    parser.add_argument("--queue-size", type=int, default=2, help="newest frames kept per stream")
+    parser.add_argument("--max-age", type=float, default=DEFAULT_MAX_AGE,
+                        help="skip frames older than this many seconds (0 = never)")
+    parser.add_argument("--pace", action="store_true", help="play files back at their own frame rate")
+    parser.add_argument("--detect-scale", type=float, default=1.0,
+                        help="run the cascade on the frame resized by this factor (e.g. 0.5)")
+    parser.add_argument("--pyramid", action="store_true", help="downsample with cv2.pyrDown instead of resize")
+    parser.add_argument("--pupil", choices=["blob", "hough"], default="blob", help="pupil estimator")
+    parser.add_argument("--pupil-smoothing", type=float,
+                        help="EMA weight of each new pupil radius, per stream (default: no smoothing)")
+    parser.add_argument("--report-every", type=float, default=0.0, help="seconds between metric reports")
+    parser.add_argument("--headless", action="store_true", help="don't draw or display frames")
+    parser.add_argument("--jsonl", help="append every frame's results to this JSON-lines file")
+    args = parser.parse_args(argv)
+
+    run_streams(args.sources, args.workers, display=not args.headless, jsonl=args.jsonl,
+                report_every=args.report_every, queue_size=args.queue_size, max_age=args.max_age,
+                pace=args.pace, detect_scale=args.detect_scale, pyramid=args.pyramid, pupil=args.pupil,
+                pupil_smoothing=args.pupil_smoothing)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Builds model input rows from patient records using metadata saved with the model.
+
+train_model.py writes heart_model.meta.json next to heart_model.pkl:
+
+    feature_columns  the column order the model was fitted on
+    defaults         value used for a missing feature: the training-set mode
+                     for categorical columns, the median for continuous ones
+
+FeatureVectorizer fills a preallocated float32 buffer from a single record
+(dict), a list of records, or a columnar batch (DataFrame or dict of arrays).
+Defaults are only for what was never collected. In a record, the features
+in OPTIONAL_FEATURES (the ones the GUI has no field for) may be left out and
+take the default; any other absent feature, and any value that is None,
+blank or NaN, raises ValueError. Columnar data must have every feature
+column and no blank values unless allow_missing=True. Unknown keys are
+rejected. Text values go through CONVERTERS on both paths.
+
+The buffer only grows, so steady-state scoring allocates nothing per call,
+and the returned array is a view that is overwritten by the next call.
+
+Vectorizers are not thread-safe; heart_predictor.get_vectorizer() returns
+one per thread.
+"""
+import json
+import os
+
+import numpy as np
+
+from heart_dataset import FEATURE_COLUMNS, SCHEMA
+
+
+META_SUFFIX = ".meta.json"
+# Integer columns with at most this many distinct allowed values are imputed with the mode
+MAX_CATEGORIES = 5
+# Features the GUI does not collect; the only ones a record may leave out
+OPTIONAL_FEATURES = ("cp", "restecg", "slope", "ca", "thal")
+
+
+def meta_path_for(model_path):
+    return os.path.splitext(model_path)[0] + META_SUFFIX
+
+
+def compute_defaults(X):
+    """Training-set mode (categorical) or median (continuous) per column of X."""
+    defaults = {}
+    for column in X.columns:
+        dtype, low, high = SCHEMA.get(column, ("float32", None, None))
+        categorical = dtype.startswith("int") and high - low + 1 <= MAX_CATEGORIES
+        value = X[column].mode().iloc[0] if categorical else X[column].median()
+        defaults[column] = round(float(value), 6)
+    return defaults
+
+
+def save_feature_meta(model_path, X):
+    """Writes the feature order and imputation defaults of X next to model_path."""
+    meta = {"feature_columns": list(X.columns), "defaults": compute_defaults(X), "rows": len(X)}
+    path = meta_path_for(model_path)
+    with open(path, "w") as f:
+        json.dump(meta, f, indent=2)
+    return path
+
+
+def load_feature_meta(model_path):
+    """Returns the saved metadata, or None if the model has none."""
+    try:
+        with open(meta_path_for(model_path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _encode_sex(value):
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if not text:
+            return np.nan
+        if text in ("m", "male", "1"):
+            return 1.0
+        if text in ("f", "female", "0"):
+            return 0.0
+        raise ValueError(f"sex must be M or F, not {value!r}")
+    return value
+
+
+# Record fields that arrive as text from the GUI or JSON
+CONVERTERS = {"sex": _encode_sex}
+
+
+class FeatureVectorizer:
+    def __init__(self, feature_columns=FEATURE_COLUMNS, defaults=None, capacity=256):
+        self.feature_columns = list(feature_columns)
+        self.index = {c: j for j, c in enumerate(self.feature_columns)}
+        self.required = [c for c in self.feature_columns if c not in OPTIONAL_FEATURES]
+        defaults = defaults or {}
+        self.defaults = np.array([defaults.get(c, 0.0) for c in self.feature_columns], dtype=np.float32)
+        self.buffer = np.empty((0, len(self.feature_columns)), dtype=np.float32)
+        self.missing = np.empty((0, len(self.feature_columns)), dtype=bool)
+        self.reserve(capacity)
+
+    @classmethod
+    def for_model(cls, model_path, **kwargs):
+        """Vectorizer for the model at model_path, from its saved metadata if present."""
+        meta = load_feature_meta(model_path)
+        if meta is None:
+            return cls(**kwargs)
+        return cls(meta["feature_columns"], meta["defaults"], **kwargs)
+
+    def reserve(self, rows):
+        """Grows the buffers to hold at least rows rows (doubling, never shrinking)."""
+        if rows > len(self.buffer):
+            capacity = max(rows, 2 * len(self.buffer))
+            self.buffer = np.empty((capacity, len(self.feature_columns)), dtype=np.float32)
+            self.missing = np.empty(self.buffer.shape, dtype=bool)
+
+    def _check_keys(self, keys):
+        unknown = [k for k in keys if k not in self.index]
+        if unknown:
+            raise ValueError(f"unknown features {unknown}; expected some of {self.feature_columns}")
+
+    def _impute(self, n, allow_missing=False):
+        out, missing = self.buffer[:n], self.missing[:n]
+        np.isnan(out, out=missing)
+        if not missing.any():
+            return out
+        if not allow_missing:
+            counts = missing.sum(axis=0)
+            blank = {c: int(counts[j]) for j, c in enumerate(self.feature_columns) if counts[j]}
+            raise ValueError(f"missing values (rows per feature): {blank}")
+        np.copyto(out, self.defaults, where=missing)
+        return out
+
+    def _fill_row(self, row, record):
+        self._check_keys(record)
+        absent = [c for c in self.required if c not in record]
+        if absent:
+            raise ValueError(f"missing features {absent}; only {list(OPTIONAL_FEATURES)} may be left out")
+        row[:] = self.defaults
+        for key, value in record.items():
+            if value is None or (isinstance(value, str) and not value.strip()):
+                raise ValueError(f"no value given for {key}")
+            row[self.index[key]] = CONVERTERS[key](value) if key in CONVERTERS else value
+
+    def transform_one(self, record):
+        """One dict record -> (1, n_features) view."""
+        self._fill_row(self.buffer[0], record)
+        return self._impute(1)
+
+    def transform_records(self, records):
+        """List of dict records -> (n, n_features) view."""
+        self.reserve(len(records))
+        for row, record in zip(self.buffer, records):
+            self._fill_row(row, record)
+        return self._impute(len(records))
+
+    def transform_columns(self, columns, extra="error", allow_missing=False):
+        """DataFrame or {column: array} -> (n, n_features) view.
+
+        extra='ignore' skips columns that are not features (e.g. a target or ID).
+        Absent feature columns and blank values raise ValueError unless
+        allow_missing=True, which fills them with the defaults.
+        """
+        names = list(columns.keys())
+        if extra == "error":
+            self._check_keys(names)
+        absent = [c for c in self.feature_columns if c not in columns]
+        if absent and not allow_missing:
+            raise ValueError(f"missing feature columns {absent}")
+        n = len(columns[names[0]]) if names else 0
+        self.reserve(n)
+        out = self.buffer[:n]
+        for j, column in enumerate(self.feature_columns):
+            if column in columns:
+                values = columns[column]
+                values = values.to_numpy() if hasattr(values, "to_numpy") else np.asarray(values)
+                if column in CONVERTERS and values.dtype == object:
+                    values = np.array([CONVERTERS[column](v) for v in values], dtype=np.float32)
+                out[:, j] = values
+            else:
+                out[:, j] = self.defaults[j]
+        return self._impute(n, allow_missing)
+
+    def transform(self, data, allow_missing=False):
+        """Dispatches on a dict record, a list of records, or columnar data."""
+        if isinstance(data, dict) and not any(np.ndim(v) for v in data.values()):
+            return self.transform_one(data)
+        if isinstance(data, (list, tuple)):
+            return self.transform_records(data)
+        return self.transform_columns(data, allow_missing=allow_missing)
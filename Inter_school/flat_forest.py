@@ -0,0 +1,170 @@
+"""Compact, memory-mappable export of the heart RandomForest.
+
+export_forest() flattens every tree of a fitted RandomForestClassifier into
+a few NumPy arrays saved as .npy files in one directory:
+
+    feature.npy    int32    split feature per node
+    threshold.npy  float64  split threshold per node (+inf on leaves)
+    left.npy       int32    global index of the left child (leaves point to themselves)
+    right.npy      int32    global index of the right child (leaves point to themselves)
+    value.npy      float64  class probabilities per node
+    roots.npy      int32    index of each tree's root node
+    meta.json               classes, feature names, max depth
+
+load_flat_forest() opens the arrays with mmap_mode='r': loading is just a
+few mmap() calls, nothing is unpickled, and processes mapping the same
+files share one copy of the model in the page cache.
+
+Usage:
+    python flat_forest.py heart_model.pkl heart_model_flat
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+
+ARRAY_NAMES = ("feature", "threshold", "left", "right", "value", "roots")
+DEFAULT_FLAT_DIR = "heart_model_flat"
+
+
+def flatten_forest(model):
+    """Returns (arrays, meta) for a fitted RandomForestClassifier."""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        node_ids = np.arange(offset, offset + n, dtype=np.int32)
+        is_leaf = tree.children_left == -1
+
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset).astype(np.int32))
+        rights.append(np.where(is_leaf, node_ids, tree.children_right + offset).astype(np.int32))
+        counts = tree.value[:, 0, :]
+        values.append(counts / counts.sum(axis=1, keepdims=True))
+        roots.append(offset)
+        offset += n
+
+    arrays = {
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "left": np.concatenate(lefts),
+        "right": np.concatenate(rights),
+        "value": np.concatenate(values).astype(np.float64),
+        "roots": np.array(roots, dtype=np.int32),
+    }
+    meta = {
+        "n_features": int(model.n_features_in_),
+        "classes": [int(c) for c in model.classes_],
+        "feature_names": [str(c) for c in getattr(model, "feature_names_in_", [])],
+        "max_depth": int(max(e.tree_.max_depth for e in model.estimators_)),
+        "n_trees": len(model.estimators_),
+        "n_nodes": int(offset),
+    }
+    return arrays, meta
+
+
+def export_forest(model, path=DEFAULT_FLAT_DIR):
+    """Writes the flattened forest into directory path."""
+    arrays, meta = flatten_forest(model)
+    os.makedirs(path, exist_ok=True)
+    for name in ARRAY_NAMES:
+        np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(arrays[name]))
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return path
+
+
+class FlatForest:
+    """Pure-NumPy RandomForest predictor over flattened tree arrays."""
+
+    def __init__(self, arrays, meta):
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        self.classes_ = np.array(meta["classes"])
+        self.n_features_in_ = meta["n_features"]
+        self.max_depth = meta["max_depth"]
+
+    def apply(self, X):
+        """Returns the leaf reached in every tree, shape (n_rows, n_trees)."""
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.n_features_in_)
+        rows = np.arange(len(X))
+        leaves = np.empty((len(X), len(self.roots)), dtype=np.int32)
+        for t, root in enumerate(self.roots):
+            node = np.full(len(X), root, dtype=np.int32)
+            for _ in range(self.max_depth):
+                go_left = X[rows, self.feature[node]] <= self.threshold[node]
+                node = np.where(go_left, self.left[node], self.right[node])
+            leaves[:, t] = node
+        return leaves
+
+    def predict_proba(self, X):
+        return self.value[self.apply(X)].mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def load_flat_forest(path=DEFAULT_FLAT_DIR, mmap=True):
+    """Opens an exported forest; with mmap=True the arrays are memory-mapped read-only."""
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    mode = "r" if mmap else None
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in ARRAY_NAMES}
+    return FlatForest(arrays, meta)
+
+
+def _measure_load(snippet):
+    """Runs snippet in a fresh interpreter; returns (load_seconds, peak_rss_kb)."""
+    code = ("import time\n"
+            "start = time.perf_counter()\n"
+            f"{snippet}\n"
+            "elapsed = time.perf_counter() - start\n"
+            "try:\n"
+            "    rss = [l.split()[1] for l in open('/proc/self/status') if l.startswith('VmHWM')][0]\n"
+            "except OSError:\n"
+            "    import resource; rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+            "print(elapsed, rss)")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    seconds, rss = out.stdout.split()[-2:]
+    return float(seconds), int(rss)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export heart_model.pkl to flat NumPy arrays.")
+    parser.add_argument("model", nargs="?", default="heart_model.pkl")
+    parser.add_argument("output", nargs="?", default=DEFAULT_FLAT_DIR)
+    parser.add_argument("--compare", action="store_true",
+                        help="compare cold load time and peak memory against joblib.load")
+    args = parser.parse_args(argv)
+
+    import joblib
+
+    model = joblib.load(args.model)
+    export_forest(model, args.output)
+    flat = load_flat_forest(args.output)
+
+    X = np.random.default_rng(0).normal(size=(500, flat.n_features_in_)) * 50 + 100
+    max_diff = np.abs(flat.predict_proba(X) - model.predict_proba(X)).max()
+    print(f"💾 Exported {flat.meta['n_trees']} trees ({flat.meta['n_nodes']} nodes) to {args.output}"
+          f" | max |Δp| vs sklearn: {max_diff:.2e}")
+
+    if args.compare:
+        model_path = os.path.abspath(args.model)
+        flat_path = os.path.abspath(args.output)
+        pickled = _measure_load(f"import joblib; joblib.load({model_path!r})")
+        mapped = _measure_load(f"from flat_forest import load_flat_forest; load_flat_forest({flat_path!r})")
+        print(f"   joblib.load   {pickled[0] * 1000:8.1f} ms | peak RSS {pickled[1] / 1024:6.1f} MB")
+        print(f"   flat (mmap)   {mapped[0] * 1000:8.1f} ms | peak RSS {mapped[1] / 1024:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
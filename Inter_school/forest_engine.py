@@ -0,0 +1,325 @@
+"""Low-latency NumPy inference engine for the heart RandomForest.
+
+CompiledForest scores all trees at once instead of walking them one by one:
+
+* table mode (every tree has at most 64 leaves, true for heart_model.pkl):
+  leaves of each tree are numbered left to right and every split gets a
+  64-bit mask clearing the leaves of its left subtree; the leaf a row lands
+  in is the lowest bit left after ANDing the masks of every split it goes
+  right on. Splits are grouped by feature and sorted by threshold, and a
+  precomputed decision table holds, per tree, the AND of the masks of the
+  k lowest thresholds. Scoring a row is then one searchsorted per feature,
+  one gather of 13 x n_trees masks and an AND-reduce, independent of depth.
+* lockstep mode (larger trees, or a table over MAX_TABLE_BYTES): all trees
+  advance one level per step through a (node, 2) children table. It can also
+  be forced with mode="lockstep", e.g. to test it on a small model.
+
+Both modes compare float32 features against float64 thresholds exactly as
+sklearn does, so probabilities match predict_proba to float precision.
+
+explain() attributes each probability to the features by decision-path
+contributions: every split on a row's path to a leaf moves the node value
+by (child value - parent value), credited to the split's feature. Those
+deltas are summed per leaf once at compile time, so explaining a row is the
+same leaf lookup as scoring it plus a gather of one (features x classes)
+block per tree. The forest's expected value plus the contributions adds up
+to predict_proba exactly.
+
+Usage:
+    python forest_engine.py                 # equivalence checks + latency vs sklearn; exits 1 on a mismatch
+
+The same checks run as tests: python -m pytest tests
+"""
+import argparse
+import time
+
+import numpy as np
+
+from flat_forest import flatten_forest
+
+
+MAX_TABLE_LEAVES = 64
+MAX_TABLE_BYTES = 64 * 1024 * 1024
+ALL_LEAVES = np.uint64(0xFFFFFFFFFFFFFFFF)
+# Rows scored per chunk; bounds the (rows x features x trees) gather
+BATCH_CHUNK = 256
+# Up to this many rows, thresholds are counted with one broadcast comparison
+SMALL_BATCH = 8
+
+
+class CompiledForest:
+    def __init__(self, feature, threshold, left, right, value, roots, classes, n_features, max_depth,
+                 mode=None):
+        """mode: "table", "lockstep" or None to pick table mode whenever the trees allow it."""
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = int(n_features)
+        self.n_trees = len(roots)
+        self.max_depth = int(max_depth)
+
+        leaves_per_tree = [self._leaves_in_order(left, right, root) for root in roots]
+        n_splits = sum(len(leaves) - 1 for leaves in leaves_per_tree)
+        table_bytes = (n_splits + self.n_features_in_) * self.n_trees * 8
+        table_ok = (max(len(leaves) for leaves in leaves_per_tree) <= MAX_TABLE_LEAVES
+                    and table_bytes <= MAX_TABLE_BYTES)
+        if mode == "table" and not table_ok:
+            raise ValueError(f"table mode needs at most {MAX_TABLE_LEAVES} leaves per tree "
+                             f"and a table within {MAX_TABLE_BYTES} bytes")
+        if mode not in (None, "table", "lockstep"):
+            raise ValueError(f"unknown mode {mode!r}")
+        self.mode = mode or ("table" if table_ok else "lockstep")
+        if self.mode == "table":
+            self._compile_table(feature, threshold, left, right, value, roots, leaves_per_tree)
+            self._leaf_index = self._leaf_index_table
+        else:
+            self._compile_lockstep(feature, threshold, left, right, value, roots)
+            self._leaf_index = self._leaf_index_lockstep
+
+        node_contributions = self._path_contributions(feature, left, right, value, roots)
+        # Indexed like leaf_values: leaves in table order, or every node in lockstep mode
+        self.leaf_contributions = (node_contributions[np.concatenate(leaves_per_tree)]
+                                   if self.mode == "table" else node_contributions)
+        self.expected_value = np.asarray(value, dtype=np.float64)[np.asarray(roots)].mean(axis=0)
+
+    @classmethod
+    def from_model(cls, model, mode=None):
+        """Compiles a fitted sklearn RandomForestClassifier."""
+        arrays, meta = flatten_forest(model)
+        return cls.from_arrays(arrays, meta, mode)
+
+    @classmethod
+    def from_flat(cls, flat, mode=None):
+        """Compiles a flat_forest.FlatForest (e.g. a memory-mapped export)."""
+        arrays = {name: getattr(flat, name) for name in ("feature", "threshold", "left", "right",
+                                                         "value", "roots")}
+        return cls.from_arrays(arrays, flat.meta, mode)
+
+    @classmethod
+    def from_arrays(cls, arrays, meta, mode=None):
+        return cls(arrays["feature"], arrays["threshold"], arrays["left"], arrays["right"],
+                   arrays["value"], arrays["roots"], meta["classes"], meta["n_features"],
+                   meta["max_depth"], mode)
+
+    @staticmethod
+    def _leaves_in_order(left, right, root):
+        """Leaf node ids of one tree, left to right."""
+        leaves, stack = [], [int(root)]
+        while stack:
+            node = stack.pop()
+            if left[node] == node:
+                leaves.append(node)
+            else:
+                stack.append(int(right[node]))
+                stack.append(int(left[node]))
+        return leaves
+
+    def _compile_table(self, feature, threshold, left, right, value, roots, leaves_per_tree):
+        split_feature, split_threshold, split_mask, split_tree = [], [], [], []
+        leaf_values = []
+
+        for t, (root, leaves) in enumerate(zip(roots, leaves_per_tree)):
+            bit = {leaf: i for i, leaf in enumerate(leaves)}
+            leaf_values.extend(value[leaf] for leaf in leaves)
+
+            # Post-order walk: mask of every subtree's leaves
+            subtree_mask = {}
+            stack = [(int(root), False)]
+            while stack:
+                node, children_done = stack.pop()
+                if left[node] == node:
+                    subtree_mask[node] = 1 << bit[node]
+                elif children_done:
+                    subtree_mask[node] = subtree_mask[int(left[node])] | subtree_mask[int(right[node])]
+                    split_feature.append(int(feature[node]))
+                    split_threshold.append(float(threshold[node]))
+                    # Going right rules out every leaf under the left child
+                    split_mask.append(~subtree_mask[int(left[node])] & 0xFFFFFFFFFFFFFFFF)
+                    split_tree.append(t)
+                else:
+                    stack.append((node, True))
+                    stack.append((int(right[node]), False))
+                    stack.append((int(left[node]), False))
+
+        split_feature = np.array(split_feature, dtype=np.intp)
+        split_threshold = np.array(split_threshold, dtype=np.float64)
+        split_mask = np.array(split_mask, dtype=np.uint64)
+        split_tree = np.array(split_tree, dtype=np.intp)
+
+        # Per feature: thresholds sorted ascending, and row k of the table holds,
+        # for every tree, the AND of the masks of the k lowest-threshold splits
+        # (the ones a value above those thresholds goes right on).
+        self.feature_thresholds = []
+        self.table_offsets = np.zeros(self.n_features_in_, dtype=np.intp)
+        tables = []
+        for f in range(self.n_features_in_):
+            on_f = np.flatnonzero(split_feature == f)
+            on_f = on_f[np.argsort(split_threshold[on_f], kind="stable")]
+            self.feature_thresholds.append(split_threshold[on_f])
+            table = np.full((len(on_f) + 1, self.n_trees), ALL_LEAVES, dtype=np.uint64)
+            for k, split in enumerate(on_f, start=1):
+                table[k] = table[k - 1]
+                table[k, split_tree[split]] &= split_mask[split]
+            self.table_offsets[f] = sum(len(t) for t in tables)
+            tables.append(table)
+
+        self.table = np.concatenate(tables)
+
+        # Small batches count thresholds with one comparison over all features
+        # instead of a searchsorted per feature. Each feature's run starts with
+        # a +inf sentinel so no run is empty for np.add.reduceat.
+        runs = [np.concatenate([[np.inf], t]) for t in self.feature_thresholds]
+        self.all_thresholds = np.concatenate(runs)
+        self.all_threshold_feature = np.repeat(np.arange(self.n_features_in_), [len(r) for r in runs])
+        self.run_starts = np.cumsum([0] + [len(r) for r in runs[:-1]]).astype(np.intp)
+
+        # Pre-divided by the tree count so scoring only has to sum over trees
+        self.leaf_values = np.array(leaf_values, dtype=np.float64) / self.n_trees
+        self.leaf_offsets = np.cumsum([0] + [len(leaves) for leaves in leaves_per_tree[:-1]]).astype(np.intp)
+
+    def _compile_lockstep(self, feature, threshold, left, right, value, roots):
+        self.node_feature = np.asarray(feature, dtype=np.intp)
+        self.node_threshold = np.asarray(threshold, dtype=np.float64)
+        self.children = np.stack([left, right], axis=1).astype(np.intp)
+        # Every node, so a leaf's node id indexes it directly
+        self.leaf_values = np.asarray(value, dtype=np.float64) / self.n_trees
+        self.roots = np.asarray(roots, dtype=np.intp)
+
+    def _path_contributions(self, feature, left, right, value, roots):
+        """(node, feature, class) sums of the value deltas on the path from the root, / n_trees."""
+        left, right = np.asarray(left, dtype=np.intp), np.asarray(right, dtype=np.intp)
+        feature = np.asarray(feature, dtype=np.intp)
+        value = np.asarray(value, dtype=np.float64) / self.n_trees
+        contributions = np.zeros((len(value), self.n_features_in_, value.shape[1]))
+        # One tree level per step; every child has one parent, so the fancy-indexed writes don't collide
+        frontier = np.asarray(roots, dtype=np.intp)
+        while len(frontier):
+            frontier = frontier[left[frontier] != frontier]
+            for children in (left[frontier], right[frontier]):
+                contributions[children] = contributions[frontier]
+                contributions[children, feature[frontier]] += value[children] - value[frontier]
+            frontier = np.concatenate([left[frontier], right[frontier]])
+        return contributions
+
+    def _leaf_index_table(self, X):
+        # How many splits of each feature the row's value lies above
+        if len(X) <= SMALL_BATCH:
+            above = self.all_thresholds < X.take(self.all_threshold_feature, axis=1)
+            rows = np.add.reduceat(above, self.run_starts, axis=1, dtype=np.intp)
+        else:
+            rows = np.empty(X.shape, dtype=np.intp)
+            for f, thresholds in enumerate(self.feature_thresholds):
+                rows[:, f] = np.searchsorted(thresholds, X[:, f], side="left")
+        rows += self.table_offsets
+        alive = np.bitwise_and.reduce(self.table[rows], axis=1)
+        lowest = alive & (~alive + np.uint64(1))
+        leaf_bit = np.log2(lowest.astype(np.float64)).astype(np.intp)
+        return leaf_bit + self.leaf_offsets
+
+    def _leaf_index_lockstep(self, X):
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), self.n_trees))
+        for _ in range(self.max_depth):
+            goes_right = X[rows, self.node_feature[node]] > self.node_threshold[node]
+            node = self.children[node, goes_right.view(np.int8)]
+        return node
+
+    def _chunked(self, X, score):
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.n_features_in_)
+        if len(X) <= BATCH_CHUNK:
+            return score(X)
+        return np.concatenate([score(X[i:i + BATCH_CHUNK]) for i in range(0, len(X), BATCH_CHUNK)])
+
+    def predict_proba(self, X):
+        return self._chunked(X, lambda X: np.add.reduce(self.leaf_values.take(self._leaf_index(X), axis=0), axis=1))
+
+    def explain(self, X):
+        """Per-feature contributions to predict_proba(X), shape (rows, features, classes).
+
+        expected_value + contributions.sum(axis=1) equals predict_proba(X).
+        """
+        return self._chunked(X, lambda X: np.add.reduce(
+            self.leaf_contributions.take(self._leaf_index(X), axis=0), axis=1))
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def _latency(fn, x, repeat):
+    fn(x)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(x)
+    return (time.perf_counter() - start) / repeat
+
+
+def on_threshold_rows(model, rows, n, seed=42):
+    """n copies of rows with one feature each set exactly to a random split threshold of model."""
+    rng = np.random.default_rng(seed)
+    out = np.asarray(rows, dtype=np.float64)[rng.integers(0, len(rows), n)].copy()
+    splits = [(e.tree_.feature[node], e.tree_.threshold[node]) for e in model.estimators_
+              for node in range(e.tree_.node_count) if e.tree_.children_left[node] != -1]
+    for row, i in zip(out, rng.integers(0, len(splits), n)):
+        f, t = splits[i]
+        row[f] = t
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check CompiledForest against sklearn and time it.")
+    parser.add_argument("--model", default="heart_model.pkl")
+    parser.add_argument("--data", default="heart.csv")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    import warnings
+    import joblib
+
+    import heart_dataset
+
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    model = joblib.load(args.model)
+    engine = CompiledForest.from_model(model)
+    # The fallback is checked on the same model, whichever mode it would normally get
+    engines = [engine] if engine.mode == "lockstep" else [engine, CompiledForest.from_model(model, "lockstep")]
+
+    # === Equivalence: real rows, random rows, and rows sitting exactly on split thresholds ===
+    rng = np.random.default_rng(42)
+    real = heart_dataset.load(args.data)[heart_dataset.FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    noisy = real[rng.integers(0, len(real), 5000)] + rng.normal(0, 5, (5000, real.shape[1]))
+    on_split = on_threshold_rows(model, real, 2000)
+    failures = 0
+    for checked in engines:
+        for name, X in (("heart.csv rows", real), ("noisy rows", noisy), ("on-threshold rows", on_split)):
+            expected = model.predict_proba(X)
+            batch_diff = np.abs(checked.predict_proba(X) - expected).max()
+            # Single rows take the small-batch path
+            single_diff = max(np.abs(checked.predict_proba(X[i:i + 1]) - expected[i]).max()
+                              for i in range(min(len(X), 300)))
+            diff = max(batch_diff, single_diff)
+            failures += diff > 1e-9
+            status = "✅" if diff <= 1e-9 else "❌"
+            print(f"{status} {checked.mode:<8} {name:<18} max |Δp| = {diff:.2e} over {len(X)} rows")
+
+        # === Explanations add up to the probabilities ===
+        explained = checked.expected_value + checked.explain(noisy).sum(axis=1)
+        diff = np.abs(explained - model.predict_proba(noisy)).max()
+        failures += diff > 1e-9
+        print(f"{'✅' if diff <= 1e-9 else '❌'} {checked.mode:<8} {'explain() sums':<18} "
+              f"max |Δp| = {diff:.2e} over {len(noisy)} rows")
+
+    # === Latency ===
+    row = real[:1]
+    batch = noisy[:1000]
+    print(f"\n📊 Engine mode: {engine.mode}")
+    for name, fn in (("sklearn", model.predict_proba), ("CompiledForest", engine.predict_proba),
+                     ("explain()", engine.explain)):
+        single = _latency(fn, row, args.repeat)
+        per_row = _latency(fn, batch, max(1, args.repeat // 100)) / len(batch)
+        print(f"   {name:<15} single row {single * 1e6:9.1f} µs | batch of 1000 {per_row * 1e6:7.2f} µs/row")
+
+    if failures:
+        raise SystemExit(f"❌ {failures} equivalence check(s) failed")
+
+
+if __name__ == "__main__":
+    main()
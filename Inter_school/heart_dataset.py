@@ -0,0 +1,260 @@
+"""Typed loader for heart.csv with schema validation and a binary cache.
+
+The 14 columns, their compact dtypes and allowed ranges live in SCHEMA. The
+CSV is parsed once as float32 (which holds every value exactly), checked for
+missing, out-of-range and non-integer values in one vectorized pass, then
+cast column by column to int8/int16/float32. That takes about an eighth of
+the memory of pandas' default int64/float64 frame.
+
+The parsed columns are cached in an .npz file next to the CSV. A later load
+of an unchanged CSV reads only the cache. When rows have been appended to
+the CSV (the cached bytes still hash the same), only the new bytes are
+parsed, by the column order of the file's header, and the cache is
+extended. Any other change means a full reparse.
+
+Files too large to load at once (see synthetic_heart.py) are read with
+iter_chunks(), which validates and types one chunk at a time and bypasses
+the cache.
+
+Usage:
+    python heart_dataset.py heart.csv       # validate, cache, and show the schema
+"""
+import argparse
+import hashlib
+import io
+import os
+import time
+
+
+# column: (dtype, min, max); ranges are generous clinical bounds, not the observed ones
+SCHEMA = {
+    "age": ("int8", 1, 120),
+    "sex": ("int8", 0, 1),
+    "cp": ("int8", 0, 3),
+    "trestbps": ("int16", 50, 300),
+    "chol": ("int16", 50, 800),
+    "fbs": ("int8", 0, 1),
+    "restecg": ("int8", 0, 2),
+    "thalach": ("int16", 40, 250),
+    "exang": ("int8", 0, 1),
+    "oldpeak": ("float32", -5.0, 10.0),
+    "slope": ("int8", 0, 2),
+    "ca": ("int8", 0, 4),
+    "thal": ("int8", 0, 3),
+    "condition": ("int8", 0, 4),
+}
+COLUMNS = list(SCHEMA)
+TARGET_COLUMN = "condition"
+FEATURE_COLUMNS = [c for c in COLUMNS if c != TARGET_COLUMN]
+
+CACHE_SUFFIX = ".cache.npz"
+CACHE_VERSION = 2
+DEFAULT_CHUNK_ROWS = 200_000
+
+
+class SchemaError(ValueError):
+    """heart.csv does not match SCHEMA."""
+
+
+def cache_path_for(csv_path):
+    return csv_path + CACHE_SUFFIX
+
+
+def check_header(columns):
+    """Raises SchemaError unless every SCHEMA column is present."""
+    missing = [c for c in COLUMNS if c not in columns]
+    if missing:
+        raise SchemaError(f"missing columns {missing}; found {list(columns)}")
+
+
+def validate(values, first_row=0):
+    """Checks a (rows, 14) float32 array in SCHEMA column order; raises SchemaError."""
+    import numpy as np
+
+    low = np.array([SCHEMA[c][1] for c in COLUMNS], dtype=np.float32)
+    high = np.array([SCHEMA[c][2] for c in COLUMNS], dtype=np.float32)
+    integer = np.array([SCHEMA[c][0].startswith("int") for c in COLUMNS])
+
+    # NaN fails both range comparisons, so one mask covers missing values too
+    bad = ~((values >= low) & (values <= high))
+    bad |= integer & (values != np.round(values))
+    if not bad.any():
+        return
+
+    problems = []
+    for j in np.flatnonzero(bad.any(axis=0)):
+        rows = np.flatnonzero(bad[:, j])
+        examples = ", ".join(f"row {first_row + r}: {values[r, j]:g}" for r in rows[:3])
+        problems.append(f"{COLUMNS[j]} ({len(rows)} bad; expected {SCHEMA[COLUMNS[j]][0]} in "
+                        f"[{SCHEMA[COLUMNS[j]][1]}, {SCHEMA[COLUMNS[j]][2]}]; {examples})")
+    raise SchemaError("invalid values: " + "; ".join(problems))
+
+
+def read_header(path):
+    """Column names from the CSV's first line, in file order."""
+    import csv
+
+    with open(path, newline="") as f:
+        return next(csv.reader(f), [])
+
+
+def _parse(source, names=None, first_row=0):
+    """Parses CSV text into validated float32 values in SCHEMA order.
+
+    With names (the file's header, in file order) the text has no header
+    line of its own, e.g. rows appended after the cached part of a file.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if names is None:
+        df = pd.read_csv(source, dtype=np.float32, engine="c", usecols=lambda c: c in SCHEMA)
+    else:
+        df = pd.read_csv(source, dtype=np.float32, engine="c", header=None, names=names,
+                         usecols=lambda c: c in SCHEMA)
+    check_header(df.columns)
+    values = np.ascontiguousarray(df[COLUMNS].to_numpy(dtype=np.float32))
+    validate(values, first_row)
+    return values
+
+
+def _typed_columns(values):
+    return {c: values[:, j].astype(SCHEMA[c][0]) for j, c in enumerate(COLUMNS)}
+
+
+def _prefix_digest(path, size):
+    """SHA-256 of the first size bytes of path, and whether they end on a complete line."""
+    digest = hashlib.sha256()
+    last = b""
+    with open(path, "rb") as f:
+        remaining = size
+        while remaining:
+            block = f.read(min(remaining, 1 << 20))
+            if not block:
+                return None, False
+            digest.update(block)
+            last = block[-1:]
+            remaining -= len(block)
+    return digest.hexdigest(), last == b"\n"
+
+
+def _write_cache(csv_path, columns, header):
+    import numpy as np
+
+    st = os.stat(csv_path)
+    digest, _ = _prefix_digest(csv_path, st.st_size)
+    tmp = cache_path_for(csv_path) + ".tmp.npz"
+    np.savez(tmp, _version=CACHE_VERSION, _size=st.st_size, _mtime_ns=st.st_mtime_ns, _sha256=digest,
+             _header=np.array(header, dtype=str), **columns)
+    os.replace(tmp, cache_path_for(csv_path))
+
+
+def _read_cache(csv_path):
+    """Returns (columns, header, cached_size, append_ok) or None when there is no usable cache."""
+    import numpy as np
+
+    try:
+        with np.load(cache_path_for(csv_path)) as cache:
+            if int(cache["_version"]) != CACHE_VERSION:
+                return None
+            columns = {c: cache[c] for c in COLUMNS}
+            header = cache["_header"].tolist()
+            size, mtime_ns, digest = int(cache["_size"]), int(cache["_mtime_ns"]), str(cache["_sha256"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+    st = os.stat(csv_path)
+    if st.st_size == size and st.st_mtime_ns == mtime_ns:
+        return columns, header, size, True
+    # Appended rows: every old byte is untouched and the old part ended on a complete line
+    if st.st_size > size and _prefix_digest(csv_path, size) == (digest, True):
+        return columns, header, size, False
+    return None
+
+
+def load(path="heart.csv", cache=True):
+    """Returns heart.csv as a validated DataFrame with SCHEMA dtypes.
+
+    Raises SchemaError on missing columns or invalid values.
+    """
+    import numpy as np
+    import pandas as pd
+
+    cached = _read_cache(path) if cache else None
+    if cached is not None and cached[3]:
+        columns = cached[0]
+    elif cached is not None:
+        columns, header, size, _ = cached
+        n_cached = len(columns[COLUMNS[0]])
+        with open(path, "rb") as f:
+            f.seek(size)
+            new = _typed_columns(_parse(io.BytesIO(f.read()), names=header, first_row=n_cached))
+        columns = {c: np.concatenate([columns[c], new[c]]) for c in COLUMNS}
+        _write_cache(path, columns, header)
+    else:
+        columns = _typed_columns(_parse(path))
+        if cache:
+            _write_cache(path, columns, read_header(path))
+    return pd.DataFrame(columns, columns=COLUMNS)
+
+
+def iter_chunks(path="heart.csv", chunk_rows=DEFAULT_CHUNK_ROWS, max_rows=None):
+    """Yields the CSV as validated DataFrames of up to chunk_rows rows with SCHEMA dtypes.
+
+    Only one chunk is in memory at a time; max_rows stops after that many rows.
+    Raises SchemaError like load(), naming rows by their position in the file.
+    """
+    import numpy as np
+    import pandas as pd
+
+    first_row = 0
+    with pd.read_csv(path, dtype=np.float32, engine="c", usecols=lambda c: c in SCHEMA,
+                     chunksize=chunk_rows, nrows=max_rows) as reader:
+        for df in reader:
+            check_header(df.columns)
+            values = np.ascontiguousarray(df[COLUMNS].to_numpy(dtype=np.float32))
+            del df
+            validate(values, first_row)
+            first_row += len(values)
+            yield pd.DataFrame(_typed_columns(values), columns=COLUMNS)
+
+
+def load_xy(path="heart.csv", cache=True):
+    """Returns (X, y): the 13 feature columns and the target as 0/1."""
+    df = load(path, cache)
+    return df[FEATURE_COLUMNS], (df[TARGET_COLUMN] > 0).astype("int8")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate heart.csv against the schema and cache it.")
+    parser.add_argument("path", nargs="?", default="heart.csv")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+
+    start = time.perf_counter()
+    inferred = pd.read_csv(args.path)
+    csv_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = load(args.path, cache=False)
+    typed_seconds = time.perf_counter() - start
+    _write_cache(args.path, {c: df[c].to_numpy() for c in COLUMNS}, read_header(args.path))
+
+    start = time.perf_counter()
+    load(args.path)
+    cached_seconds = time.perf_counter() - start
+
+    print(f"✅ {args.path}: {len(df)} rows match the schema")
+    for c in COLUMNS:
+        dtype, low, high = SCHEMA[c]
+        print(f"   {c:<10} {dtype:<8} [{low}, {high}]  observed [{df[c].min()}, {df[c].max()}]")
+    print(f"📊 pd.read_csv (inferred)  {csv_seconds * 1000:8.2f} ms | "
+          f"{inferred.memory_usage(deep=True).sum() / 1024:8.1f} KB")
+    print(f"   typed + validated       {typed_seconds * 1000:8.2f} ms | "
+          f"{df.memory_usage(deep=True).sum() / 1024:8.1f} KB")
+    print(f"   from {os.path.basename(cache_path_for(args.path)):<18} {cached_seconds * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
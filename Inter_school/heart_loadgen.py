@@ -0,0 +1,96 @@
+"""Load generator for heart_server.py.
+
+Opens --concurrency keep-alive connections that each send single-patient
+/predict requests (rows sampled from heart.csv) as fast as the server answers,
+then prints client-side p50/p99 latency, throughput and the server's /stats.
+
+Usage:
+    python heart_server.py &
+    python heart_loadgen.py --requests 5000 --concurrency 32
+"""
+import argparse
+import asyncio
+import csv
+import json
+import random
+import time
+
+from heart_predictor import FEATURE_COLUMNS
+from resources import find_resource
+
+
+def load_rows(path):
+    with open(find_resource(path), newline='') as f:
+        return [[float(record[c]) for c in FEATURE_COLUMNS] for record in csv.DictReader(f)]
+
+
+async def request(reader, writer, host, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(b"%s %s HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n"
+                 b"Content-Length: %d\r\n\r\n%s"
+                 % (method.encode(), path.encode(), host.encode(), len(body), body))
+    await writer.drain()
+
+    status_line = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    status = int(status_line.split()[1])
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(host, port, rows, count, latencies, failures):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, host, "POST", "/predict",
+                                      {"features": random.choice(rows)})
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                failures.append(status)
+    finally:
+        writer.close()
+
+
+async def run(args):
+    rows = load_rows(args.data)
+    latencies, failures = [], []
+    per_client = max(1, args.requests // args.concurrency)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args.host, args.port, rows, per_client, latencies, failures)
+                           for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000
+    print(f"📊 {len(latencies)} requests, {args.concurrency} connections, {elapsed:.2f}s")
+    print(f"   throughput {len(latencies) / elapsed:,.0f} req/s | p50 {p50:.2f} ms | p99 {p99:.2f} ms"
+          f" | failures {len(failures)}")
+
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    _, stats = await request(reader, writer, args.host, "GET", "/stats")
+    writer.close()
+    print("🖥️  Server stats:", json.dumps(stats, indent=2))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate load against heart_server.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--data", default="heart.csv", help="CSV to sample patient rows from")
+    args = parser.parse_args(argv)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Heart disease predictor, usable without the Tkinter front end.
+
+Importing this module is cheap: joblib, numpy and the pickled model are only
+loaded the first time a prediction is requested.
+
+Predictions go through forest_engine.CompiledForest, which matches sklearn's
+predict_proba but has a fraction of its per-call overhead. When an up-to-date
+flat export (see flat_forest.py) sits next to the model it is compiled from
+the memory-mapped arrays, so the sklearn pickle is never loaded at all.
+
+predict_patient() answers repeated inputs from an LRU/TTL PredictionCache
+that is emptied (and the model reloaded) whenever the model file changes.
+Feature rows are assembled by feature_vectorizer from the column order and
+imputation defaults saved next to the model (heart_model.meta.json).
+
+Long-running processes can also call reload_model() to hot-swap a new model
+(e.g. one saved by incremental_train.py) without a cold-load pause.
+
+explain_patient() and explain_proba() break a probability down into
+per-feature contributions (decision-path contributions precomputed by the
+compiled engine), at about the cost of a prediction.
+
+With instrumentation enabled, feature building, array conversion and
+predict_proba are timed as the heart_features, heart_array and
+heart_predict_proba stages.
+"""
+import os
+import threading
+
+import instrumentation
+from heart_dataset import FEATURE_COLUMNS  # Feature order used by train_model.py
+from resources import find_resource
+
+
+MODEL_FILENAME = "heart_model.pkl"
+FLAT_DIRNAME = "heart_model_flat"
+
+
+_model = None
+_model_path = None
+_model_lock = threading.Lock()
+_engine = None
+_engine_path = None
+_cache = None
+_local = threading.local()
+# Bumped on every model change so each thread rebuilds its vectorizer
+_generation = 0
+
+# --- Prediction cache settings ---
+CACHE_SIZE = 4096
+CACHE_TTL_SECONDS = 600
+
+
+def get_model(path=None):
+    """Returns the trained heart model, loading it on first use.
+
+    Raises FileNotFoundError if the model file does not exist.
+    """
+    global _model, _model_path
+    path = path or find_resource(MODEL_FILENAME)
+    if _model is not None and _model_path == path:
+        return _model
+
+    with _model_lock:
+        if _model is None or _model_path != path:
+            import warnings
+            import joblib
+
+            # Rows are scored as plain arrays in FEATURE_COLUMNS order
+            warnings.filterwarnings("ignore", message="X does not have valid feature names")
+            _model = joblib.load(path)
+            _model_path = path
+    return _model
+
+
+def _flat_export_for(path):
+    """Returns the flat export directory next to path if it is at least as new as path."""
+    flat_dir = os.path.join(os.path.dirname(os.path.abspath(path)), FLAT_DIRNAME)
+    meta = os.path.join(flat_dir, "meta.json")
+    if os.path.exists(meta) and os.path.getmtime(meta) >= os.path.getmtime(path):
+        return flat_dir
+    return None
+
+
+def get_engine(path=None):
+    """Returns the compiled low-latency forest for the heart model, building it on first use.
+
+    Raises FileNotFoundError if the model file does not exist.
+    """
+    global _engine, _engine_path
+    path = path or find_resource(MODEL_FILENAME)
+    if _engine is not None and _engine_path == path:
+        return _engine
+
+    engine = _build_engine(path, get_model)
+    with _model_lock:
+        _engine, _engine_path = engine, path
+    return engine
+
+
+def _build_engine(path, load_model):
+    """Compiles the forest at path, from its flat export when one is current."""
+    from forest_engine import CompiledForest
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    flat_dir = _flat_export_for(path)
+    if flat_dir is not None:
+        from flat_forest import load_flat_forest
+        return CompiledForest.from_flat(load_flat_forest(flat_dir))
+    return CompiledForest.from_model(load_model(path))
+
+
+def reload_model(path=None):
+    """Loads the model at path and swaps it in for every later prediction.
+
+    The new engine is fully built before the swap, so concurrent predictions
+    keep using the old one until then instead of waiting for a cold load.
+    """
+    global _model, _model_path, _engine, _engine_path, _generation
+    import joblib
+
+    path = path or find_resource(MODEL_FILENAME)
+    engine = _build_engine(path, joblib.load)
+    with _model_lock:
+        _engine, _engine_path = engine, path
+        # The sklearn model is only needed for non-engine callers; reload it lazily
+        _model = _model_path = None
+        _generation += 1
+    if _cache is not None:
+        _cache.clear()
+    return engine
+
+
+def reset():
+    """Forgets the loaded model and engine so the next prediction reloads them."""
+    global _model, _model_path, _engine, _engine_path, _generation
+    with _model_lock:
+        _model = _model_path = _engine = _engine_path = None
+        _generation += 1
+
+
+def get_prediction_cache():
+    """Returns the shared PredictionCache used by predict_patient()."""
+    global _cache
+    if _cache is None:
+        from prediction_cache import PredictionCache
+
+        with _model_lock:
+            if _cache is None:
+                _cache = PredictionCache(predict_proba, find_resource(MODEL_FILENAME),
+                                         CACHE_SIZE, CACHE_TTL_SECONDS, on_invalidate=reset)
+    return _cache
+
+
+def get_vectorizer():
+    """Returns this thread's FeatureVectorizer for the current model, creating it on first use."""
+    from feature_vectorizer import FeatureVectorizer, meta_path_for
+
+    if getattr(_local, "generation", None) != _generation:
+        path = find_resource(MODEL_FILENAME)
+        _local.vectorizer = FeatureVectorizer.for_model(path)
+        _local.generation = _generation
+        if not os.path.exists(meta_path_for(path)):
+            print(f"⚠️ {meta_path_for(path)} not found; missing features default to 0. "
+                  f"Retrain with train_model.py to save feature defaults.")
+    return _local.vectorizer
+
+
+def build_features(**fields):
+    """Builds one feature row in the model's column order from named fields.
+
+    sex may be 'M'/'F' (case-insensitive). Only the fields the GUI does not
+    collect (cp, restecg, slope, ca, thal) may be left out; they take the
+    defaults saved with the model. Any other missing field, a blank value or
+    an unknown field name raises ValueError.
+    """
+    with instrumentation.stage("heart_features"):
+        return get_vectorizer().transform_one(fields)[0].tolist()
+
+
+def predict_records(data, allow_missing=False):
+    """Returns probabilities (0-1) for a dict record, a list of records, or columnar data.
+
+    allow_missing=True lets columnar data leave out feature columns or values.
+    """
+    return predict_proba(get_vectorizer().transform(data, allow_missing))
+
+
+def predict_proba(rows, model=None):
+    """Returns the heart disease probability (0-1) for each row of features."""
+    import numpy as np
+
+    if model is None:
+        model = get_engine()
+    with instrumentation.stage("heart_array"):
+        # float32 is what the trees compare in; a float32 buffer passes through without a copy
+        X = np.asarray(rows, dtype=np.float32).reshape(-1, len(FEATURE_COLUMNS))
+    with instrumentation.stage("heart_predict_proba"):
+        return model.predict_proba(X)[:, 1]
+
+
+def explain_proba(rows, model=None):
+    """Returns (base, contributions): the forest's base probability and an
+    (n, n_features) array of each feature's contribution to every row's
+    probability. base + contributions.sum(axis=1) == predict_proba(rows).
+    """
+    import numpy as np
+
+    if model is None:
+        model = get_engine()
+    with instrumentation.stage("heart_explain"):
+        contributions = model.explain(np.asarray(rows, dtype=np.float32).reshape(-1, len(FEATURE_COLUMNS)))
+    return float(model.expected_value[1]), contributions[:, :, 1]
+
+
+def explain_patient(**fields):
+    """Probability and per-feature contributions for one patient, all in percent.
+
+    Returns {"probability", "base", "contributions", "imputed"} with
+    contributions as a {feature: percentage points} dict, largest effect
+    first, and imputed listing the features that were not given and so took
+    the model's defaults. Their contributions describe the defaults, not the
+    patient.
+    """
+    row = build_features(**fields)
+    base, contributions = explain_proba([row])
+    columns = get_vectorizer().feature_columns
+    by_feature = sorted(zip(columns, contributions[0] * 100), key=lambda item: -abs(item[1]))
+    return {"probability": float(base + contributions[0].sum()) * 100, "base": base * 100,
+            "contributions": {feature: round(float(c), 2) for feature, c in by_feature},
+            "imputed": [c for c in columns if c not in fields]}
+
+
+def predict_patient(**fields):
+    """Returns the heart disease probability in percent for one patient."""
+    with instrumentation.stage("heart_predict_patient"):
+        return get_prediction_cache().predict([build_features(**fields)])[0] * 100
@@ -0,0 +1,311 @@
+"""Local HTTP/JSON inference server for the heart model.
+
+The model stays resident and concurrent single-patient requests are coalesced
+into micro-batches (up to --max-batch rows, waiting at most --max-wait-ms for
+the batch to fill) so each predict_proba call is shared by many requests.
+
+Endpoints:
+    POST /predict  {"features": [13 numbers]}  or named fields, e.g. the GUI's
+                   {"age": .., "sex": "M", "trestbps": .., "chol": .., "fbs": ..,
+                    "thalach": .., "exang": .., "oldpeak": ..}
+                   (features left out take the defaults saved with the model)
+                   -> {"probability": 0.41}
+    POST /explain  same body -> {"probability": 0.41, "base": 0.47,
+                                 "contributions": {"oldpeak": 0.08, ...}}
+                   (base plus the contributions equals the probability)
+    GET  /stats    latency percentiles, throughput, batch sizes and cache counters
+    GET  /health   -> {"status": "ok"}
+
+The model file is watched, and a replaced model (e.g. from
+incremental_train.py) is loaded in the background and swapped in.
+
+--metrics times request parsing, whole requests and the predictor's stages
+(see instrumentation.py) and prints a summary every --metrics-interval.
+
+Usage:
+    python heart_server.py --port 8080 --max-batch 64 --max-wait-ms 2
+    python heart_server.py --metrics-file heart_metrics.prom --metrics-interval 15
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import heart_predictor
+import instrumentation
+
+
+class LatencyStats:
+    """Request counters plus a rolling window of recent latencies."""
+
+    def __init__(self, window=10_000):
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_rows = 0
+        self.started = time.perf_counter()
+
+    def record_request(self, seconds):
+        self.requests += 1
+        self.latencies.append(seconds)
+
+    def record_batch(self, size):
+        self.batches += 1
+        self.batched_rows += size
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+        uptime = time.perf_counter() - self.started
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "uptime_s": round(uptime, 3),
+            "throughput_rps": round(self.requests / uptime, 1) if uptime > 0 else 0.0,
+            "latency_p50_ms": round(percentile(50), 3),
+            "latency_p99_ms": round(percentile(99), 3),
+            "batches": self.batches,
+            "mean_batch_size": round(self.batched_rows / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+class MicroBatcher:
+    """Collects single rows from concurrent requests and scores them together."""
+
+    def __init__(self, predict_fn, stats, max_batch_size=64, max_wait_ms=2.0):
+        self.predict_fn = predict_fn
+        self.stats = stats
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        # One thread keeps predict_proba off the event loop without oversubscribing cores
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="predict")
+
+    async def submit(self, row):
+        """Queues one feature row and waits for its probability."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((row, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Anything already waiting joins for free
+            while len(batch) < self.max_batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            rows = [row for row, _ in batch]
+            try:
+                probabilities = await loop.run_in_executor(self.executor, self.predict_fn, rows)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.stats.record_batch(len(batch))
+            for (_, future), probability in zip(batch, probabilities):
+                if not future.done():
+                    future.set_result(float(probability))
+
+
+def parse_row(payload):
+    """Turns a /predict JSON body into one feature row."""
+    if "features" in payload:
+        row = [float(v) for v in payload["features"]]
+        if len(row) != len(heart_predictor.FEATURE_COLUMNS):
+            raise ValueError(f"expected {len(heart_predictor.FEATURE_COLUMNS)} features, got {len(row)}")
+        return row
+    # Any subset of named features; the rest take the model's saved defaults
+    return heart_predictor.build_features(**payload)
+
+
+class HeartServer:
+    def __init__(self, max_batch_size=64, max_wait_ms=2.0, cache_size=heart_predictor.CACHE_SIZE,
+                 reload_interval=2.0):
+        self.stats = LatencyStats()
+        self.batcher = MicroBatcher(heart_predictor.predict_proba, self.stats,
+                                    max_batch_size, max_wait_ms)
+        self.model_path = heart_predictor.find_resource(heart_predictor.MODEL_FILENAME)
+        self.reload_interval = reload_interval
+        self.reloads = 0
+        self.cache = None
+        if cache_size > 0:
+            from prediction_cache import PredictionCache
+            # With the watcher running, the model is reloaded there (which clears the cache again)
+            self.cache = PredictionCache(heart_predictor.predict_proba, self.model_path,
+                                         cache_size, heart_predictor.CACHE_TTL_SECONDS,
+                                         on_invalidate=None if reload_interval > 0 else heart_predictor.reset)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                body = b""
+                if "content-length" in headers:
+                    body = await reader.readexactly(int(headers["content-length"]))
+
+                status, response = await self.dispatch(method, path, body)
+                data = json.dumps(response).encode()
+                writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: %d\r\n\r\n%s"
+                             % (status, b"OK" if status == 200 else b"Error", len(data), data))
+                await writer.drain()
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+        if method == "GET" and path == "/stats":
+            stats = self.stats.snapshot()
+            stats["model_reloads"] = self.reloads
+            if self.cache is not None:
+                stats["cache"] = self.cache.stats()
+            return 200, stats
+        if method == "POST" and path == "/predict":
+            start = time.perf_counter()
+            try:
+                with instrumentation.stage("heart_parse"):
+                    row = parse_row(json.loads(body))
+                probability = self.cache.get(row) if self.cache is not None else None
+                if probability is None:
+                    generation = self.cache.generation if self.cache is not None else None
+                    scored_at = time.perf_counter()
+                    probability = await self.batcher.submit(row)
+                    if self.cache is not None:
+                        # What a later hit on this row saves: the batched scoring, wait included.
+                        # Not stored if a reload cleared the cache meanwhile (maybe the old model's score).
+                        self.cache.put(row, probability, time.perf_counter() - scored_at, generation)
+            except Exception as e:
+                self.stats.errors += 1
+                return 400, {"error": str(e)}
+            elapsed = time.perf_counter() - start
+            self.stats.record_request(elapsed)
+            instrumentation.record("server_request", elapsed)
+            return 200, {"probability": probability}
+        if method == "POST" and path == "/explain":
+            try:
+                row = parse_row(json.loads(body))
+                base, contributions = await asyncio.get_running_loop().run_in_executor(
+                    self.batcher.executor, heart_predictor.explain_proba, [row])
+            except Exception as e:
+                self.stats.errors += 1
+                return 400, {"error": str(e)}
+            features = heart_predictor.get_vectorizer().feature_columns
+            return 200, {"probability": base + float(contributions[0].sum()), "base": base,
+                         "contributions": {f: float(c) for f, c in zip(features, contributions[0])}}
+        return 404, {"error": f"no route for {method} {path}"}
+
+    async def watch_model(self):
+        """Hot-swaps the model whenever its file is replaced; requests are served throughout."""
+        loop = asyncio.get_running_loop()
+        last = _mtime(self.model_path)
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            current = _mtime(self.model_path)
+            if current == last or current is None:
+                continue
+            last = current
+            try:
+                await loop.run_in_executor(None, heart_predictor.reload_model, self.model_path)
+            except Exception as e:
+                print(f"⚠️ Model reload failed, keeping the previous model: {e}")
+                continue
+            # The cache's own file check may have emptied it before the reload and let the
+            # old engine refill it; only scores from the new model may be cached from here on
+            if self.cache is not None:
+                self.cache.clear()
+            self.reloads += 1
+            print(f"🔄 Reloaded {self.model_path}")
+
+    async def serve(self, host, port):
+        # Keep the model resident before accepting traffic
+        heart_predictor.get_engine()
+        loop = asyncio.get_running_loop()
+        loop.create_task(self.batcher.run())
+        if self.reload_interval > 0:
+            loop.create_task(self.watch_model())
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"🚀 Heart model server listening on http://{host}:{port} "
+              f"(max batch {self.batcher.max_batch_size}, max wait {self.batcher.max_wait * 1000:g} ms)")
+        async with server:
+            await server.serve_forever()
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve heart model predictions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch", type=int, default=64, help="most rows per predict_proba call")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0,
+                        help="longest a request waits for its batch to fill")
+    parser.add_argument("--cache-size", type=int, default=heart_predictor.CACHE_SIZE,
+                        help="LRU prediction cache entries (0 disables the cache)")
+    parser.add_argument("--reload-interval", type=float, default=2.0,
+                        help="seconds between checks for a replaced model file (0 disables hot reload)")
+    parser.add_argument("--metrics", action="store_true", help="time every stage (see instrumentation.py)")
+    parser.add_argument("--metrics-file", help="export stage timings here (.prom or .jsonl); implies --metrics")
+    parser.add_argument("--metrics-interval", type=float, default=60.0,
+                        help="seconds between stage timing summaries")
+    args = parser.parse_args(argv)
+
+    if args.metrics or args.metrics_file:
+        instrumentation.start_reporter(args.metrics_interval, args.metrics_file)
+    else:
+        instrumentation.configure_from_env()
+    server = HeartServer(args.max_batch, args.max_wait_ms, args.cache_size, args.reload_interval)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n" + json.dumps(server.stats.snapshot(), indent=2))
+    finally:
+        instrumentation.stop_reporter()
+
+
+if __name__ == "__main__":
+    main()
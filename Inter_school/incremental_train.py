@@ -0,0 +1,182 @@
+"""Incremental updates of heart_model.pkl from rows appended to heart.csv.
+
+Instead of retraining from scratch, the forest is warm-started: new trees
+are grown on the new rows only and appended to the existing ones, so the
+cost scales with the size of the new data. By default the number of new
+trees is proportional to the new rows' share of all training rows.
+
+A small state file next to the model records how many CSV rows have been
+used. Every fifth new row (and the original 20% test split) is held out,
+and the updated forest must score within --max-loss of the current one on
+that holdout before it is saved. The model is written to a temporary file
+and moved into place with os.replace, so readers never see a half-written
+pickle; heart_server.py notices the new file and hot-swaps it.
+
+Usage:
+    python incremental_train.py                  # first run records the rows already trained on
+    python incremental_train.py --new-trees 10 --max-trees 300
+"""
+import argparse
+import copy
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from train_model import load_dataset
+
+
+STATE_SUFFIX = ".state.json"
+HOLDOUT_EVERY = 5
+
+
+def state_path_for(model_path):
+    return os.path.splitext(model_path)[0] + STATE_SUFFIX
+
+
+def load_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _atomic_write(path, write):
+    """Calls write(tmp_path) on a temp file in path's directory, then renames it over path."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def save_state(path, state):
+    def write(tmp):
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=2)
+    _atomic_write(path, write)
+
+
+def holdout_mask(n_rows, base_rows, every=HOLDOUT_EVERY):
+    """Rows never trained on: train_model.py's test split plus every n-th appended row."""
+    mask = np.zeros(n_rows, dtype=bool)
+    # Same split as train_model.py over the rows the original model saw
+    _, base_test = train_test_split(np.arange(base_rows), test_size=0.2, random_state=42)
+    mask[base_test] = True
+    mask[base_rows::every] = True
+    return mask
+
+
+def grow_forest(model, X_new, y_new, n_new_trees, max_trees=None):
+    """Returns a copy of model with n_new_trees trees fit on the new rows only."""
+    grown = copy.deepcopy(model)
+    grown.set_params(warm_start=True, n_estimators=len(model.estimators_) + n_new_trees)
+    grown.fit(X_new, y_new)
+    grown.set_params(warm_start=False)
+    if max_trees is not None and len(grown.estimators_) > max_trees:
+        # Oldest trees go first, so the forest tracks recent data
+        grown.estimators_ = grown.estimators_[-max_trees:]
+        grown.n_estimators = max_trees
+    return grown
+
+
+def _export_flat_atomically(model, flat_dir):
+    """Replaces an existing flat export without ever exposing a half-written one."""
+    from flat_forest import export_forest
+
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(flat_dir)), prefix=".tmp-flat-")
+    export_forest(model, tmp)
+    old = flat_dir + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    os.rename(flat_dir, old)
+    os.rename(tmp, flat_dir)
+    # Processes still mapping the old arrays keep them until they let go
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add trees for rows appended to heart.csv.")
+    parser.add_argument("--data", default="heart.csv")
+    parser.add_argument("--model", default="heart_model.pkl")
+    parser.add_argument("--new-trees", type=int,
+                        help="trees to add (default: proportional to the new rows' share of the data)")
+    parser.add_argument("--max-trees", type=int, help="drop the oldest trees beyond this many")
+    parser.add_argument("--max-loss", type=float, default=0.01,
+                        help="largest allowed drop in holdout accuracy (0.01 = one point)")
+    args = parser.parse_args(argv)
+
+    from heart_predictor import FLAT_DIRNAME
+
+    state_path = state_path_for(args.model)
+    X, y = load_dataset(args.data)
+    state = load_state(state_path)
+
+    # === First run: everything currently in the CSV is what the model was trained on ===
+    if state is None:
+        train_rows = len(X) - int(holdout_mask(len(X), len(X)).sum())
+        state = {"base_rows": len(X), "rows_used": len(X), "train_rows": train_rows, "updates": []}
+        save_state(state_path, state)
+        print(f"📌 Recorded {len(X)} rows as already trained on ({state_path}). "
+              f"Append rows to {args.data} and run again.")
+        return None
+
+    new_rows = len(X) - state["rows_used"]
+    if new_rows <= 0:
+        print("✅ No new rows since the last update")
+        return None
+
+    holdout = holdout_mask(len(X), state["base_rows"])
+    is_new = np.arange(len(X)) >= state["rows_used"]
+    X_new, y_new = X[is_new & ~holdout], y[is_new & ~holdout]
+    if y_new.nunique() < 2:
+        print(f"⚠️ {new_rows} new rows but their training part has only one class; "
+              f"waiting for more data")
+        return None
+
+    model = joblib.load(args.model)
+    n_new_trees = args.new_trees or max(1, round(len(model.estimators_) * len(X_new) / state["train_rows"]))
+
+    start = time.perf_counter()
+    updated = grow_forest(model, X_new, y_new, n_new_trees, args.max_trees)
+    fit_seconds = time.perf_counter() - start
+
+    # === Validate on every held-out row, old and new ===
+    X_hold, y_hold = X[holdout], y[holdout]
+    before = accuracy_score(y_hold, model.predict(X_hold))
+    after = accuracy_score(y_hold, updated.predict(X_hold))
+    print(f"🌲 +{n_new_trees} trees on {len(X_new)} new rows in {fit_seconds:.2f}s "
+          f"({len(updated.estimators_)} trees total)")
+    print(f"📊 Holdout accuracy ({len(y_hold)} rows): {before * 100:.2f}% → {after * 100:.2f}%")
+    if after < before - args.max_loss:
+        print(f"⚠️ Rejected: accuracy fell by more than {args.max_loss * 100:g} points; "
+              f"model left unchanged and the rows stay pending")
+        return None
+
+    # === Atomic save: the pickle first, then the flat export (if one is in use), then the state ===
+    _atomic_write(args.model, lambda tmp: joblib.dump(updated, tmp))
+    flat_dir = os.path.join(os.path.dirname(os.path.abspath(args.model)), FLAT_DIRNAME)
+    if os.path.isdir(flat_dir):
+        _export_flat_atomically(updated, flat_dir)
+    state["rows_used"] = len(X)
+    state["train_rows"] += len(X_new)
+    state["updates"].append({"rows": new_rows, "trees_added": n_new_trees,
+                             "holdout_accuracy": round(after, 4), "time": time.time()})
+    save_state(state_path, state)
+    print(f"💾 Model updated in place: {args.model}")
+    return args.model
+
+
+if __name__ == "__main__":
+    main()
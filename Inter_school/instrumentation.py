@@ -0,0 +1,314 @@
+"""Low-overhead stage timing for the eye and heart pipelines.
+
+Hot paths wrap each stage in a timer:
+
+    with instrumentation.stage("eye_detect"):
+        boxes = detect_eyes(gray, eye_cascade)
+
+While instrumentation is off (the default) stage() returns a shared no-op
+context, so the cost is one function call. When on, every timing goes into
+a fixed-bucket histogram for its stage: recording is a bisect and a few
+integer updates, with no per-sample storage, so it can stay on
+indefinitely on a kiosk.
+
+Turning it on:
+    instrumentation.enable()                    from code or a CLI flag
+    HEALTH_METRICS=1                            environment (configure_from_env())
+    HEALTH_METRICS_FILE=/var/log/health.jsonl   also export every interval
+    HEALTH_METRICS_INTERVAL=60                  seconds between summaries
+
+Exports:
+    .jsonl  one line per interval: timestamp plus count/mean/p50/p95/p99/max
+            per stage, easy to diff across releases
+    .prom   Prometheus text format (cumulative histogram buckets), rewritten
+            atomically so node_exporter's textfile collector can scrape it
+
+Usage:
+    python instrumentation.py health_metrics.jsonl           summarise a JSONL export
+"""
+import argparse
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+# Bucket upper bounds in seconds: 1 µs to ~8 s, a factor of sqrt(2) apart
+BUCKET_BOUNDS = tuple(1e-6 * 2 ** (i / 2) for i in range(47))
+METRIC_NAME = "health_stage_seconds"
+
+_enabled = False
+_histograms = {}
+_histograms_lock = threading.Lock()
+_reporter = None
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (thread-safe)."""
+
+    def __init__(self, bounds=BUCKET_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        index = bisect.bisect_left(self.bounds, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q):
+        """Estimates the q-quantile by interpolating inside its bucket."""
+        with self.lock:
+            counts, count, top = list(self.counts), self.count, self.max
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for index, n in enumerate(counts):
+            if n and seen + n >= rank:
+                low = self.bounds[index - 1] if index > 0 else 0.0
+                high = self.bounds[index] if index < len(self.bounds) else top
+                return min(top, low + (high - low) * (rank - seen) / n)
+            seen += n
+        return top
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 4),
+            "p50_ms": round(self.quantile(0.50) * 1000, 4),
+            "p95_ms": round(self.quantile(0.95) * 1000, 4),
+            "p99_ms": round(self.quantile(0.99) * 1000, 4),
+            "max_ms": round(self.max * 1000, 4),
+        }
+
+
+class _StageTimer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+# ---------------- SWITCH ----------------
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Forgets every recorded timing."""
+    with _histograms_lock:
+        _histograms.clear()
+
+
+# ---------------- RECORDING ----------------
+def histogram(name):
+    """Returns the histogram for a stage, creating it on first use."""
+    h = _histograms.get(name)
+    if h is None:
+        with _histograms_lock:
+            h = _histograms.setdefault(name, Histogram())
+    return h
+
+
+def stage(name):
+    """Context manager timing one run of a stage (a no-op while disabled)."""
+    if not _enabled:
+        return _NULL_TIMER
+    return _StageTimer(histogram(name))
+
+
+def record(name, seconds):
+    """Records a duration measured elsewhere (ignored while disabled)."""
+    if _enabled:
+        histogram(name).record(seconds)
+
+
+def snapshot():
+    """{stage: summary} for every stage seen so far."""
+    with _histograms_lock:
+        items = sorted(_histograms.items())
+    return {name: h.summary() for name, h in items}
+
+
+# ---------------- EXPORT ----------------
+def format_summary(stages=None):
+    stages = snapshot() if stages is None else stages
+    lines = []
+    for name, s in stages.items():
+        if s["count"]:
+            lines.append(f"   {name:<20} n={s['count']:<7d} mean {s['mean_ms']:8.3f} ms | "
+                         f"p50 {s['p50_ms']:8.3f} | p95 {s['p95_ms']:8.3f} | "
+                         f"p99 {s['p99_ms']:8.3f} | max {s['max_ms']:8.3f}")
+    return "\n".join(lines)
+
+
+def write_jsonl(path):
+    """Appends the current snapshot as one JSON line."""
+    line = json.dumps({"timestamp": round(time.time(), 3), "pid": os.getpid(), "stages": snapshot()})
+    with open(path, "a") as f:
+        f.write(line + "\n")
+
+
+def prometheus_text():
+    """Every stage histogram in the Prometheus text exposition format."""
+    with _histograms_lock:
+        items = sorted(_histograms.items())
+    lines = [f"# HELP {METRIC_NAME} Time spent per pipeline stage.",
+             f"# TYPE {METRIC_NAME} histogram"]
+    for name, h in items:
+        with h.lock:
+            counts, count, total = list(h.counts), h.count, h.total
+        cumulative = 0
+        for bound, n in zip(h.bounds + (float("inf"),), counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else f"{bound:.6g}"
+            lines.append(f'{METRIC_NAME}_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'{METRIC_NAME}_sum{{stage="{name}"}} {total:.9g}')
+        lines.append(f'{METRIC_NAME}_count{{stage="{name}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """Rewrites path atomically so a scraper never sees a half-written file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(prometheus_text())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def export(path):
+    """Writes to path as Prometheus text (.prom) or JSON lines (anything else)."""
+    if path.endswith(".prom"):
+        write_prometheus(path)
+    else:
+        write_jsonl(path)
+
+
+# ---------------- PERIODIC REPORTS ----------------
+class Reporter:
+    """Background thread printing and/or exporting a summary every interval seconds."""
+
+    def __init__(self, interval=60.0, path=None, echo=True):
+        self.interval = interval
+        self.path = path
+        self.echo = echo
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="metrics-reporter", daemon=True)
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.report()
+
+    def report(self):
+        try:
+            if self.path:
+                export(self.path)
+            if self.echo:
+                summary = format_summary()
+                if summary:
+                    print(f"📊 Stage timings ({time.strftime('%H:%M:%S')})\n{summary}")
+        except OSError as e:
+            print(f"⚠️ Could not export metrics to {self.path}: {e}")
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self, final_report=True):
+        self.stop_event.set()
+        self.thread.join()
+        if final_report:
+            self.report()
+
+
+def start_reporter(interval=60.0, path=None, echo=True):
+    """Enables instrumentation and starts the shared reporter (once per process)."""
+    global _reporter
+    enable()
+    if _reporter is None:
+        _reporter = Reporter(interval, path, echo).start()
+    return _reporter
+
+
+def stop_reporter():
+    """Stops the shared reporter after one last report."""
+    global _reporter
+    if _reporter is not None:
+        _reporter.stop()
+        _reporter = None
+
+
+def configure_from_env(environ=os.environ):
+    """Starts reporting if HEALTH_METRICS is set; see the module docstring."""
+    if environ.get("HEALTH_METRICS", "").lower() not in ("1", "true", "yes", "on"):
+        return None
+    return start_reporter(float(environ.get("HEALTH_METRICS_INTERVAL", 60)),
+                          environ.get("HEALTH_METRICS_FILE") or None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise a JSON-lines metrics export.")
+    parser.add_argument("path", help="file written by HEALTH_METRICS_FILE / --metrics-file")
+    parser.add_argument("--all", action="store_true", help="print every interval, not just the last")
+    args = parser.parse_args(argv)
+
+    with open(args.path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if not entries:
+        raise SystemExit(f"ERROR: no metrics in {args.path}")
+    for entry in entries if args.all else entries[-1:]:
+        print(f"📊 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['timestamp']))} "
+              f"(pid {entry['pid']})")
+        print(format_summary(entry["stages"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Headless batch analysis of recorded eye screening clips.
+
+Every clip (a video file, or a directory of images) is split into frame
+ranges that are spread over a process pool. Each worker process loads the
+Haar cascade once, opens the clip itself, seeks to the start of its range and
+decodes only those frames, so no decoded frame ever crosses a process
+boundary. Only the compact per-frame findings are sent back. OpenCV's own
+threading is switched off in the workers, so throughput scales with the
+number of processes rather than fighting over cores.
+
+Results are written as one columnar .npz file:
+
+    frame table  clip, frame, status (eye_results.EyeStatus code, index into status_names),
+                 n_eyes, eye_start
+    eye table    x, y, w, h, red_ratio, yellow_ratio, pupil_x, pupil_y, pupil_r (-1 = none)
+    clip table   clip_names, clip_fps
+
+Eyes of frame i are rows eye_start[i] : eye_start[i] + n_eyes[i] of the eye table.
+
+Usage:
+    python offline_eye_analysis.py clips/ --output results.npz --workers 8
+    python offline_eye_analysis.py eyes.avi --chunk-frames 200 --detect-scale 0.5
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from eye_pipeline import IMAGE_EXTENSIONS
+from eye_results import EyeStatus
+
+
+VIDEO_EXTENSIONS = ('.avi', '.mp4', '.mkv', '.mov', '.m4v', '.webm')
+# Overall status messages, indexed by EyeStatus code
+STATUS_NAMES = tuple(status.message for status in EyeStatus)
+FRAME_COLUMNS = {"clip": np.int32, "frame": np.int32, "status": np.int8, "n_eyes": np.int8}
+EYE_COLUMNS = {"x": np.int16, "y": np.int16, "w": np.int16, "h": np.int16,
+               "red_ratio": np.float32, "yellow_ratio": np.float32,
+               "pupil_x": np.int16, "pupil_y": np.int16, "pupil_r": np.int16}
+
+
+# ---------------- CLIPS ----------------
+def find_clips(paths):
+    """Expands files and directories into a sorted list of clips (videos or image directories)."""
+    clips = []
+    for path in paths:
+        if not os.path.isdir(path):
+            clips.append(path)
+            continue
+        entries = sorted(os.listdir(path))
+        videos = [os.path.join(path, f) for f in entries if f.lower().endswith(VIDEO_EXTENSIONS)]
+        if videos:
+            clips.extend(videos)
+        elif any(f.lower().endswith(IMAGE_EXTENSIONS) for f in entries):
+            clips.append(path)
+    return clips
+
+
+def _image_files(path):
+    return sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def probe_clip(path):
+    """Returns (frame_count, fps) of a clip."""
+    import cv2
+
+    if os.path.isdir(path):
+        return len(_image_files(path)), 0.0
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video: {path}")
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if count <= 0:
+        # Some containers don't store a frame count; count by grabbing
+        count = 0
+        while cap.grab():
+            count += 1
+    cap.release()
+    return count, fps
+
+
+def frame_ranges(count, chunk_frames):
+    return [(start, min(start + chunk_frames, count)) for start in range(0, count, chunk_frames)]
+
+
+def _read_range(path, start, stop):
+    """Yields (index, frame) for frames [start, stop) of a clip."""
+    import cv2
+
+    if os.path.isdir(path):
+        for index, file in enumerate(_image_files(path)[start:stop], start):
+            frame = cv2.imread(file)
+            if frame is not None:
+                yield index, frame
+        return
+
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != start:
+        # Seeking unsupported or inexact for this codec: decode from the beginning
+        cap.release()
+        cap = cv2.VideoCapture(path)
+        for _ in range(start):
+            cap.grab()
+    try:
+        for index in range(start, stop):
+            ok, frame = cap.read()
+            if not ok:
+                break
+            yield index, frame
+    finally:
+        cap.release()
+
+
+# ---------------- WORKERS ----------------
+_worker_options = None
+
+
+def _init_worker(options):
+    global _worker_options
+    import cv2
+
+    # One process per core already; OpenCV's internal threads would only compete
+    cv2.setNumThreads(1)
+    _worker_options = options
+
+
+def analyze_range(clip_id, path, start, stop):
+    """Analyses frames [start, stop) of one clip; returns (frame_columns, eye_columns)."""
+    import eye_detector
+    from eye_pipeline import make_analyzer
+
+    options = _worker_options or {}
+    # A fresh tracker per range: ranges of other clips say nothing about this one
+    analyze = make_analyzer(eye_detector.get_eye_cascade(), options.get("track_every", 0),
+                            options.get("detect_scale", 1.0), options.get("pyramid", False),
+                            options.get("pupil", "blob"), options.get("pupil_smoothing"))
+
+    frames = {name: [] for name in FRAME_COLUMNS}
+    eyes = {name: [] for name in EYE_COLUMNS}
+    for index, frame in _read_range(path, start, stop):
+        result = analyze(frame)
+        frames["clip"].append(clip_id)
+        frames["frame"].append(index)
+        frames["status"].append(result.status)
+        frames["n_eyes"].append(len(result.eyes))
+        for eye in result.eyes:
+            # EyeRecord fields are named after the eye columns
+            for name in EYE_COLUMNS:
+                eyes[name].append(getattr(eye, name))
+
+    return ({name: np.array(values, dtype=FRAME_COLUMNS[name]) for name, values in frames.items()},
+            {name: np.array(values, dtype=EYE_COLUMNS[name]) for name, values in eyes.items()})
+
+
+# ---------------- DRIVER ----------------
+def analyze_clips(clips, workers=None, chunk_frames=None, **options):
+    """Runs every clip through a process pool; returns the columnar results dict."""
+    workers = workers or os.cpu_count() or 1
+    probes = [probe_clip(path) for path in clips]
+    total = sum(count for count, _ in probes)
+    # Several ranges per worker keeps the pool busy when clips differ in length
+    chunk_frames = chunk_frames or max(1, min(500, -(-total // (workers * 4))))
+
+    tasks = [(clip_id, path, start, stop)
+             for clip_id, (path, (count, _)) in enumerate(zip(clips, probes))
+             for start, stop in frame_ranges(count, chunk_frames)]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,)) as pool:
+        parts = list(pool.map(analyze_range, *zip(*tasks))) if tasks else []
+
+    results = {}
+    for name, dtype in FRAME_COLUMNS.items():
+        results[name] = np.concatenate([p[0][name] for p in parts]) if parts else np.empty(0, dtype)
+    for name, dtype in EYE_COLUMNS.items():
+        results[name] = np.concatenate([p[1][name] for p in parts]) if parts else np.empty(0, dtype)
+    results["eye_start"] = (np.cumsum(results["n_eyes"], dtype=np.int64) - results["n_eyes"]).astype(np.int32)
+    results["status_names"] = np.array(STATUS_NAMES)
+    results["clip_names"] = np.array(clips)
+    results["clip_fps"] = np.array([fps for _, fps in probes], dtype=np.float32)
+    return results
+
+
+def load_results(path):
+    """Loads a results file back into a dict of arrays."""
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse recorded eye clips offline with a process pool.")
+    parser.add_argument("inputs", nargs="+", help="video files, directories of clips, or image directories")
+    parser.add_argument("--output", default="eye_results.npz")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--chunk-frames", type=int, help="frames per task (default: spread evenly)")
+    parser.add_argument("--track-every", type=int, default=0,
+                        help="full detection every N frames, tracking in between (0 = every frame)")
+    parser.add_argument("--detect-scale", type=float, default=1.0,
+                        help="run the cascade on the frame resized by this factor (e.g. 0.5)")
+    parser.add_argument("--pyramid", action="store_true", help="downsample with cv2.pyrDown instead of resize")
+    parser.add_argument("--pupil", choices=["blob", "hough"], default="blob", help="pupil estimator")
+    parser.add_argument("--pupil-smoothing", type=float,
+                        help="EMA weight of each new pupil radius within a frame range (default: none)")
+    args = parser.parse_args(argv)
+
+    clips = find_clips(args.inputs)
+    if not clips:
+        parser.error("no clips found")
+
+    start = time.perf_counter()
+    results = analyze_clips(clips, args.workers, args.chunk_frames, track_every=args.track_every,
+                            detect_scale=args.detect_scale, pyramid=args.pyramid,
+                            pupil=args.pupil, pupil_smoothing=args.pupil_smoothing)
+    elapsed = time.perf_counter() - start
+    np.savez_compressed(args.output, **results)
+
+    n_frames = len(results["frame"])
+    print(f"✅ Analysed {n_frames} frames from {len(clips)} clip(s) in {elapsed:.2f}s "
+          f"({n_frames / elapsed if elapsed > 0 else 0:.1f} frames/sec, {args.workers} workers)")
+    counts = np.bincount(results["status"], minlength=len(STATUS_NAMES))
+    for name, count in zip(STATUS_NAMES, counts):
+        if count:
+            print(f"   {count:7d}  {name}")
+    print(f"💾 Results saved to {args.output} ({os.path.getsize(args.output) / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
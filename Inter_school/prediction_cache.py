@@ -0,0 +1,197 @@
+"""LRU + TTL cache in front of heart model scoring.
+
+Entries are keyed on the exact 13-feature row built by
+heart_predictor.build_features() (values normalised to float, so 1 and 1.0
+hit the same entry). The whole cache is dropped automatically when the model
+file changes: its mtime/size are checked at most every check_interval
+seconds, and with validate="hash" a changed stat is confirmed against the
+file's SHA-256 so a touched-but-identical model keeps its entries.
+
+Every clear starts a new generation. A caller scoring outside the cache reads
+the generation before scoring and hands it to put(), which drops the result
+if the cache was cleared in between (it may come from the previous model).
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    def __init__(self, predict_fn, model_path, max_size=4096, ttl=600.0, validate="mtime",
+                 check_interval=1.0, on_invalidate=None, clock=time.monotonic):
+        """predict_fn(rows) -> probabilities scores the rows that miss.
+
+        on_invalidate() is called after a model change empties the cache
+        (e.g. to reload the model); ttl=None keeps entries until evicted.
+        """
+        if validate not in ("mtime", "hash"):
+            raise ValueError("validate must be 'mtime' or 'hash'")
+        self.predict_fn = predict_fn
+        self.model_path = model_path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.validate = validate
+        self.check_interval = check_interval
+        self.on_invalidate = on_invalidate
+        self.clock = clock
+
+        self.entries = OrderedDict()   # key -> (probability, expires_at)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.model_seconds = 0.0
+        self.generation = 0
+        self.next_check = 0.0
+        self.model_stat = self._stat()
+        self.model_hash = self._hash() if validate == "hash" else None
+
+    @staticmethod
+    def make_key(row):
+        # + 0.0 folds -0.0 into 0.0
+        return tuple(float(v) + 0.0 for v in row)
+
+    def _stat(self):
+        try:
+            st = os.stat(self.model_path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _hash(self):
+        digest = hashlib.sha256()
+        try:
+            with open(self.model_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        except OSError:
+            return None
+        return digest.hexdigest()
+
+    def check_model(self, force=False):
+        """Clears the cache if the model file changed. Returns True if it was cleared."""
+        now = self.clock()
+        if not force and now < self.next_check:
+            return False
+        self.next_check = now + self.check_interval
+
+        stat = self._stat()
+        if stat == self.model_stat:
+            return False
+        self.model_stat = stat
+        if self.validate == "hash":
+            digest = self._hash()
+            if digest == self.model_hash:
+                return False
+            self.model_hash = digest
+
+        with self.lock:
+            self._clear()
+            self.invalidations += 1
+        if self.on_invalidate is not None:
+            self.on_invalidate()
+        return True
+
+    def get(self, row):
+        """Returns the cached probability for one row, or None on a miss."""
+        self.check_model()
+        key = self.make_key(row)
+        now = self.clock()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self.entries[key]
+                self.expirations += 1
+            self.misses += 1
+        return None
+
+    def put(self, row, probability, model_seconds=0.0, generation=None):
+        """Stores a probability scored elsewhere (e.g. by a micro-batcher).
+
+        model_seconds is what scoring it cost, counted like predict()'s own
+        scoring so model_seconds_saved in stats() stays accurate. With
+        generation (self.generation read before scoring), the result is
+        dropped if the cache has been cleared since.
+        """
+        self.model_seconds += model_seconds
+        self._store([self.make_key(row)], [probability], self.clock(), generation)
+
+    def _store(self, keys, probabilities, now, generation=None):
+        expires_at = now + self.ttl if self.ttl is not None else None
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            for key, probability in zip(keys, probabilities):
+                self.entries[key] = (float(probability), expires_at)
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def predict(self, rows):
+        """Returns one probability per row, scoring only the rows not cached."""
+        self.check_model()
+        now = self.clock()
+        keys = [self.make_key(row) for row in rows]
+        results = [None] * len(keys)
+        missing = []
+
+        with self.lock:
+            for i, key in enumerate(keys):
+                entry = self.entries.get(key)
+                if entry is not None and (entry[1] is None or entry[1] > now):
+                    self.entries.move_to_end(key)
+                    results[i] = entry[0]
+                    self.hits += 1
+                    continue
+                if entry is not None:
+                    del self.entries[key]
+                    self.expirations += 1
+                missing.append(i)
+            self.misses += len(missing)
+
+        if missing:
+            generation = self.generation
+            start = time.perf_counter()
+            scored = self.predict_fn([keys[i] for i in missing])
+            self.model_seconds += time.perf_counter() - start
+
+            for i, probability in zip(missing, scored):
+                results[i] = float(probability)
+            self._store([keys[i] for i in missing], [results[i] for i in missing], now, generation)
+        return results
+
+    def _clear(self):
+        self.entries.clear()
+        self.generation += 1
+
+    def clear(self):
+        """Empties the cache, e.g. after the model was reloaded."""
+        with self.lock:
+            self._clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            per_miss = self.model_seconds / self.misses if self.misses else 0.0
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "model_seconds": round(self.model_seconds, 6),
+                # Hits would each have cost about one average miss
+                "model_seconds_saved": round(self.hits * per_miss, 6),
+            }
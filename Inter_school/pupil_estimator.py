@@ -0,0 +1,129 @@
+"""Pluggable pupil estimators for eye_detector.analyze_eyes().
+
+An estimator is called with a grayscale eye ROI and the ROI's (x, y) origin
+in the frame and returns the pupil as (cx, cy, radius) in frame coordinates,
+or None.
+
+* DarkBlobPupilEstimator (default): the pupil is the darkest blob in the
+  ROI. The ROI is smoothed, thresholded a fixed margin above its darkest
+  pixel, and the connected blob containing that pixel gives the centre
+  (its centroid) and radius (from its area and bounding box). A few linear
+  passes over the ROI, no parameter sweep.
+* HoughPupilEstimator: the original cv2.HoughCircles call, first circle wins.
+* SmoothedPupilEstimator: wraps either one and keeps a per-eye exponential
+  moving average of the radius across frames, matched by pupil position.
+
+The blob and Hough estimators are stateless. SmoothedPupilEstimator keeps
+per-eye state, so each stream or worker needs its own (see
+make_pupil_estimator()).
+"""
+import math
+
+import cv2
+import numpy as np
+
+
+PUPIL_METHODS = ("blob", "hough")
+# Blob threshold, in gray levels above the darkest (smoothed) pixel of the ROI
+DARK_MARGIN = 40
+MIN_PUPIL_RADIUS = 2
+
+
+class DarkBlobPupilEstimator:
+    def __init__(self, dark_margin=DARK_MARGIN, min_radius=MIN_PUPIL_RADIUS):
+        self.dark_margin = dark_margin
+        self.min_radius = min_radius
+
+    def begin_frame(self):
+        pass
+
+    def __call__(self, gray_roi, origin=(0, 0)):
+        h, w = gray_roi.shape[:2]
+        if h < 4 or w < 4:
+            return None
+        smoothed = cv2.blur(gray_roi, (3, 3))
+        darkest, _, (dx, dy), _ = cv2.minMaxLoc(smoothed)
+        _, mask = cv2.threshold(smoothed, darkest + self.dark_margin, 255, cv2.THRESH_BINARY_INV)
+
+        # Keep only the blob around the darkest pixel (lid lines and lashes are dark too)
+        _, labels, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        label = labels[dy, dx]
+        # A catch-light inside the pupil punches a hole in the blob's area but
+        # not in its bounding box, so take the larger of the two estimates
+        area_radius = math.sqrt(stats[label, cv2.CC_STAT_AREA] / math.pi)
+        box_radius = (stats[label, cv2.CC_STAT_WIDTH] + stats[label, cv2.CC_STAT_HEIGHT]) / 4
+        radius = max(area_radius, box_radius)
+        if radius < self.min_radius or radius > min(h, w) / 2:
+            return None
+        cx, cy = centroids[label]
+        return origin[0] + int(round(cx)), origin[1] + int(round(cy)), int(round(radius))
+
+
+class HoughPupilEstimator:
+    """The original detector: cv2.HoughCircles with fixed parameters, first circle."""
+
+    def __init__(self, min_radius=5, max_radius=30):
+        self.min_radius = min_radius
+        self.max_radius = max_radius
+
+    def begin_frame(self):
+        pass
+
+    def __call__(self, gray_roi, origin=(0, 0)):
+        circles = cv2.HoughCircles(gray_roi, cv2.HOUGH_GRADIENT, 1, 20, param1=50, param2=30,
+                                   minRadius=self.min_radius, maxRadius=self.max_radius)
+        if circles is None:
+            return None
+        cx, cy, radius = np.uint16(np.around(circles))[0, 0]
+        return origin[0] + int(cx), origin[1] + int(cy), int(radius)
+
+
+class SmoothedPupilEstimator:
+    """Exponential moving average of each eye's pupil radius across frames.
+
+    A measurement joins the track whose last pupil centre is within
+    match_distance pixels; tracks not seen for max_missed frames are dropped.
+    """
+
+    def __init__(self, estimator, alpha=0.4, match_distance=40, max_missed=5):
+        self.estimator = estimator
+        self.alpha = alpha
+        self.match_distance = match_distance
+        self.max_missed = max_missed
+        self.tracks = []  # [cx, cy, smoothed_radius, missed_frames]
+
+    def begin_frame(self):
+        self.estimator.begin_frame()
+        for track in self.tracks:
+            track[3] += 1
+        self.tracks = [t for t in self.tracks if t[3] <= self.max_missed]
+
+    def __call__(self, gray_roi, origin=(0, 0)):
+        pupil = self.estimator(gray_roi, origin)
+        if pupil is None:
+            return None
+        cx, cy, radius = pupil
+        best, best_distance = None, self.match_distance
+        for track in self.tracks:
+            distance = math.hypot(track[0] - cx, track[1] - cy)
+            if distance <= best_distance:
+                best, best_distance = track, distance
+        if best is None:
+            self.tracks.append([cx, cy, float(radius), 0])
+            return pupil
+        best[0], best[1], best[3] = cx, cy, 0
+        best[2] += self.alpha * (radius - best[2])
+        return cx, cy, int(round(best[2]))
+
+
+def make_pupil_estimator(method="blob", smoothing=None):
+    """Builds an estimator; smoothing is the EMA weight of new radii (None = no smoothing)."""
+    if method == "blob":
+        estimator = DarkBlobPupilEstimator()
+    elif method == "hough":
+        estimator = HoughPupilEstimator()
+    else:
+        raise ValueError(f"unknown pupil method {method!r}; expected one of {PUPIL_METHODS}")
+    if smoothing is not None and smoothing < 1.0:
+        estimator = SmoothedPupilEstimator(estimator, alpha=smoothing)
+    return estimator
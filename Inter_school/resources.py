@@ -0,0 +1,25 @@
+import os
+
+# Directory holding this file, heart_model.pkl and heart.csv
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# --- Helper function to find model/cascade files ---
+def find_resource(filename):
+    """Checks current directory, this project folder and common cascade paths for files."""
+    if os.path.exists(filename):
+        return filename
+
+    local = os.path.join(BASE_DIR, filename)
+    if os.path.exists(local):
+        return local
+
+    # Try finding the Haar cascade path if the user only has the filename
+    if 'haarcascade_eye.xml' in filename:
+        try:
+            import cv2
+            return cv2.data.haarcascades + filename
+        except (ImportError, AttributeError):
+            # Fallback if cv2.data is not available
+            pass
+    return filename
@@ -0,0 +1,118 @@
+"""Synthetic eye footage for benchmarking the eye pipeline without a camera.
+
+Draws a pair of cartoon eyes (sclera, iris, pupil, lid line, brow) that the
+Haar eye cascade detects, drifting slowly across the frame while the pupils
+dilate and constrict. Ground truth (eye centres and pupil radii) is returned
+with every frame.
+
+Usage:
+    python synthetic_eyes.py eyes.avi --frames 300
+    python synthetic_eyes.py frames_dir --frames 100 --images
+"""
+import argparse
+import math
+import os
+
+import cv2
+import numpy as np
+
+
+SKIN_COLOR = (140, 165, 200)     # BGR
+SCLERA_COLORS = {
+    "normal": (225, 230, 235),
+    "red": (90, 90, 230),
+    "yellow": (80, 215, 235),
+}
+IRIS_COLOR = (50, 80, 120)
+
+
+def draw_eye(img, center, iris_radius, pupil_radius, sclera_color=SCLERA_COLORS["normal"]):
+    """Draws one eye centred on center (x, y) into img."""
+    cx, cy = center
+    r = iris_radius
+    axes = (int(r * 1.9), int(r * 1.05))
+    cv2.ellipse(img, center, axes, 0, 0, 360, sclera_color, -1)
+    cv2.circle(img, center, r, IRIS_COLOR, -1)
+    cv2.circle(img, center, pupil_radius, (15, 15, 15), -1)
+    # Catch-light, upper lid and brow are what make the cascade fire
+    cv2.circle(img, (cx + r // 3, cy - r // 3), max(2, r // 6), (255, 255, 255), -1)
+    cv2.ellipse(img, center, axes, 0, 180, 360, (30, 30, 40), max(2, r // 6))
+    cv2.ellipse(img, (cx, cy - int(r * 1.9)), (int(r * 2.2), int(r * 0.5)), 0, 180, 360,
+                (40, 50, 70), max(3, r // 4))
+
+
+def render_frame(index, width=640, height=480, iris_radius=22, sclera="normal", seed=0):
+    """Renders frame number index.
+
+    Returns (frame, truth) where truth is a list of (cx, cy, pupil_radius) per eye.
+    """
+    rng = np.random.default_rng(seed + index)
+    t = index / 30.0
+    scale = min(width / 640, height / 480)
+    r = max(8, int(iris_radius * scale))
+    pupil_radius = max(3, int(round(r * (0.45 + 0.3 * math.sin(t * 0.7)))))
+
+    # Eyes drift in a slow ellipse so trackers have something to follow
+    mid_x = int(width / 2 + 60 * scale * math.sin(t * 0.9))
+    mid_y = int(height * 0.45 + 30 * scale * math.cos(t * 1.3))
+    spacing = int(100 * scale)
+
+    frame = np.empty((height, width, 3), np.uint8)
+    frame[:] = SKIN_COLOR
+    truth = []
+    for cx in (mid_x - spacing, mid_x + spacing):
+        draw_eye(frame, (cx, mid_y), r, pupil_radius, SCLERA_COLORS[sclera])
+        truth.append((cx, mid_y, pupil_radius))
+
+    frame = cv2.GaussianBlur(frame, (7, 7), 0)
+    noise = rng.normal(0, 6, frame.shape)
+    frame = np.clip(frame + noise, 0, 255).astype(np.uint8)
+    return frame, truth
+
+
+def write_clip(path, frames=300, width=640, height=480, fps=30, sclera="normal"):
+    """Writes a synthetic clip (MJPG .avi) and returns the per-frame ground truth."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open video writer for {path}")
+    truths = []
+    try:
+        for i in range(frames):
+            frame, truth = render_frame(i, width, height, sclera=sclera)
+            writer.write(frame)
+            truths.append(truth)
+    finally:
+        writer.release()
+    return truths
+
+
+def write_image_dir(path, frames=100, width=640, height=480, sclera="normal"):
+    """Writes frame_00000.png, frame_00001.png, ... into path."""
+    os.makedirs(path, exist_ok=True)
+    truths = []
+    for i in range(frames):
+        frame, truth = render_frame(i, width, height, sclera=sclera)
+        cv2.imwrite(os.path.join(path, f"frame_{i:05d}.png"), frame)
+        truths.append(truth)
+    return truths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic eye footage.")
+    parser.add_argument("output", help="video file (.avi) or, with --images, a directory")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--sclera", choices=sorted(SCLERA_COLORS), default="normal")
+    parser.add_argument("--images", action="store_true", help="write a directory of PNG frames")
+    args = parser.parse_args(argv)
+
+    if args.images:
+        write_image_dir(args.output, args.frames, args.width, args.height, args.sclera)
+    else:
+        write_clip(args.output, args.frames, args.width, args.height, sclera=args.sclera)
+    print(f"💾 Wrote {args.frames} synthetic frames to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
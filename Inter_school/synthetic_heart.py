@@ -0,0 +1,184 @@
+"""Synthetic heart.csv-shaped datasets of any size, written in chunks.
+
+heart.csv has 297 rows; this generates millions that look like it, so
+training and scoring can be tried at registry scale (see train_out_of_core.py).
+
+The generator is a Gaussian copula fitted separately to each class of the
+target column:
+
+    marginals     each column's empirical distribution: discrete columns
+                  (few distinct values) only take observed values at their
+                  observed frequencies, continuous ones are interpolated
+                  between observed quantiles
+    dependence    the correlation matrix of the columns' normal scores
+                  (ranks mapped through the inverse normal CDF)
+
+Sampling draws correlated normals, maps them to uniforms and through each
+column's inverse empirical CDF, then rounds and clips to SCHEMA. Classes are
+drawn at their heart.csv frequencies, so feature-target relationships and
+within-class correlations carry over: a large sample matches heart.csv's
+per-column means and spreads, and its correlations to within about 0.1
+(--check prints the comparison).
+
+Rows are generated and appended one chunk at a time, so memory stays at one
+chunk whatever --rows is. The same --seed and --chunk-rows reproduce the
+same file.
+
+Usage:
+    python synthetic_heart.py heart_5m.csv --rows 5000000
+    python synthetic_heart.py heart_200k.csv --rows 200000 --seed 7 --check
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from heart_dataset import COLUMNS, DEFAULT_CHUNK_ROWS, SCHEMA, TARGET_COLUMN
+
+
+# Columns with at most this many distinct values are sampled as discrete
+MAX_DISCRETE_VALUES = 10
+
+
+class _ClassCopula:
+    """Copula of the feature columns for the rows of one target class."""
+
+    def __init__(self, df, columns):
+        from scipy.special import ndtri
+        from scipy.stats import rankdata
+
+        n = len(df)
+        self.columns = columns
+        self.sorted = [np.sort(df[c].to_numpy(dtype=np.float64)) for c in columns]
+        self.discrete = [df[c].nunique() <= MAX_DISCRETE_VALUES for c in columns]
+        # Normal scores; average ranks keep ties (discrete columns) together
+        scores = np.column_stack([ndtri(rankdata(df[c]) / (n + 1)) for c in columns])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = np.corrcoef(scores, rowvar=False)
+        # A column constant within the class has no correlation with anything
+        corr = np.nan_to_num(corr)
+        np.fill_diagonal(corr, 1.0)
+        self.cholesky = np.linalg.cholesky(corr + 1e-9 * np.eye(len(columns)))
+
+    def sample(self, n, rng):
+        from scipy.special import ndtr
+
+        u = ndtr(rng.standard_normal((n, len(self.columns))) @ self.cholesky.T)
+        out = np.empty_like(u)
+        for j, (values, discrete) in enumerate(zip(self.sorted, self.discrete)):
+            m = len(values)
+            if discrete:
+                out[:, j] = values[np.minimum((u[:, j] * m).astype(np.int64), m - 1)]
+            else:
+                out[:, j] = np.interp(u[:, j], (np.arange(m) + 0.5) / m, values)
+        return out
+
+
+class HeartCopula:
+    """Per-class Gaussian copulas fitted to a heart.csv DataFrame."""
+
+    def __init__(self, df):
+        self.features = [c for c in COLUMNS if c != TARGET_COLUMN]
+        counts = df[TARGET_COLUMN].value_counts().sort_index()
+        self.classes = counts.index.to_numpy()
+        self.class_probabilities = (counts / counts.sum()).to_numpy()
+        self.copulas = [_ClassCopula(df[df[TARGET_COLUMN] == c], self.features) for c in self.classes]
+
+    @classmethod
+    def from_csv(cls, path="heart.csv"):
+        import heart_dataset
+
+        return cls(heart_dataset.load(path))
+
+    def sample(self, n, rng=None):
+        """n synthetic rows as a DataFrame with SCHEMA columns and dtypes."""
+        import pandas as pd
+
+        rng = rng if rng is not None else np.random.default_rng()
+        labels = rng.choice(len(self.classes), size=n, p=self.class_probabilities)
+        values = np.empty((n, len(self.features)))
+        for k, copula in enumerate(self.copulas):
+            rows = labels == k
+            values[rows] = copula.sample(int(rows.sum()), rng)
+
+        columns = {}
+        for j, c in enumerate(self.features):
+            dtype, low, high = SCHEMA[c]
+            column = np.clip(values[:, j], low, high)
+            columns[c] = (np.round(column) if dtype.startswith("int") else column).astype(dtype)
+        columns[TARGET_COLUMN] = self.classes[labels].astype(SCHEMA[TARGET_COLUMN][0])
+        return pd.DataFrame(columns, columns=COLUMNS)
+
+
+# ---------------- WRITING ----------------
+def write_csv(path, rows, chunk_rows=DEFAULT_CHUNK_ROWS, seed=0, copula=None, progress=True):
+    """Writes rows synthetic rows to path, one chunk at a time. Returns the copula used."""
+    copula = copula or HeartCopula.from_csv()
+    chunk_seeds = np.random.SeedSequence(seed).spawn((rows + chunk_rows - 1) // chunk_rows)
+    start = time.perf_counter()
+    written = 0
+    with open(path, "w", newline="") as f:
+        for i, chunk_seed in enumerate(chunk_seeds):
+            n = min(chunk_rows, rows - written)
+            chunk = copula.sample(n, np.random.default_rng(chunk_seed))
+            # oldpeak is recorded to one decimal in heart.csv
+            chunk.to_csv(f, header=i == 0, index=False, float_format="%.1f")
+            written += n
+            if progress:
+                elapsed = time.perf_counter() - start
+                print(f"\r🔄 {written:,}/{rows:,} rows ({written / elapsed:,.0f} rows/s)", end="", flush=True)
+    if progress:
+        print()
+    return copula
+
+
+# ---------------- CHECK ----------------
+def compare(real, synthetic):
+    """Per-column mean/std of both frames and the largest correlation difference."""
+    columns = {c: {"real_mean": float(real[c].mean()), "synthetic_mean": float(synthetic[c].mean()),
+                   "real_std": float(real[c].std()), "synthetic_std": float(synthetic[c].std())}
+               for c in COLUMNS}
+    corr_diff = np.abs(real.corr().to_numpy() - synthetic.corr().to_numpy())
+    worst = np.unravel_index(np.argmax(corr_diff), corr_diff.shape)
+    return {"columns": columns, "max_corr_diff": float(corr_diff[worst]),
+            "max_corr_pair": (COLUMNS[worst[0]], COLUMNS[worst[1]]),
+            "mean_corr_diff": float(corr_diff[np.triu_indices(len(COLUMNS), 1)].mean())}
+
+
+def print_comparison(result):
+    print(f"📊 {'column':<10} {'mean real':>10} {'synthetic':>10} {'std real':>10} {'synthetic':>10}")
+    for c, s in result["columns"].items():
+        print(f"   {c:<10} {s['real_mean']:10.3f} {s['synthetic_mean']:10.3f} "
+              f"{s['real_std']:10.3f} {s['synthetic_std']:10.3f}")
+    print(f"   correlations: mean |difference| {result['mean_corr_diff']:.3f}, "
+          f"max {result['max_corr_diff']:.3f} ({' / '.join(result['max_corr_pair'])})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a large synthetic dataset shaped like heart.csv.")
+    parser.add_argument("output", help="CSV file to write")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="rows generated per chunk")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--source", default="heart.csv", help="dataset whose distributions are copied")
+    parser.add_argument("--check", action="store_true",
+                        help="compare the first chunk's distributions with the source")
+    args = parser.parse_args(argv)
+
+    import heart_dataset
+
+    real = heart_dataset.load(args.source)
+    copula = HeartCopula(real)
+    start = time.perf_counter()
+    write_csv(args.output, args.rows, args.chunk_rows, args.seed, copula)
+    print(f"💾 {args.rows:,} rows saved to {args.output} ({os.path.getsize(args.output) / 2**20:.1f} MB) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    if args.check:
+        first = next(heart_dataset.iter_chunks(args.output, args.chunk_rows))
+        print_comparison(compare(real, first))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Shared fixtures; the scripts under test live one directory up and import each other by name."""
+import os
+import sys
+import warnings
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resources import BASE_DIR  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _quiet_feature_names():
+    # Models are fit on DataFrames and scored with plain arrays, as in heart_predictor
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        yield
+
+
+@pytest.fixture(scope="session")
+def heart_xy():
+    import heart_dataset
+
+    return heart_dataset.load_xy(os.path.join(BASE_DIR, "heart.csv"), cache=False)
+
+
+@pytest.fixture(scope="session")
+def heart_rows(heart_xy):
+    """heart.csv feature rows plus noisy copies, as float64."""
+    real = heart_xy[0].to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(0)
+    noisy = real[rng.integers(0, len(real), 1000)] + rng.normal(0, 5, (1000, real.shape[1]))
+    return np.concatenate([real, noisy])
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import bpm_stream
+
+
+class CountingScorer:
+    def __init__(self):
+        self.readings = 0
+        self.rescored = 0
+
+    def add(self, bpm):
+        self.readings += 1
+
+
+def wait_until_finished(session, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while session.is_alive() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+async def endless_sensor(closed):
+    try:
+        while True:
+            await asyncio.sleep(0.001)
+            yield b"BPM: 72\n"
+    finally:
+        closed.append(True)
+
+
+def test_stop_cancels_ingest_and_closes_the_source():
+    closed = []
+    scorer = CountingScorer()
+    session = bpm_stream.StreamSession(lambda: endless_sensor(closed), scorer).start()
+    while scorer.readings < 10:
+        assert session.is_alive()
+    session.stop()
+    assert not session.is_alive()
+    assert closed == [True]
+    assert session.error is None
+
+
+def test_source_errors_end_the_session():
+    async def missing_port():
+        raise FileNotFoundError("/dev/ttyNOPE")
+        yield
+
+    session = bpm_stream.StreamSession(missing_port, CountingScorer()).start()
+    wait_until_finished(session)
+    assert not session.is_alive()
+    assert isinstance(session.error, FileNotFoundError)
+    session.stop()  # stopping a finished session is harmless
+
+
+def test_finite_source_returns_stats():
+    async def three_beats():
+        for line in (b"BPM: 70\n", b"noise\n", b"BPM: 71\n"):
+            yield line
+
+    session = bpm_stream.StreamSession(three_beats, CountingScorer()).start()
+    wait_until_finished(session)
+    assert session.stats["lines"] == 3
+    assert session.stats["rejected"] == 1
@@ -0,0 +1,63 @@
+import random
+import threading
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from eye_pipeline import EyePipeline  # noqa: E402
+from eye_results import FrameResult, ResultBus  # noqa: E402
+
+
+class FakeSource:
+    """n blank frames, as a file (live=False) or a camera (live=True)."""
+
+    def __init__(self, n, live=False):
+        self.n = n
+        self.live = live
+        self.name = "fake"
+        self.read_count = 0
+
+    def read(self):
+        if self.read_count >= self.n:
+            return False, None
+        self.read_count += 1
+        return True, np.zeros((8, 8, 3), dtype=np.uint8)
+
+    def release(self):
+        pass
+
+
+def jittery_detector_factory():
+    """Workers finish frames out of order: each takes a random few milliseconds."""
+    rng = random.Random(threading.get_ident())
+
+    def analyze(frame):
+        time.sleep(rng.uniform(0, 0.004))
+        return FrameResult.from_eyes([])
+    return analyze
+
+
+def run(source, workers):
+    bus = ResultBus()
+    seqs = []
+    bus.subscribe(lambda result: seqs.append(result.seq), maxsize=10_000)
+    report = EyePipeline(source, workers=workers, display=False, detector_factory=jittery_detector_factory,
+                         bus=bus).run()
+    return report, seqs
+
+
+@pytest.mark.parametrize("workers", [1, 2, 4])
+def test_files_publish_every_result_in_order(workers):
+    report, seqs = run(FakeSource(60), workers)
+    assert seqs == list(range(60))
+    assert report["frames_delivered"] == 60
+    assert report["frames_late"] == 0
+
+
+def test_live_sources_publish_late_results_too():
+    report, seqs = run(FakeSource(200, live=True), workers=4)
+    assert report["frames_delivered"] == len(seqs)
+    assert len(seqs) == report["frames_captured"] - report["frames_dropped"]
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_vectorizer import OPTIONAL_FEATURES, FeatureVectorizer
+from heart_dataset import FEATURE_COLUMNS
+
+DEFAULTS = {c: float(i) for i, c in enumerate(FEATURE_COLUMNS)}
+GUI_RECORD = {"age": 63, "sex": "M", "trestbps": 145, "chol": 233, "fbs": 1, "thalach": 150,
+              "exang": 0, "oldpeak": 2.3}
+
+
+@pytest.fixture
+def vectorizer():
+    return FeatureVectorizer(FEATURE_COLUMNS, DEFAULTS)
+
+
+def test_only_features_the_gui_never_collects_are_defaulted(vectorizer):
+    row = vectorizer.transform_one(GUI_RECORD)[0]
+    for c in OPTIONAL_FEATURES:
+        assert row[FEATURE_COLUMNS.index(c)] == DEFAULTS[c]
+    assert row[FEATURE_COLUMNS.index("sex")] == 1.0
+
+
+@pytest.mark.parametrize("blank", [None, "", "  ", float("nan")])
+def test_blank_values_are_rejected(vectorizer, blank):
+    with pytest.raises(ValueError):
+        vectorizer.transform_one(dict(GUI_RECORD, age=blank))
+
+
+def test_all_blank_form_is_rejected(vectorizer):
+    with pytest.raises(ValueError):
+        vectorizer.transform_one({k: "" for k in GUI_RECORD})
+
+
+def test_left_out_gui_field_is_rejected(vectorizer):
+    record = dict(GUI_RECORD)
+    del record["chol"]
+    with pytest.raises(ValueError, match="chol"):
+        vectorizer.transform_one(record)
+
+
+def test_unrecognised_sex_is_rejected(vectorizer):
+    with pytest.raises(ValueError, match="sex"):
+        vectorizer.transform_one(dict(GUI_RECORD, sex="X"))
+
+
+def test_missing_column_needs_allow_missing(vectorizer):
+    columns = pd.DataFrame([GUI_RECORD] * 3).rename(columns={"chol": "cholesterol"})
+    with pytest.raises(ValueError, match="chol"):
+        vectorizer.transform_columns(columns, extra="ignore")
+    rows = vectorizer.transform_columns(columns, extra="ignore", allow_missing=True)
+    assert (rows[:, FEATURE_COLUMNS.index("chol")] == DEFAULTS["chol"]).all()
+
+
+def test_blank_cells_need_allow_missing(vectorizer):
+    df = pd.DataFrame({c: [1.0, np.nan] for c in FEATURE_COLUMNS})
+    with pytest.raises(ValueError, match="age"):
+        vectorizer.transform_columns(df)
+    assert vectorizer.transform_columns(df, allow_missing=True)[1, 0] == DEFAULTS["age"]
+
+
+def test_row_and_column_paths_agree(vectorizer):
+    records = [dict(GUI_RECORD, **{c: 1 for c in OPTIONAL_FEATURES}),
+               dict(GUI_RECORD, sex="female", **{c: 2 for c in OPTIONAL_FEATURES})]
+    by_row = vectorizer.transform_records(records).copy()
+    by_column = vectorizer.transform_columns(pd.DataFrame(records)).copy()
+    np.testing.assert_array_equal(by_row, by_column)
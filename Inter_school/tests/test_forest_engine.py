@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from forest_engine import CompiledForest, on_threshold_rows
+from resources import BASE_DIR
+
+MODES = ("table", "lockstep")
+
+
+@pytest.fixture(scope="module")
+def small_forest(heart_xy):
+    """Trees small enough for table mode."""
+    X, y = heart_xy
+    return RandomForestClassifier(n_estimators=25, max_leaf_nodes=32, random_state=0).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def deep_forest(heart_rows):
+    """Fully grown trees on noisy labels; too many leaves for table mode."""
+    y = np.random.default_rng(1).integers(0, 2, len(heart_rows))
+    model = RandomForestClassifier(n_estimators=25, random_state=0).fit(heart_rows, y)
+    assert max(e.tree_.n_leaves for e in model.estimators_) > 64
+    return model
+
+
+def assert_matches(engine, model, X):
+    expected = model.predict_proba(X)
+    np.testing.assert_allclose(engine.predict_proba(X), expected, rtol=0, atol=1e-9)
+    # Single rows go through the small-batch path in table mode
+    for i in range(0, len(X), 37):
+        np.testing.assert_allclose(engine.predict_proba(X[i:i + 1]), expected[i:i + 1], rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(engine.predict(X), model.predict(X))
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_matches_sklearn(small_forest, heart_rows, mode):
+    engine = CompiledForest.from_model(small_forest, mode)
+    assert engine.mode == mode
+    assert_matches(engine, small_forest, heart_rows)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_rows_on_split_thresholds(small_forest, heart_rows, mode):
+    # Exactly on a threshold goes left, as in sklearn's float32 <= float64 comparison
+    X = on_threshold_rows(small_forest, heart_rows, 1000)
+    assert_matches(CompiledForest.from_model(small_forest, mode), small_forest, X)
+
+
+def test_large_trees_fall_back_to_lockstep(deep_forest, heart_rows):
+    engine = CompiledForest.from_model(deep_forest)
+    assert engine.mode == "lockstep"
+    assert_matches(engine, deep_forest, heart_rows)
+    assert_matches(engine, deep_forest, on_threshold_rows(deep_forest, heart_rows, 1000))
+    with pytest.raises(ValueError):
+        CompiledForest.from_model(deep_forest, "table")
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_explain_adds_up_to_predict_proba(small_forest, heart_rows, mode):
+    engine = CompiledForest.from_model(small_forest, mode)
+    contributions = engine.explain(heart_rows)
+    assert contributions.shape == (len(heart_rows), engine.n_features_in_, len(engine.classes_))
+    np.testing.assert_allclose(engine.expected_value + contributions.sum(axis=1),
+                               small_forest.predict_proba(heart_rows), rtol=0, atol=1e-9)
+
+
+def test_explain_lockstep_equals_table(small_forest, heart_rows):
+    table = CompiledForest.from_model(small_forest, "table").explain(heart_rows)
+    lockstep = CompiledForest.from_model(small_forest, "lockstep").explain(heart_rows)
+    np.testing.assert_allclose(table, lockstep, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_shipped_model(heart_rows, mode):
+    joblib = pytest.importorskip("joblib")
+    path = os.path.join(BASE_DIR, "heart_model.pkl")
+    if not os.path.exists(path):
+        pytest.skip("heart_model.pkl not present")
+    model = joblib.load(path)
+    engine = CompiledForest.from_model(model, mode)
+    assert_matches(engine, model, heart_rows)
+    assert_matches(engine, model, on_threshold_rows(model, heart_rows, 1000))
+
+
+def test_unknown_mode_rejected(small_forest):
+    with pytest.raises(ValueError):
+        CompiledForest.from_model(small_forest, "fast")
@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import heart_dataset
+from resources import BASE_DIR
+
+
+@pytest.fixture
+def heart_csv(tmp_path):
+    """A copy of heart.csv with its columns out of SCHEMA order, and the rows to append to it."""
+    df = pd.read_csv(os.path.join(BASE_DIR, "heart.csv"))
+    columns = list(df.columns)
+    i, j = columns.index("sex"), columns.index("fbs")
+    columns[i], columns[j] = columns[j], columns[i]
+    df = df[columns]
+    path = tmp_path / "heart.csv"
+    df.iloc[:200].to_csv(path, index=False)
+    return str(path), df.iloc[200:250]
+
+
+def test_cached_append_follows_the_header_order(heart_csv):
+    path, extra = heart_csv
+    heart_dataset.load(path)
+    extra.to_csv(path, mode="a", header=False, index=False)
+    appended = heart_dataset.load(path)
+    pd.testing.assert_frame_equal(appended, heart_dataset.load(path, cache=False))
+    assert len(appended) == 250
+
+
+def test_edit_before_the_cached_end_forces_a_full_reparse(heart_csv):
+    path, extra = heart_csv
+    heart_dataset.load(path)
+    with open(path, "rb") as f:
+        data = bytearray(f.read())
+    # Same-length edit of the first data row, far more than a few KB before the end
+    first_row = data.index(b"\n") + 1
+    data[first_row:first_row + 2] = b"70"
+    data += extra.to_csv(header=False, index=False).encode()
+    with open(path, "wb") as f:
+        f.write(bytes(data))
+    loaded = heart_dataset.load(path)
+    assert loaded["age"].iloc[0] == 70
+    pd.testing.assert_frame_equal(loaded, heart_dataset.load(path, cache=False))
+
+
+def test_invalid_appended_rows_are_rejected(heart_csv):
+    path, extra = heart_csv
+    heart_dataset.load(path)
+    bad = extra.copy()
+    bad["age"] = 500
+    bad.to_csv(path, mode="a", header=False, index=False)
+    with pytest.raises(heart_dataset.SchemaError, match="row 200"):
+        heart_dataset.load(path)
+
+
+def test_iter_chunks_matches_load(heart_csv):
+    path, _ = heart_csv
+    chunks = list(heart_dataset.iter_chunks(path, chunk_rows=64))
+    assert [len(c) for c in chunks] == [64, 64, 64, 8]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), heart_dataset.load(path, cache=False))
+    assert all(c[col].dtype == np.dtype(heart_dataset.SCHEMA[col][0]) for c in chunks for col in c)
@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from resources import BASE_DIR
+
+if not os.path.exists(os.path.join(BASE_DIR, "heart_model.pkl")):
+    pytest.skip("heart_model.pkl not present", allow_module_level=True)
+
+import heart_predictor  # noqa: E402
+from feature_vectorizer import OPTIONAL_FEATURES  # noqa: E402
+
+# What the GUI form collects
+GUI_FIELDS = {"age": 63, "sex": "M", "trestbps": 145, "chol": 233, "fbs": 1, "thalach": 150, "exang": 0,
+              "oldpeak": 2.3}
+
+
+def test_explain_patient_lists_defaulted_features():
+    explanation = heart_predictor.explain_patient(**GUI_FIELDS)
+    assert sorted(explanation["imputed"]) == sorted(OPTIONAL_FEATURES)
+    assert set(explanation["contributions"]) == set(GUI_FIELDS) | set(OPTIONAL_FEATURES)
+    total = explanation["base"] + sum(explanation["contributions"].values())
+    assert total == pytest.approx(explanation["probability"], abs=0.1)
+    assert explanation["probability"] == pytest.approx(heart_predictor.predict_patient(**GUI_FIELDS), abs=1e-3)
+
+
+def test_explain_patient_with_every_feature_imputes_nothing():
+    fields = dict(GUI_FIELDS, cp=1, restecg=2, slope=3, ca=0, thal=6)
+    assert heart_predictor.explain_patient(**fields)["imputed"] == []
@@ -0,0 +1,35 @@
+from prediction_cache import PredictionCache
+
+
+def make_cache(tmp_path, **kwargs):
+    model = tmp_path / "model.pkl"
+    model.write_bytes(b"v1")
+    return PredictionCache(lambda rows: [0.5 for _ in rows], str(model), **kwargs)
+
+
+def test_put_counts_model_time_towards_savings(tmp_path):
+    cache = make_cache(tmp_path)
+    row = [1.0] * 13
+    assert cache.get(row) is None
+    cache.put(row, 0.25, model_seconds=0.01)
+    assert cache.get(row) == 0.25
+    assert cache.stats()["model_seconds_saved"] == 0.01
+
+
+def test_put_from_before_a_clear_is_dropped(tmp_path):
+    cache = make_cache(tmp_path)
+    row = [1.0] * 13
+    generation = cache.generation
+    cache.clear()  # e.g. the model was reloaded while this row was being scored
+    cache.put(row, 0.47, generation=generation)
+    assert cache.get(row) is None
+    cache.put(row, 0.53, generation=cache.generation)
+    assert cache.get(row) == 0.53
+
+
+def test_model_file_change_starts_a_new_generation(tmp_path):
+    cache = make_cache(tmp_path, check_interval=0.0)
+    generation = cache.generation
+    (tmp_path / "model.pkl").write_bytes(b"version 2")
+    assert cache.check_model(force=True)
+    assert cache.generation != generation
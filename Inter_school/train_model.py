@@ -1,41 +1,247 @@
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score
-import joblib
-
-# === Load Dataset ===
-df = pd.read_csv("heart.csv")  # make sure your CSV file name matches
-
-# === Check columns ===
-print("Columns in dataset:", df.columns.tolist())
-
-# === Define target column ===
-target_col = 'condition'  # Updated from 'num' → 'condition'
-
-# === Convert target to binary (if needed) ===
-df[target_col] = (df[target_col] > 0).astype(int)
-
-# === Define features and target ===
-X = df.drop(columns=[target_col])
-y = df[target_col]
-
-# === Split into training and testing sets ===
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# === Train Random Forest Model ===
-model = RandomForestClassifier(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
-
-# === Evaluate accuracy ===
-y_pred = model.predict(X_test)
-acc = accuracy_score(y_test, y_pred)
-print(f"✅ Model training complete! Accuracy: {acc * 100:.2f}%")
-
-# === Save model to file ===
-joblib.dump(model, "heart_model.pkl")
-print("💾 Model saved as heart_model.pkl")
-
-# === Feature order (for reference during prediction) ===
-print("\nFeature order used for prediction:")
-print(list(X.columns))
+"""Trains heart_model.pkl from heart.csv.
+
+By default this fits one RandomForest on an 80/20 split, as before. With
+--search grid|random, k-fold cross-validation over forest parameters runs
+first, spread over all cores with joblib: the feature matrix is converted
+to float32 once (the dtype the trees use) and the fold splits are computed
+once and shared by every candidate, so each fit only pays for training. The
+leaderboard CSV lists accuracy, ROC AUC, fit time and single-row predict
+latency per candidate; the saved model is the best CV AUC among candidates
+within --max-latency-us.
+
+Usage:
+    python train_model.py
+    python train_model.py --search grid --folds 5 --jobs -1 --leaderboard leaderboard.csv
+    python train_model.py --search random --n-iter 30 --seed 7 --max-latency-us 60
+"""
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+import joblib
+
+from feature_vectorizer import save_feature_meta
+from heart_dataset import load_xy
+
+# === Search space ===
+PARAM_GRID = {
+    "n_estimators": [50, 100, 200],
+    "max_depth": [None, 6, 10],
+    "min_samples_leaf": [1, 3, 5],
+    "max_features": ["sqrt", 0.5],
+}
+PARAM_DISTRIBUTIONS = {
+    "n_estimators": [25, 50, 75, 100, 150, 200, 300],
+    "max_depth": [None, 4, 5, 6, 8, 10, 12, 16],
+    "min_samples_leaf": [1, 2, 3, 4, 5, 8],
+    "max_features": ["sqrt", "log2", 0.3, 0.5, 0.7],
+}
+LEADERBOARD_COLUMNS = ["rank", "params", "cv_accuracy", "cv_accuracy_std", "cv_auc", "cv_auc_std",
+                       "fit_seconds", "predict_us", "batch_predict_us_per_row", "n_nodes"]
+
+
+def load_dataset(path="heart.csv"):
+    """Loads the CSV through heart_dataset (typed, validated, cached) and returns (X, y) with a binary target."""
+    # === Load, check columns and value ranges, convert target to binary ===
+    X, y = load_xy(path)  # make sure your CSV file name matches
+    print(f"✅ {len(X)} rows match the heart.csv schema")
+    return X, y
+
+
+# ---------------- Hyperparameter search ----------------
+def grid_candidates(grid=PARAM_GRID):
+    """Every combination of the grid, in a fixed order."""
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def random_candidates(n_iter, seed, distributions=PARAM_DISTRIBUTIONS):
+    """n_iter distinct parameter sets drawn reproducibly from distributions."""
+    rng = np.random.default_rng(seed)
+    names = sorted(distributions)
+    space = len(grid_candidates(distributions))
+    candidates = []
+    while len(candidates) < min(n_iter, space):
+        params = {n: distributions[n][rng.integers(len(distributions[n]))] for n in names}
+        # numpy scalars would leak into the leaderboard and the saved model
+        params = {n: v.item() if hasattr(v, "item") else v for n, v in params.items()}
+        if params not in candidates:
+            candidates.append(params)
+    return candidates
+
+
+def make_folds(X, y, n_folds, seed):
+    """Stratified fold splits computed once and shared by every candidate."""
+    from sklearn.model_selection import StratifiedKFold
+
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    folds = []
+    for train_idx, test_idx in splitter.split(X, y):
+        # Contiguous float32 copies: the trees convert to float32 anyway, so no fit re-converts
+        folds.append((np.ascontiguousarray(X[train_idx]), y[train_idx],
+                      np.ascontiguousarray(X[test_idx]), y[test_idx]))
+    return folds
+
+
+def _predict_latency(model, X, repeat=200):
+    """Median single-row latency of the serving engine, and sklearn per-row batch latency, in µs."""
+    from forest_engine import CompiledForest
+
+    engine = CompiledForest.from_model(model)
+    row = X[:1]
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        engine.predict_proba(row)
+        samples.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    model.predict_proba(X)
+    batch = (time.perf_counter() - start) / len(X)
+    return float(np.median(samples)) * 1e6, batch * 1e6
+
+
+def evaluate_fold(candidate_id, params, fold_id, fold, seed, measure_latency):
+    """Fits one candidate on one fold; returns its scores and timings."""
+    from sklearn.metrics import roc_auc_score
+
+    X_train, y_train, X_test, y_test = fold
+    # Single-threaded: the parallelism is across (candidate, fold) tasks
+    model = RandomForestClassifier(random_state=seed, n_jobs=1, **params)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    proba = model.predict_proba(X_test)[:, 1]
+    result = {
+        "candidate": candidate_id,
+        "fold": fold_id,
+        "accuracy": accuracy_score(y_test, (proba > 0.5).astype(int)),
+        "auc": roc_auc_score(y_test, proba),
+        "fit_seconds": fit_seconds,
+        "n_nodes": sum(e.tree_.node_count for e in model.estimators_),
+    }
+    if measure_latency:
+        result["predict_us"], result["batch_predict_us_per_row"] = _predict_latency(model, X_test)
+    return result
+
+
+def run_search(X, y, candidates, n_folds=5, n_jobs=-1, seed=42):
+    """Cross-validates every candidate in parallel; returns (leaderboard, {candidate id: params})."""
+    from joblib import Parallel, delayed
+
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y)
+    folds = make_folds(X, y, n_folds, seed)
+
+    # Latency is measured on the first fold only; it depends on tree shape, not data
+    tasks = [delayed(evaluate_fold)(c, params, f, fold, seed, f == 0)
+             for c, params in enumerate(candidates) for f, fold in enumerate(folds)]
+    results = pd.DataFrame(Parallel(n_jobs=n_jobs)(tasks))
+
+    by_candidate = results.groupby("candidate")
+    board = pd.DataFrame({
+        "params": [repr(params) for params in candidates],
+        "cv_accuracy": by_candidate["accuracy"].mean(),
+        "cv_accuracy_std": by_candidate["accuracy"].std(ddof=0),
+        "cv_auc": by_candidate["auc"].mean(),
+        "cv_auc_std": by_candidate["auc"].std(ddof=0),
+        "fit_seconds": by_candidate["fit_seconds"].mean(),
+        "predict_us": by_candidate["predict_us"].max(),
+        "batch_predict_us_per_row": by_candidate["batch_predict_us_per_row"].max(),
+        "n_nodes": by_candidate["n_nodes"].mean().round().astype(int),
+    })
+    board = board.rename_axis(None)
+    board["candidate"] = board.index
+    # Ties broken by latency, then by candidate order, so ranking is reproducible
+    board = board.sort_values(["cv_auc", "cv_accuracy", "predict_us", "candidate"],
+                              ascending=[False, False, True, True]).reset_index(drop=True)
+    board.insert(0, "rank", board.index + 1)
+    return board, {i: params for i, params in enumerate(candidates)}
+
+
+def pick_candidate(board, max_latency_us=None):
+    """Best-ranked leaderboard row within the latency budget (or overall if none fits)."""
+    if max_latency_us is not None:
+        within = board[board["predict_us"] <= max_latency_us]
+        if len(within):
+            return within.iloc[0]
+        print(f"⚠️ No candidate meets {max_latency_us:g} µs; using the most accurate one")
+    return board.iloc[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the heart disease RandomForest.")
+    parser.add_argument("--data", default="heart.csv")
+    parser.add_argument("--output", default="heart_model.pkl")
+    parser.add_argument("--export-flat", metavar="DIR", nargs="?", const="heart_model_flat",
+                        help="also export the trees as memory-mappable NumPy arrays (see flat_forest.py)")
+    parser.add_argument("--search", choices=["grid", "random"],
+                        help="cross-validate a parameter search before training the final model")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--n-iter", type=int, default=20, help="candidates drawn by --search random")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel fits (-1 = all cores)")
+    parser.add_argument("--seed", type=int, default=42, help="seed for folds, sampling and forests")
+    parser.add_argument("--max-latency-us", type=float,
+                        help="only pick candidates whose single-row predict latency is within this")
+    parser.add_argument("--leaderboard", default="leaderboard.csv")
+    args = parser.parse_args(argv)
+
+    # === Load Dataset ===
+    X, y = load_dataset(args.data)
+
+    # === Split into training and testing sets (fixed: incremental_train.py holds out the same rows) ===
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    # === Optional parameter search on the training split ===
+    params = {"n_estimators": 100}
+    if args.search:
+        candidates = (grid_candidates() if args.search == "grid"
+                      else random_candidates(args.n_iter, args.seed))
+        print(f"🔎 {args.search} search: {len(candidates)} candidates x {args.folds} folds")
+        start = time.perf_counter()
+        board, by_id = run_search(X_train, y_train, candidates, args.folds, args.jobs, args.seed)
+        print(f"   done in {time.perf_counter() - start:.1f}s")
+
+        board[LEADERBOARD_COLUMNS].to_csv(args.leaderboard, index=False, float_format="%.6g")
+        print(f"📊 Leaderboard saved to {args.leaderboard}")
+        print(board[LEADERBOARD_COLUMNS].head(10).to_string(index=False))
+
+        best = pick_candidate(board, args.max_latency_us)
+        params = by_id[int(best["candidate"])]
+        print(f"\n🏆 Selected rank {best['rank']}: {params}")
+
+    # === Train Random Forest Model ===
+    model = RandomForestClassifier(random_state=args.seed, **params)
+    model.fit(X_train, y_train)
+
+    # === Evaluate accuracy ===
+    y_pred = model.predict(X_test)
+    acc = accuracy_score(y_test, y_pred)
+    print(f"✅ Model training complete! Accuracy: {acc * 100:.2f}%")
+
+    # === Save model to file ===
+    joblib.dump(model, args.output)
+    print(f"💾 Model saved as {args.output}")
+
+    # === Feature order and imputation defaults, read back by feature_vectorizer ===
+    meta_path = save_feature_meta(args.output, X_train)
+    print(f"💾 Feature metadata saved as {meta_path}")
+
+    # === Optional flat export for fast, shared loading ===
+    if args.export_flat:
+        from flat_forest import export_forest
+        export_forest(model, args.export_flat)
+        print(f"💾 Flat model arrays saved to {args.export_flat}/")
+
+    # === Feature order (for reference during prediction) ===
+    print("\nFeature order used for prediction:")
+    print(list(X.columns))
+
+
+if __name__ == "__main__":
+    main()
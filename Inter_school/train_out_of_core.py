@@ -0,0 +1,306 @@
+"""Trains the heart forest on CSVs too large to load at once.
+
+heart_dataset.iter_chunks() reads the file one chunk at a time with compact
+dtypes, so memory depends on --chunk-rows rather than on the file size.
+Strategies:
+
+    chunks     (default) a small forest of --trees-per-chunk trees is fit on
+               each chunk in a joblib worker, at most --jobs chunks at once,
+               and the trees of every chunk forest are merged into one
+               RandomForestClassifier. --max-samples bootstraps each tree
+               from that many rows of its chunk.
+    subsample  one pass keeps a uniform random sample of --sample-rows
+               training rows, then one forest of --trees trees is fit on it
+    full       every training row is loaded and one forest is fit, as
+               train_model.py does; for comparison, its memory grows with
+               the file
+
+Every HOLDOUT_EVERY-th row is held out (a uniform sample of at most
+--holdout-rows of them is kept) and the model is scored on it. The model and
+its feature metadata are saved like train_model.py's, so heart_predictor,
+forest_engine and flat_forest use it unchanged. --min-samples-leaf defaults
+to 20 because fully grown trees get bigger with every row.
+
+Peak memory (max RSS) of the main process and of the fit workers is
+reported. --sweep retrains on the first N rows for each N given, every run
+in a fresh process, and prints peak memory against row count.
+
+Usage:
+    python synthetic_heart.py heart_5m.csv --rows 5000000
+    python train_out_of_core.py heart_5m.csv --output heart_model_5m.pkl --jobs 4
+    python train_out_of_core.py heart_5m.csv --sweep 100000 1000000 5000000 --strategies chunks subsample full
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from heart_dataset import DEFAULT_CHUNK_ROWS, FEATURE_COLUMNS, TARGET_COLUMN, iter_chunks
+
+
+STRATEGIES = ("chunks", "subsample", "full")
+HOLDOUT_EVERY = 10
+DEFAULT_HOLDOUT_ROWS = 200_000
+DEFAULT_SAMPLE_ROWS = 500_000
+# Training rows kept for the imputation defaults in the feature metadata
+META_SAMPLE_ROWS = 100_000
+SWEEP_COLUMNS = ["strategy", "rows", "train_rows", "trees", "seconds", "accuracy", "auc",
+                 "start_mb", "peak_mb", "worker_peak_mb", "model_mb"]
+
+
+def peak_rss_mb():
+    """This process's peak resident memory in MB, or None where the OS doesn't say."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (2 ** 20 if sys.platform == "darwin" else 1024), 1)
+
+
+class Reservoir:
+    """Uniform random sample of up to size rows from a stream of DataFrames."""
+
+    def __init__(self, size, rng):
+        self.size = size
+        self.rng = rng
+        self.rows = None
+        self.keys = np.empty(0)
+        self.seen = 0
+
+    def add(self, df):
+        # Each row gets a random key and the size smallest keys are kept
+        keys = self.rng.random(len(df))
+        self.seen += len(df)
+        if len(self.keys) >= self.size:
+            wanted = keys < self.keys.max()
+            df, keys = df[wanted], keys[wanted]
+        if self.rows is not None:
+            df = pd.concat([self.rows, df], ignore_index=True)
+            keys = np.concatenate([self.keys, keys])
+        if len(df) > self.size:
+            keep = np.sort(np.argpartition(keys, self.size)[:self.size])
+            df, keys = df.iloc[keep].reset_index(drop=True), keys[keep]
+        self.rows, self.keys = df, keys
+
+
+def split_xy(df):
+    return df[FEATURE_COLUMNS], (df[TARGET_COLUMN] > 0).astype("int8")
+
+
+# ---------------- TRAINING ----------------
+def fit_forest(X, y, n_trees, seed, params):
+    """Fits one forest single-threaded; returns it with the peak memory of the process that fit it."""
+    from sklearn.ensemble import RandomForestClassifier
+
+    model = RandomForestClassifier(n_estimators=n_trees, random_state=seed, n_jobs=1, **params)
+    model.fit(X, y)
+    return model, peak_rss_mb()
+
+
+def merge_forests(forests):
+    """One forest holding the trees of every forest (all fit on the same columns and classes)."""
+    merged = forests[0]
+    for forest in forests[1:]:
+        if not np.array_equal(forest.classes_, merged.classes_):
+            raise ValueError(f"cannot merge forests with classes {merged.classes_} and {forest.classes_}")
+    merged.estimators_ = [tree for forest in forests for tree in forest.estimators_]
+    merged.n_estimators = len(merged.estimators_)
+    return merged
+
+
+def train(path, strategy="chunks", chunk_rows=DEFAULT_CHUNK_ROWS, max_rows=None, trees=100,
+          trees_per_chunk=10, sample_rows=DEFAULT_SAMPLE_ROWS, holdout_rows=DEFAULT_HOLDOUT_ROWS,
+          jobs=1, seed=42, params=None):
+    """Streams path once and fits a forest with the given strategy.
+
+    Returns (model, holdout DataFrame, training sample DataFrame, report dict).
+    """
+    from joblib import Parallel, delayed
+
+    params = params or {}
+    rng = np.random.default_rng(seed)
+    holdout = Reservoir(holdout_rows, rng)
+    sample = Reservoir(sample_rows if strategy == "subsample" else META_SAMPLE_ROWS, rng)
+    report = {"strategy": strategy, "start_mb": peak_rss_mb(), "chunks": 0, "skipped_chunks": 0}
+
+    def training_chunks():
+        """Training part of each chunk; holdout rows and samples are collected on the way."""
+        first_row = 0
+        for chunk in iter_chunks(path, chunk_rows, max_rows):
+            held = (first_row + np.arange(len(chunk))) % HOLDOUT_EVERY == 0
+            first_row += len(chunk)
+            holdout.add(chunk[held])
+            chunk = chunk[~held].reset_index(drop=True)
+            sample.add(chunk)
+            report["chunks"] += 1
+            if chunk[TARGET_COLUMN].gt(0).nunique() < 2:
+                # A forest that has seen one class can't be merged with the others
+                print(f"⚠️ Chunk {report['chunks']} has only one class; not trained on")
+                report["skipped_chunks"] += 1
+                continue
+            yield chunk
+
+    start = time.perf_counter()
+    if strategy == "chunks":
+        # pre_dispatch bounds the chunks read ahead of the workers, and so the memory
+        tasks = (delayed(fit_forest)(*split_xy(chunk), trees_per_chunk, seed + i, params)
+                 for i, chunk in enumerate(training_chunks()))
+        forests, worker_peaks = [], []
+        for forest, worker_peak in Parallel(n_jobs=jobs, pre_dispatch="n_jobs", return_as="generator")(tasks):
+            forests.append(forest)
+            worker_peaks.append(worker_peak or 0.0)
+            print(f"\r🌲 {len(forests)}/{report['chunks']} chunk forests fit", end="", flush=True)
+        print()
+        if not forests:
+            raise ValueError(f"no chunk of {path} has both classes")
+        model = merge_forests(forests)
+        report["worker_peak_mb"] = max(worker_peaks)
+    else:
+        loaded = []
+        for chunk in training_chunks():
+            if strategy == "full":
+                loaded.append(chunk)
+        data = pd.concat(loaded, ignore_index=True) if strategy == "full" else sample.rows
+        del loaded
+        print(f"🌲 Fitting {trees} trees on {len(data):,} of {sample.seen:,} training rows")
+        model, report["worker_peak_mb"] = fit_forest(*split_xy(data), trees, seed, params)
+        del data
+    report["fit_seconds"] = round(time.perf_counter() - start, 2)
+
+    report.update(rows=sample.seen + holdout.seen, train_rows=sample.seen, holdout_rows=len(holdout.rows),
+                  trees=len(model.estimators_))
+    return model, holdout.rows, sample.rows, report
+
+
+def evaluate(model, holdout):
+    from sklearn.metrics import accuracy_score, roc_auc_score
+
+    X, y = split_xy(holdout)
+    proba = model.predict_proba(X)[:, 1]
+    auc = roc_auc_score(y, proba) if y.nunique() > 1 else float("nan")
+    return accuracy_score(y, (proba > 0.5).astype(int)), auc
+
+
+# ---------------- MEMORY SWEEP ----------------
+def sweep(path, sizes, strategies, train_args):
+    """Retrains in a fresh process per (strategy, rows); returns one report per run."""
+    reports = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for strategy in strategies:
+            for rows in sizes:
+                report_path = os.path.join(tmp, "report.json")
+                command = [sys.executable, os.path.abspath(__file__), path, "--strategy", strategy,
+                           "--max-rows", str(rows), "--output", os.path.join(tmp, "model.pkl"),
+                           "--report", report_path, *train_args]
+                print(f"🔄 {strategy} on {rows:,} rows")
+                subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+                with open(report_path) as f:
+                    reports.append(json.load(f))
+    return reports
+
+
+def print_sweep(reports):
+    print("📊 Peak memory by row count (MB; start = after imports, before any data)")
+    print("   " + " ".join(f"{c:>14}" for c in SWEEP_COLUMNS))
+    for r in reports:
+        cells = []
+        for c in SWEEP_COLUMNS:
+            value = r.get(c)
+            cells.append(f"{value:>14,}" if isinstance(value, int) else f"{value:>14.4g}"
+                         if isinstance(value, float) else f"{str(value):>14}")
+        print("   " + " ".join(cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the heart RandomForest on a CSV too large for memory.")
+    parser.add_argument("data", help="heart.csv-shaped CSV (e.g. from synthetic_heart.py)")
+    parser.add_argument("--output", default="heart_model_large.pkl")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="chunks")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="rows read per chunk")
+    parser.add_argument("--max-rows", type=int, help="only use the first this many rows")
+    parser.add_argument("--trees", type=int, default=100, help="trees for --strategy subsample/full")
+    parser.add_argument("--trees-per-chunk", type=int, default=10, help="trees per chunk for --strategy chunks")
+    parser.add_argument("--sample-rows", type=int, default=DEFAULT_SAMPLE_ROWS,
+                        help="training rows kept by --strategy subsample")
+    parser.add_argument("--holdout-rows", type=int, default=DEFAULT_HOLDOUT_ROWS,
+                        help="held-out rows kept for scoring")
+    parser.add_argument("--max-depth", type=int)
+    parser.add_argument("--min-samples-leaf", type=int, default=20)
+    parser.add_argument("--max-samples", type=int, help="rows bootstrapped per tree")
+    parser.add_argument("--jobs", type=int, default=1, help="chunks fit in parallel (-1 = all cores)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--export-flat", metavar="DIR", nargs="?", const="heart_model_flat",
+                        help="also export the trees as memory-mappable NumPy arrays (see flat_forest.py)")
+    parser.add_argument("--report", metavar="PATH", help="save the run's report (or the sweep's) as JSON")
+    parser.add_argument("--sweep", type=int, nargs="+", metavar="ROWS",
+                        help="retrain on the first ROWS rows for each value and tabulate peak memory")
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=["chunks"],
+                        help="strategies compared by --sweep")
+    args = parser.parse_args(argv)
+
+    if args.sweep:
+        train_args = ["--chunk-rows", str(args.chunk_rows), "--trees", str(args.trees),
+                      "--trees-per-chunk", str(args.trees_per_chunk), "--sample-rows", str(args.sample_rows),
+                      "--holdout-rows", str(args.holdout_rows), "--min-samples-leaf", str(args.min_samples_leaf),
+                      "--jobs", str(args.jobs), "--seed", str(args.seed)]
+        for flag, value in (("--max-depth", args.max_depth), ("--max-samples", args.max_samples)):
+            if value is not None:
+                train_args += [flag, str(value)]
+        reports = sweep(args.data, args.sweep, args.strategies, train_args)
+        print_sweep(reports)
+        if args.report:
+            with open(args.report, "w") as f:
+                json.dump(reports, f, indent=2)
+            print(f"💾 Sweep saved to {args.report}")
+        return reports
+
+    import joblib
+
+    from feature_vectorizer import save_feature_meta
+
+    params = {"min_samples_leaf": args.min_samples_leaf}
+    if args.max_depth is not None:
+        params["max_depth"] = args.max_depth
+    if args.max_samples is not None:
+        params["max_samples"] = args.max_samples
+
+    start = time.perf_counter()
+    model, holdout, sample, report = train(
+        args.data, args.strategy, args.chunk_rows, args.max_rows, args.trees, args.trees_per_chunk,
+        args.sample_rows, args.holdout_rows, args.jobs, args.seed, params)
+    accuracy, auc = evaluate(model, holdout)
+    print(f"✅ {report['trees']} trees on {report['train_rows']:,} rows in {report['fit_seconds']:.1f}s "
+          f"({report['chunks']} chunks). Holdout ({len(holdout):,} rows) accuracy: {accuracy * 100:.2f}%, "
+          f"AUC {auc:.3f}")
+
+    # === Same files as train_model.py ===
+    joblib.dump(model, args.output)
+    print(f"💾 Model saved as {args.output}")
+    meta_path = save_feature_meta(args.output, sample[FEATURE_COLUMNS])
+    print(f"💾 Feature metadata saved as {meta_path}")
+    if args.export_flat:
+        from flat_forest import export_forest
+        export_forest(model, args.export_flat)
+        print(f"💾 Flat model arrays saved to {args.export_flat}/")
+
+    report.update(seconds=round(time.perf_counter() - start, 2), accuracy=round(accuracy, 4),
+                  auc=round(auc, 4), peak_mb=peak_rss_mb(),
+                  model_mb=round(os.path.getsize(args.output) / 2 ** 20, 1))
+    print(f"📊 Peak memory: {report['peak_mb']} MB (main process; {report['start_mb']} MB before reading), "
+          f"{report['worker_peak_mb']} MB per fit worker")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()